@@ -1,7 +1,9 @@
+import argparse
 import boto3
 import json
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # AWS configuration
 aws_region = 'us-west-2'
@@ -12,67 +14,95 @@ s3_client = boto3.client('s3', region_name=aws_region)
 dynamodb_client = boto3.client('dynamodb', region_name=aws_region)
 
 
-# Function to print AWS CLI commands to delete all versions and markers in the S3 bucket
-def print_delete_commands(bucket_name):
-    try:
-        versions = s3_client.list_object_versions(Bucket=bucket_name)
-        delete_markers = versions.get('DeleteMarkers', [])
-        versions_list = versions.get('Versions', [])
-
-        delete_commands = []
-
-        for delete_marker in delete_markers:
-            command = f"aws s3api delete-object --bucket {bucket_name} --key {delete_marker['Key']} --version-id {delete_marker['VersionId']}"
-            delete_commands.append(command)
-
-        for version in versions_list:
-            command = f"aws s3api delete-object --bucket {bucket_name} --key {version['Key']} --version-id {version['VersionId']}"
-            delete_commands.append(command)
-
-        if delete_commands:
-            print(
-                f"S3 bucket '{bucket_name}' is not empty. Use the following AWS CLI commands to delete all files and versions:")
-            for command in delete_commands:
-                print(command)
-        else:
-            print(f"No versions or delete markers found in bucket '{bucket_name}'.")
-    except Exception as e:
-        print(f"Error generating delete commands for S3 bucket: {e}")
-        sys.exit(1)
+# S3 accepts up to 1000 keys per DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+
+
+# Function to list every object version and delete marker in the S3 bucket, one batch per listing page
+def iter_version_batches(bucket_name):
+    paginator = s3_client.get_paginator('list_object_versions')
+    for page in paginator.paginate(Bucket=bucket_name, PaginationConfig={'PageSize': DELETE_BATCH_SIZE}):
+        objects = [
+            {'Key': entry['Key'], 'VersionId': entry['VersionId']}
+            for entry in page.get('Versions', []) + page.get('DeleteMarkers', [])
+        ]
+        for start in range(0, len(objects), DELETE_BATCH_SIZE):
+            yield objects[start:start + DELETE_BATCH_SIZE]
+
+
+# Function to delete one batch of object versions and delete markers
+def delete_version_batch(bucket_name, objects, dry_run=False):
+    if dry_run:
+        return len(objects), []
+    response = s3_client.delete_objects(Bucket=bucket_name, Delete={'Objects': objects, 'Quiet': True})
+    errors = response.get('Errors', [])
+    return len(objects) - len(errors), errors
+
+
+# Function to delete every version and delete marker in the S3 bucket, listing pages while batches are deleted
+def empty_s3_bucket(bucket_name, workers, dry_run=False):
+    deleted = 0
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(delete_version_batch, bucket_name, objects, dry_run)
+                   for objects in iter_version_batches(bucket_name)]
+        for future in as_completed(futures):
+            batch_deleted, batch_errors = future.result()
+            deleted += batch_deleted
+            errors.extend(batch_errors)
+    for error in errors[:10]:
+        print(f"Error deleting {error.get('Key')} ({error.get('VersionId')}): {error.get('Code')} {error.get('Message')}")
+    if len(errors) > 10:
+        print(f"... and {len(errors) - 10} more errors.")
+    verb = "Would delete" if dry_run else "Deleted"
+    print(f"{verb} {deleted} object version(s) and delete marker(s) from S3 bucket '{bucket_name}' in {len(futures)} batch(es).")
+    return not errors
 
 
 # Function to delete S3 bucket and its contents
-def delete_s3_bucket(bucket_name):
+def delete_s3_bucket(bucket_name, workers, dry_run=False):
     try:
-        # Check if bucket is empty
-        response = s3_client.list_object_versions(Bucket=bucket_name)
-        if 'DeleteMarkers' in response or 'Versions' in response:
-            print_delete_commands(bucket_name)
-        else:
-            # Delete the bucket
-            s3_client.delete_bucket(Bucket=bucket_name)
-            waiter = s3_client.get_waiter('bucket_not_exists')
-            waiter.wait(Bucket=bucket_name)
-            print(f"Success: S3 bucket '{bucket_name}' deleted.")
+        if not empty_s3_bucket(bucket_name, workers, dry_run):
+            print(f"Error: S3 bucket '{bucket_name}' could not be emptied.")
+            return False
+        if dry_run:
+            print(f"Dry run: would delete S3 bucket '{bucket_name}'.")
+            return True
+        # Delete the bucket
+        s3_client.delete_bucket(Bucket=bucket_name)
+        waiter = s3_client.get_waiter('bucket_not_exists')
+        waiter.wait(Bucket=bucket_name)
+        print(f"Success: S3 bucket '{bucket_name}' deleted.")
+        return True
     except Exception as e:
         print(f"Error deleting S3 bucket: {e}")
-        sys.exit(1)
+        return False
 
 
 # Function to delete DynamoDB table
-def delete_dynamodb_table(table_name):
+def delete_dynamodb_table(table_name, dry_run=False):
     try:
+        if dry_run:
+            dynamodb_client.describe_table(TableName=table_name)
+            print(f"Dry run: would delete DynamoDB table '{table_name}'.")
+            return True
         dynamodb_client.delete_table(TableName=table_name)
         waiter = dynamodb_client.get_waiter('table_not_exists')
-        waiter.wait(TableName=table_name)
+        waiter.wait(TableName=table_name, WaiterConfig={'Delay': 5, 'MaxAttempts': 60})
         print(f"Success: DynamoDB table '{table_name}' deleted.")
+        return True
     except Exception as e:
         print(f"Error deleting DynamoDB table: {e}")
-        sys.exit(1)
+        return False
 
 
 # Main function
 def main():
+    parser = argparse.ArgumentParser(description="Delete the Terraform backend S3 bucket (every version) and DynamoDB lock table.")
+    parser.add_argument("--dry-run", action="store_true", help="List what would be deleted without deleting anything")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent DeleteObjects requests (default 8)")
+    args = parser.parse_args()
+
     # Load ARNs from file
     if not os.path.exists(resource_arn_file):
         print(f"Error: {resource_arn_file} does not exist.")
@@ -88,13 +118,15 @@ def main():
         print("Error: Invalid ARNs in resource ARN file.")
         sys.exit(1)
 
-    # Delete S3 bucket
     bucket_name = s3_bucket_arn.split(":::")[1]
-    delete_s3_bucket(bucket_name)
-
-    # Delete DynamoDB table
     table_name = dynamodb_table_arn.split(":table/")[1]
-    delete_dynamodb_table(table_name)
+
+    # Delete the S3 bucket and the DynamoDB table concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        bucket_deleted = executor.submit(delete_s3_bucket, bucket_name, args.workers, args.dry_run)
+        table_deleted = executor.submit(delete_dynamodb_table, table_name, args.dry_run)
+        if not (bucket_deleted.result() and table_deleted.result()):
+            sys.exit(1)
 
 
 if __name__ == "__main__":
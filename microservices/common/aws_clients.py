@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import boto3
+
+from common.circuit_breaker import instrument_boto3_client
+from common.tracing import trace_boto3_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGION = os.getenv("AWS_REGION", "us-west-2")
+
+
+class AwsClients:
+    """
+    Lazily constructed, thread-safe container for the boto3 clients and resources a service uses.
+
+    Nothing talks to AWS until a client is first requested, so the service modules can be
+    imported without credentials. Each client is built once, on its own boto3 session,
+    which makes it safe to build several of them in parallel (see warm()).
+
+    Args:
+        breakers (dict, optional): Client name ("dynamodb", "sns", ...) -> CircuitBreaker every call of
+            that client goes through.
+        tracer (Tracer, optional): Records a span for every call made inside a traced block.
+    """
+
+    def __init__(self, region_name=DEFAULT_REGION, breakers=None, tracer=None):
+        self.region_name = region_name
+        self.breakers = breakers or {}
+        self.tracer = tracer
+        self._instances = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _get(self, key, factory):
+        instance = self._instances.get(key)
+        if instance is not None:
+            return instance
+        with self._lock_for(key):
+            instance = self._instances.get(key)
+            if instance is None:
+                instance = factory(boto3.session.Session(region_name=self.region_name))
+                # A resource routes its calls through its low-level client
+                client = getattr(instance.meta, "client", instance)
+                breaker = self.breakers.get(key)
+                if breaker is not None:
+                    instrument_boto3_client(client, breaker)
+                if self.tracer is not None and not key.startswith("table:"):
+                    trace_boto3_client(client, self.tracer)
+                self._instances[key] = instance
+        return instance
+
+    def dynamodb(self):
+        return self._get("dynamodb", lambda session: session.resource("dynamodb"))
+
+    def table(self, table_name):
+        return self._get(f"table:{table_name}", lambda session: self.dynamodb().Table(table_name))
+
+    def dynamodbstreams(self):
+        return self._get("dynamodbstreams", lambda session: session.client("dynamodbstreams"))
+
+    def sns(self):
+        return self._get("sns", lambda session: session.client("sns"))
+
+    def s3(self):
+        return self._get("s3", lambda session: session.client("s3"))
+
+    def secretsmanager(self):
+        return self._get("secretsmanager", lambda session: session.client("secretsmanager"))
+
+    def warm(self, *names, table_names=()):
+        """
+        Build the named clients ("dynamodb", "sns", "s3", "secretsmanager") and tables concurrently.
+
+        Returns:
+            dict: Seconds spent building each client, keyed by name.
+        """
+        jobs = {name: getattr(self, name) for name in names}
+        for table_name in table_names:
+            jobs[f"table:{table_name}"] = lambda table_name=table_name: self.table(table_name)
+
+        def timed(job):
+            started = time.perf_counter()
+            job()
+            return time.perf_counter() - started
+
+        if not jobs:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = {name: executor.submit(timed, job) for name, job in jobs.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def reset(self):
+        """
+        Drop every cached client so the next call rebuilds it (used by tests).
+        """
+        with self._locks_guard:
+            self._instances.clear()
+
+
+class StartupTimer:
+    """
+    Records how long each startup phase took and logs a one-line summary.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def total(self):
+        return time.perf_counter() - self._started
+
+    def report(self, service_name):
+        timings = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        logger.info(f"{service_name} startup took {self.total() * 1000:.0f}ms ({timings})")
+        return {"total": self.total(), **self.phases}
+
+
+def is_conditional_check_failure(error):
+    """
+    Return True if a boto3 ClientError was caused only by failed condition expressions
+    (a plain conditional write, or a transaction cancelled by its conditions).
+    """
+    response = getattr(error, "response", None) or {}
+    code = response.get("Error", {}).get("Code")
+    if code == "ConditionalCheckFailedException":
+        return True
+    if code == "TransactionCanceledException":
+        reasons = [reason.get("Code", "None") for reason in response.get("CancellationReasons", [])]
+        return "ConditionalCheckFailed" in reasons and all(reason in ("None", "ConditionalCheckFailed") for reason in reasons)
+    return False
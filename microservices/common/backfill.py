@@ -0,0 +1,307 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from common.aws_clients import AwsClients
+from common.incident_model import Incident
+from common.latency import seconds_between
+from common.lifecycle import CLOSED_GITHUB_STATUSES, EXPIRE_AFTER_SECONDS, closing_attributes
+from common.storage import storage_from_env
+
+logger = logging.getLogger(__name__)
+
+TEST_FLOW = os.getenv("TEST_FLOW", "false").lower() == "true"
+GITHUB_TABLE_NAME = os.getenv("GITHUB_TABLE_NAME", "TestGithubIncidents" if TEST_FLOW else "GithubIncidents")
+STATUSPAGE_URL = os.getenv("STATUSPAGE_URL", "https://www.githubstatus.com")
+HISTORY_PATH = "/api/v2/incidents.json"  # Newest first, one page per ?page=N
+DETAIL_PATH = "/api/v2/incidents/{incident_id}.json"
+
+DETAIL_WORKERS = 16  # Concurrent Statuspage detail requests (and existence checks)
+WRITE_WORKERS = 4  # Concurrent batch writes to the GitHub table
+WRITE_BATCH_SIZE = 100  # Incidents per write task
+MAX_PENDING_PAGES = 8  # Pages whose writes may be in flight before listing waits for them
+
+
+def retention_attributes(incident, now=None):
+    """
+    The closing attributes (see common.lifecycle.closing_attributes) of an incident closed in the past, stamped
+    from its resolved_at (else updated_at, else created_at) rather than the time it is loaded. An old incident
+    is therefore due for archiving at once; its expires_at is kept at least EXPIRE_AFTER_SECONDS away, so the
+    TTL backstop does not delete it before the archiver has run.
+    """
+    now = time.time() if now is None else now
+    closed = now
+    for value in (incident.resolved_at, incident.updated_at, incident.created_at):
+        try:
+            closed = min(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp(), now)
+            break
+        except (AttributeError, TypeError, ValueError):
+            continue
+    attributes = closing_attributes(closed)
+    attributes["expires_at"] = max(attributes["expires_at"], int(now + EXPIRE_AFTER_SECONDS))
+    return attributes
+
+
+class _Sessions(threading.local):
+    """
+    One requests session per thread (sessions are not safe to share between threads).
+    """
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/json"})
+
+
+class HistoryBackfill:
+    """
+    Loads the closed incidents of a Statuspage incident history into the GitHub incidents table.
+
+    The history is listed newest first, page by page. For each page the incidents not in the table yet
+    are fetched in full concurrently, normalized like the monitor's summary (Incident.from_statuspage)
+    and written in batches by a pool of writers while the next pages are listed. Open incidents are
+    skipped: the monitor logs those itself, with the escalation record the notifier needs. No
+    escalation (CyberArk) records are written, so nothing is posted to Slack or paged. Each incident
+    gets archive_at/expires_at from its resolution time (see retention_attributes) and is only written
+    if it is still missing, so a record the monitor wrote meanwhile is never overwritten.
+
+    After every page whose writes (and those of all previous pages) succeeded, the next page to list is
+    saved to checkpoint_path, so an interrupted backfill resumes where it stopped.
+
+    Args:
+        storage: Incident storage (see common.storage).
+        table_name (str): The GitHub incidents table.
+        since (str, optional): ISO 8601 time; the backfill stops at incidents created before it.
+        max_pages (int, optional): Stop after this many pages.
+        fetch_details (bool): Fetch each incident's own JSON (all updates and components); otherwise the
+            listed entries are loaded as they are.
+        get_json (callable, optional): url -> decoded JSON; defaults to a GET with a per-thread session.
+    """
+
+    def __init__(self, storage, table_name, base_url=STATUSPAGE_URL, workers=DETAIL_WORKERS, write_workers=WRITE_WORKERS,
+                 batch_size=WRITE_BATCH_SIZE, checkpoint_path=None, since=None, max_pages=None, fetch_details=True,
+                 dry_run=False, get_json=None):
+        if since and seconds_between(since, since) is None:
+            raise ValueError(f"since must be an ISO 8601 time, got {since!r}")
+        self.storage = storage
+        self.table_name = table_name
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self.write_workers = write_workers
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.since = since
+        self.max_pages = max_pages
+        self.fetch_details = fetch_details
+        self.dry_run = dry_run
+        self.get_json = get_json or self._get_json
+        self._sessions = _Sessions()
+        self._counts_lock = threading.Lock()
+        self.counts = {
+            "pages": 0, "listed": 0, "skipped_open": 0, "skipped_existing": 0, "details": 0, "detail_failures": 0,
+            "written": 0, "write_failures": 0,
+        }
+        self.timings = {"list": 0.0, "details": 0.0}
+        self.next_page = 1  # First page not written yet
+
+    def _get_json(self, url):
+        response = self._sessions.session.get(url, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def _count(self, name, amount=1):
+        with self._counts_lock:
+            self.counts[name] += amount
+
+    def load_checkpoint(self):
+        """
+        Returns:
+            int: The page to start from (1 without a checkpoint).
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 1
+        with open(self.checkpoint_path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        logger.info(f"Resuming the backfill at page {checkpoint['next_page']} ({checkpoint.get('written', 0)} incidents written before).")
+        return int(checkpoint["next_page"])
+
+    def save_checkpoint(self, next_page):
+        if not self.checkpoint_path or self.dry_run:
+            return
+        temporary_path = f"{self.checkpoint_path}.tmp"
+        with open(temporary_path, "w") as checkpoint_file:
+            json.dump({"next_page": next_page, "written": self.counts["written"], "saved_at": time.time()}, checkpoint_file)
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def list_page(self, page):
+        """
+        Returns:
+            list[dict]: The incidents of one history page (empty past the end).
+        """
+        started = time.perf_counter()
+        try:
+            return self.get_json(f"{self.base_url}{HISTORY_PATH}?page={page}").get("incidents") or []
+        finally:
+            self.timings["list"] += time.perf_counter() - started
+
+    def normalize(self, item):
+        """
+        Return the incident to load for a listed item, or None if it is open or already stored.
+        """
+        if str(item.get("status", "")).lower() not in CLOSED_GITHUB_STATUSES:
+            self._count("skipped_open")
+            return None
+        if self.storage.get(self.table_name, item["id"]) is not None:
+            self._count("skipped_existing")
+            return None
+        if self.fetch_details:
+            try:
+                detail = self.get_json(f"{self.base_url}{DETAIL_PATH.format(incident_id=item['id'])}")
+                item = detail.get("incident", detail)
+                self._count("details")
+            except (requests.exceptions.RequestException, ValueError) as detail_error:
+                # The listed entry is loaded instead; it may lack older updates
+                logger.warning(f"Failed to fetch incident {item['id']}: {detail_error}")
+                self._count("detail_failures")
+        return Incident.from_statuspage(item, (component["name"] for component in item.get("components") or ()))
+
+    def write_batch(self, incidents):
+        if self.dry_run:
+            self._count("written", len(incidents))
+            return
+        now = time.time()
+        items = [{**incident.to_item(), **retention_attributes(incident, now)} for incident in incidents]
+        written = self.storage.put_missing(self.table_name, items)
+        self._count("written", written)
+        # Written by the monitor since normalize checked
+        self._count("skipped_existing", len(items) - written)
+
+    def run(self):
+        """
+        Run the backfill to the end of the history (or since / max_pages).
+
+        Returns:
+            dict: The throughput report (see report()).
+        """
+        started = time.perf_counter()
+        page = first_page = self.next_page = self.load_checkpoint()
+        seen = set()
+        pending = []  # (page, write futures) in page order
+        failed = False
+        with ThreadPoolExecutor(max_workers=self.workers) as detail_pool, \
+                ThreadPoolExecutor(max_workers=self.write_workers) as write_pool:
+            while self.max_pages is None or page < first_page + self.max_pages:
+                try:
+                    items = self.list_page(page)
+                except (requests.exceptions.RequestException, ValueError) as list_error:
+                    logger.error(f"Failed to list backfill page {page}: {list_error}")
+                    failed = True
+                    break
+                # Past the end some Statuspage deployments repeat the last page instead of returning nothing
+                items = [item for item in items if item["id"] not in seen]
+                if not items:
+                    break
+                seen.update(item["id"] for item in items)
+                reached_since = bool(self.since) and any(self.created_before_since(item) for item in items)
+                if reached_since:
+                    items = [item for item in items if not self.created_before_since(item)]
+                self._count("pages")
+                self._count("listed", len(items))
+
+                details_started = time.perf_counter()
+                try:
+                    incidents = [incident for incident in detail_pool.map(self.normalize, items) if incident is not None]
+                except Exception as normalize_error:
+                    logger.error(f"Failed to prepare backfill page {page}: {normalize_error}")
+                    failed = True
+                    break
+                finally:
+                    self.timings["details"] += time.perf_counter() - details_started
+                pending.append((page, [write_pool.submit(self.write_batch, incidents[start:start + self.batch_size])
+                                       for start in range(0, len(incidents), self.batch_size)]))
+                logger.info(f"Backfill page {page}: {len(items)} listed, {len(incidents)} to write.")
+                page += 1
+                failed = self._advance_checkpoint(pending, wait=len(pending) >= MAX_PENDING_PAGES) or failed
+                if reached_since or failed:
+                    break
+            failed = self._advance_checkpoint(pending, wait=True) or failed
+        report = self.report(time.perf_counter() - started)
+        report["next_page"] = self.next_page
+        report["complete"] = not failed
+        return report
+
+    def created_before_since(self, item):
+        elapsed = seconds_between(self.since, item.get("created_at"))
+        return elapsed is not None and elapsed < 0
+
+    def _advance_checkpoint(self, pending, wait):
+        """
+        Checkpoint past every leading page whose writes are done; with wait, wait for the oldest ones.
+
+        Returns:
+            bool: True if a write failed (the checkpoint then stays before its page).
+        """
+        while pending and (wait or all(future.done() for future in pending[0][1])):
+            page, futures = pending[0]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as write_error:
+                    logger.error(f"Failed to write backfill page {page}: {write_error}")
+                    self._count("write_failures")
+                    pending.clear()
+                    return True
+            pending.pop(0)
+            self.next_page = page + 1
+            self.save_checkpoint(self.next_page)
+        return False
+
+    def report(self, seconds):
+        """
+        Returns:
+            dict: The counts, the elapsed seconds, the time spent listing and fetching details, and the
+                incidents written per second.
+        """
+        return {
+            **self.counts,
+            "seconds": round(seconds, 3),
+            "list_seconds": round(self.timings["list"], 3),
+            "detail_seconds": round(self.timings["details"], 3),
+            "written_per_second": round(self.counts["written"] / seconds, 1) if seconds else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the closed incidents of the GitHub status history into the GitHub incidents table.")
+    parser.add_argument("--table", default=GITHUB_TABLE_NAME)
+    parser.add_argument("--url", default=STATUSPAGE_URL, help="Statuspage base URL")
+    parser.add_argument("--since", help="Stop at incidents created before this ISO 8601 time")
+    parser.add_argument("--max-pages", type=int)
+    parser.add_argument("--workers", type=int, default=DETAIL_WORKERS, help="Concurrent detail requests")
+    parser.add_argument("--write-workers", type=int, default=WRITE_WORKERS, help="Concurrent batch writes")
+    parser.add_argument("--batch-size", type=int, default=WRITE_BATCH_SIZE)
+    parser.add_argument("--checkpoint", help="Resume from and save progress to this file")
+    parser.add_argument("--no-details", action="store_true", help="Load the listed entries without fetching each incident")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+
+    backfill = HistoryBackfill(
+        storage_from_env(AwsClients(region_name="us-west-2")), args.table, args.url, args.workers, args.write_workers,
+        args.batch_size, args.checkpoint, args.since, args.max_pages, not args.no_details, args.dry_run,
+    )
+    report = backfill.run()
+    print(json.dumps(report, indent=2))
+    if not report["complete"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import logging
+import os
+import queue
+import time
+
+from common.incident_model import decode_attribute
+from common.storage import AttributeMissing, ConditionFailed, Equals, LessThan
+
+logger = logging.getLogger(__name__)
+
+INSERT = "INSERT"
+MODIFY = "MODIFY"
+REMOVE = "REMOVE"
+
+# DynamoDB Streams throttles more than 2 concurrent readers per shard, and 5 GetRecords calls per second per shard
+# in total: at most MAX_STREAM_READERS replicas read a stream (see ReaderSlots), each every READ_INTERVAL seconds
+MAX_STREAM_READERS = int(os.getenv("MAX_STREAM_READERS", 2))
+READ_INTERVAL = 0.5
+STREAM_READER_LEASE_SECONDS = 60
+READER_SLOT_PREFIX = "stream-reader-"
+# Recoverable GetRecords errors: the iterator is over 15 minutes old, or its position was trimmed (over 24 hours old)
+EXPIRED_ITERATOR = "ExpiredIteratorException"
+TRIMMED_DATA = "TrimmedDataAccessException"
+
+
+def _error_code(error):
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code")
+
+
+class ChangeEvent:
+    """
+    One item-level change to an incidents table.
+
+    Attributes:
+        table_name (str): Table the change was made to.
+        event_name (str): INSERT, MODIFY or REMOVE.
+        incident_id (str): Key of the changed item.
+        new_image (dict): The item after the change (None for REMOVE).
+        sequence_number (str): Position of the change in its shard (ordering within one item).
+    """
+    __slots__ = ("table_name", "event_name", "incident_id", "new_image", "sequence_number")
+
+    def __init__(self, table_name, event_name, incident_id, new_image=None, sequence_number=""):
+        self.table_name = table_name
+        self.event_name = event_name
+        self.incident_id = incident_id
+        self.new_image = new_image
+        self.sequence_number = sequence_number
+
+    @classmethod
+    def from_stream_record(cls, table_name, record):
+        """
+        Build an event from a DynamoDB Streams record (attribute-value encoded images).
+        """
+        change = record["dynamodb"]
+        new_image = change.get("NewImage")
+        return cls(
+            table_name=table_name,
+            event_name=record["eventName"],
+            incident_id=decode_attribute(change["Keys"]["incident_id"]),
+            new_image={key: decode_attribute(value) for key, value in new_image.items()} if new_image else None,
+            sequence_number=change.get("SequenceNumber", ""),
+        )
+
+    def __repr__(self):
+        return f"ChangeEvent({self.table_name}, {self.event_name}, {self.incident_id})"
+
+
+class LocalChangeFeed:
+    """
+    In-process change feed (stand-in for DynamoDB Streams in tests and single-process runs).
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def publish(self, event):
+        self._queue.put(event)
+
+    def poll(self, timeout=1.0):
+        """
+        Wait up to timeout seconds for changes and return every change available.
+
+        Returns:
+            list[ChangeEvent]: The changes in the order they were published (empty on timeout).
+        """
+        try:
+            events = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        pass
+
+
+class DynamoDBStreamFeed:
+    """
+    Change feed over the DynamoDB Streams of one or more tables.
+
+    Reading starts at the tip of every open shard (changes made before the feed was created
+    are left to reconciliation). Shards created later, when DynamoDB splits or rolls over a
+    shard, are discovered every SHARD_REFRESH_INTERVAL seconds and read from their start.
+
+    A shard that fails to read does not cost the changes already read from the others. An
+    expired iterator is recreated after the last change read from its shard (or at the tip, if
+    none was read yet), and one whose position was trimmed restarts at the oldest change kept.
+    """
+
+    SHARD_REFRESH_INTERVAL = 60
+
+    def __init__(self, streams_client, stream_arns, records_limit=1000):
+        """
+        Args:
+            streams_client: boto3 "dynamodbstreams" client.
+            stream_arns (dict): Table name -> stream ARN (the table's LatestStreamArn).
+            records_limit (int): Maximum records read per shard and poll.
+        """
+        self.client = streams_client
+        self.stream_arns = dict(stream_arns)
+        self.records_limit = records_limit
+        self._iterators = {}  # (table_name, shard_id) -> shard iterator, None once the shard is exhausted
+        self._positions = {}  # (table_name, shard_id) -> sequence number of the last change read
+        self._next_refresh = 0
+        self._refresh_shards(initial=True)
+
+    @classmethod
+    def for_tables(cls, aws, table_names):
+        """
+        Build a feed over the streams of the given tables (which must have streams enabled).
+        """
+        stream_arns = {}
+        for table_name in table_names:
+            stream_arn = aws.table(table_name).latest_stream_arn
+            if not stream_arn:
+                raise RuntimeError(f"DynamoDB stream is not enabled on table {table_name}")
+            stream_arns[table_name] = stream_arn
+        return cls(aws.dynamodbstreams(), stream_arns)
+
+    def _shards(self, stream_arn):
+        kwargs = {"StreamArn": stream_arn}
+        while True:
+            description = self.client.describe_stream(**kwargs)["StreamDescription"]
+            yield from description.get("Shards", [])
+            if not description.get("LastEvaluatedShardId"):
+                return
+            kwargs["ExclusiveStartShardId"] = description["LastEvaluatedShardId"]
+
+    def _refresh_shards(self, initial=False):
+        for table_name, stream_arn in self.stream_arns.items():
+            for shard in self._shards(stream_arn):
+                key = (table_name, shard["ShardId"])
+                if key in self._iterators:
+                    continue
+                open_shard = "EndingSequenceNumber" not in shard.get("SequenceNumberRange", {})
+                if initial and not open_shard:
+                    # Closed before we started: everything in it predates the feed
+                    self._iterators[key] = None
+                    continue
+                self._iterators[key] = self.client.get_shard_iterator(
+                    StreamArn=stream_arn,
+                    ShardId=shard["ShardId"],
+                    ShardIteratorType="LATEST" if initial else "TRIM_HORIZON",
+                )["ShardIterator"]
+        self._next_refresh = time.monotonic() + self.SHARD_REFRESH_INTERVAL
+
+    def _recover_iterator(self, key, code):
+        table_name, shard_id = key
+        kwargs = {"StreamArn": self.stream_arns[table_name], "ShardId": shard_id}
+        if code == TRIMMED_DATA:
+            kwargs["ShardIteratorType"] = "TRIM_HORIZON"
+        elif self._positions.get(key):
+            kwargs.update(ShardIteratorType="AFTER_SEQUENCE_NUMBER", SequenceNumber=self._positions[key])
+        else:
+            # Nothing read from the shard yet: changes before the tip are left to reconciliation
+            kwargs["ShardIteratorType"] = "LATEST"
+        try:
+            self._iterators[key] = self.client.get_shard_iterator(**kwargs)["ShardIterator"]
+            logger.warning(f"Shard {shard_id} of {table_name}: {code}, reading again from {kwargs['ShardIteratorType']}.")
+        except Exception as iterator_error:
+            logger.error(f"Failed to recreate the iterator of shard {shard_id} of {table_name}: {iterator_error}")
+
+    def _read_shards(self):
+        """
+        Read every shard once.
+
+        Raises:
+            Exception: The first error, if every shard failed to read.
+        """
+        events = []
+        errors = []
+        for key, iterator in list(self._iterators.items()):
+            if iterator is None:
+                continue
+            try:
+                response = self.client.get_records(ShardIterator=iterator, Limit=self.records_limit)
+            except Exception as read_error:
+                code = _error_code(read_error)
+                if code in (EXPIRED_ITERATOR, TRIMMED_DATA):
+                    self._recover_iterator(key, code)
+                else:
+                    logger.warning(f"Failed to read shard {key[1]} of {key[0]}: {read_error}")
+                    errors.append(read_error)
+                continue
+            # A closed shard returns no NextShardIterator once it has been read to the end
+            self._iterators[key] = response.get("NextShardIterator")
+            records = response.get("Records", [])
+            if records:
+                self._positions[key] = records[-1]["dynamodb"].get("SequenceNumber") or self._positions.get(key)
+            events.extend(ChangeEvent.from_stream_record(key[0], record) for record in records)
+        if errors and not events and len(errors) == len([iterator for iterator in self._iterators.values() if iterator]):
+            raise errors[0]
+        return events
+
+    def poll(self, timeout=1.0):
+        """
+        Return the changes written since the last poll, waiting up to timeout seconds for some.
+
+        Returns:
+            list[ChangeEvent]: The new changes, in order within each shard (empty on timeout).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if time.monotonic() >= self._next_refresh:
+                self._refresh_shards()
+            events = self._read_shards()
+            if events or time.monotonic() >= deadline:
+                return events
+            time.sleep(min(READ_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+    def close(self):
+        self._iterators.clear()
+
+
+class ReaderSlots:
+    """
+    Caps the notifier replicas reading the change streams at `slots` (MAX_STREAM_READERS).
+
+    Each reader holds the lease of one slot, an item "stream-reader-<n>" of a dedicated lease table (without
+    a stream, so renewals are not changes to read), and renews it while reading. A replica without a slot
+    stands by and takes over the slot of a reader that stopped renewing it. If the lease table cannot be
+    written at all, replicas read anyway: more readers than the limit are throttled, but none are lost.
+
+    Args:
+        storage: Incident storage (see common.storage).
+        table_name (str): The lease table (LEASE_TABLE_NAME).
+        owner (str): This replica's id.
+    """
+
+    def __init__(self, storage, table_name, owner, slots=MAX_STREAM_READERS, lease_seconds=STREAM_READER_LEASE_SECONDS):
+        self.storage = storage
+        self.table_name = table_name
+        self.owner = owner
+        self.slots = slots
+        self.lease_seconds = lease_seconds
+        self.slot = None  # The slot held, if any
+
+    def acquire(self):
+        """
+        Renew the slot held, or take a free (or expired) one.
+
+        Returns:
+            bool: True if this replica holds a slot.
+        """
+        now = time.time()
+        free = AttributeMissing("lease_owner") | Equals("lease_owner", self.owner) | LessThan("lease_expires_at", int(now))
+        candidates = [self.slot] if self.slot is not None else range(self.slots)
+        for slot in candidates:
+            try:
+                self.storage.update(self.table_name, f"{READER_SLOT_PREFIX}{slot}", {
+                    "lease_owner": self.owner, "lease_expires_at": int(now + self.lease_seconds),
+                }, condition=free)
+            except ConditionFailed:
+                continue
+            except Exception as lease_error:
+                logger.error(f"Failed to lease a stream reader slot, reading without one: {lease_error}")
+                return True
+            if self.slot is None:
+                logger.info(f"Reading the change streams as reader {slot} of {self.slots}.")
+            self.slot = slot
+            return True
+        if self.slot is not None:
+            logger.warning(f"Lost stream reader slot {self.slot}.")
+        self.slot = None
+        return False
+
+    def release(self):
+        if self.slot is None:
+            return
+        try:
+            self.storage.update(self.table_name, f"{READER_SLOT_PREFIX}{self.slot}", {"lease_expires_at": 0},
+                                condition=Equals("lease_owner", self.owner))
+        except ConditionFailed:
+            pass
+        self.slot = None
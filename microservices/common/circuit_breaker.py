@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = Gauge("circuit_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ["breaker"])
+BREAKER_CALLS = Counter("circuit_breaker_calls_total", "Calls through a circuit breaker by outcome", ["breaker", "outcome"])
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling a dependency whose circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for calls to one dependency (GitHub, Slack, DynamoDB).
+
+    Closed: calls go through and their outcomes are counted in a sliding window of window_seconds.
+    When at least minimum_calls were made in the window and the failure rate reaches
+    failure_rate_threshold, the circuit opens.
+    Open: calls fail immediately with CircuitOpenError for open_seconds.
+    Half-open: up to half_open_calls trial calls go through; if they all succeed the circuit
+    closes, a failure opens it again.
+    """
+
+    def __init__(self, name, failure_rate_threshold=0.5, minimum_calls=5, window_seconds=60, open_seconds=30,
+                 half_open_calls=1, clock=time.monotonic):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets = deque()  # [second, successes, failures], oldest first
+        self._opened_at = 0.0
+        self._trials = 0  # trial calls started while half-open
+        self._trial_successes = 0
+        self._state = CLOSED
+        BREAKER_STATE.labels(breaker=name).set(_STATE_VALUES[CLOSED])
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _set_state(self, state):
+        if state == self._state:
+            return
+        logger.warning(f"Circuit breaker '{self.name}' {self._state} -> {state}")
+        self._state = state
+        BREAKER_STATE.labels(breaker=self.name).set(_STATE_VALUES[state])
+        if state == OPEN:
+            self._opened_at = self._clock()
+        elif state == HALF_OPEN:
+            self._trials = self._trial_successes = 0
+        else:
+            self._buckets.clear()
+
+    def _refresh_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._set_state(HALF_OPEN)
+
+    def _window_counts(self, now):
+        while self._buckets and self._buckets[0][0] <= now - self.window_seconds:
+            self._buckets.popleft()
+        successes = sum(bucket[1] for bucket in self._buckets)
+        failures = sum(bucket[2] for bucket in self._buckets)
+        return successes, failures
+
+    def before_call(self):
+        """
+        Reserve a call, or raise CircuitOpenError if the circuit does not allow one now.
+        """
+        with self._lock:
+            self._refresh_state()
+            if self._state == OPEN or (self._state == HALF_OPEN and self._trials >= self.half_open_calls):
+                BREAKER_CALLS.labels(breaker=self.name, outcome="rejected").inc()
+                raise CircuitOpenError(f"Circuit breaker '{self.name}' is open")
+            if self._state == HALF_OPEN:
+                self._trials += 1
+
+    def record_success(self):
+        BREAKER_CALLS.labels(breaker=self.name, outcome="success").inc()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trial_successes += 1
+                if self._trial_successes >= self.half_open_calls:
+                    self._set_state(CLOSED)
+                return
+            self._count(success=True)
+
+    def record_failure(self):
+        BREAKER_CALLS.labels(breaker=self.name, outcome="failure").inc()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._set_state(OPEN)
+                return
+            if self._state == OPEN:
+                return
+            successes, failures = self._count(success=False)
+            calls = successes + failures
+            if calls >= self.minimum_calls and failures / calls >= self.failure_rate_threshold:
+                self._set_state(OPEN)
+
+    def _count(self, success):
+        now = self._clock()
+        second = int(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        self._buckets[-1][1 if success else 2] += 1
+        return self._window_counts(now)
+
+    def call(self, func, *args, is_failure=None, **kwargs):
+        """
+        Call func through the breaker.
+
+        Args:
+            is_failure (callable, optional): is_failure(exception) -> bool; exceptions it rejects are
+                re-raised but counted as successful calls (e.g. a failed DynamoDB condition).
+
+        Raises:
+            CircuitOpenError: If the circuit is open; func is not called.
+        """
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as call_error:
+            if is_failure is None or is_failure(call_error):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+
+def is_http_failure(error):
+    """
+    Failure predicate for HTTP calls: connection errors, timeouts, 5xx and 429 responses.
+    """
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    return status_code is None or status_code >= 500 or status_code == 429
+
+
+def instrument_boto3_client(client, breaker):
+    """
+    Route every API call of a boto3 client through a circuit breaker, using botocore events.
+
+    Server errors, throttling and connection failures count as failures; client errors such as a
+    failed condition expression are the dependency working as intended and count as successes.
+    """
+    service = client.meta.service_model.service_id.hyphenize()
+
+    def before_call(**kwargs):
+        breaker.before_call()
+
+    def after_call(http_response=None, parsed=None, **kwargs):
+        parsed = parsed or {}
+        status_code = getattr(http_response, "status_code", None) or parsed.get("ResponseMetadata", {}).get("HTTPStatusCode", 200)
+        error_code = parsed.get("Error", {}).get("Code", "")
+        if status_code >= 500 or "Throttl" in error_code or error_code == "ProvisionedThroughputExceededException":
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def after_call_error(**kwargs):
+        breaker.record_failure()
+
+    client.meta.events.register_first(f"before-call.{service}", before_call)
+    client.meta.events.register(f"after-call.{service}", after_call)
+    client.meta.events.register(f"after-call-error.{service}", after_call_error)
+    return client
@@ -0,0 +1,91 @@
+import os
+import time
+from datetime import datetime, timezone
+
+
+class SystemClock:
+    """
+    Wall-clock time, as used in normal operation.
+    """
+    speed = 1.0
+
+    def now(self):
+        """
+        Current time in epoch seconds.
+        """
+        return time.time()
+
+    def utcnow(self):
+        return datetime.fromtimestamp(self.now(), timezone.utc)
+
+    def monotonic(self):
+        """
+        Monotonic seconds, advancing at the clock's speed (for measuring intervals).
+        """
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def wait(self, event, seconds):
+        """
+        Wait on a threading.Event for a duration measured on this clock.
+
+        Returns:
+            bool: True if the event was set.
+        """
+        return event.wait(seconds)
+
+    def to_real(self, seconds):
+        """
+        Convert a duration on this clock to real seconds.
+        """
+        return seconds
+
+
+class ScaledClock(SystemClock):
+    """
+    Virtual time that runs `speed` times faster than real time.
+
+    Virtual time equals `origin` at real epoch time `real_origin`. Processes given the same
+    origin, real_origin and speed (CLOCK_ORIGIN, CLOCK_REAL_ORIGIN, CLOCK_SPEED) share the same
+    virtual time, which is how a replay drives the monitor and the notifier together.
+    """
+
+    def __init__(self, origin, speed, real_origin=None):
+        self.origin = float(origin)
+        self.speed = float(speed)
+        self.real_origin = time.time() if real_origin is None else float(real_origin)
+        self._monotonic_origin = time.monotonic() - (time.time() - self.real_origin)
+
+    def now(self):
+        return self.origin + (time.time() - self.real_origin) * self.speed
+
+    def monotonic(self):
+        return (time.monotonic() - self._monotonic_origin) * self.speed
+
+    def sleep(self, seconds):
+        time.sleep(max(0.0, seconds) / self.speed)
+
+    def wait(self, event, seconds):
+        return event.wait(max(0.0, seconds) / self.speed)
+
+    def to_real(self, seconds):
+        return seconds / self.speed
+
+
+def clock_from_env(default_origin=None):
+    """
+    Build the clock configured by CLOCK_SPEED, CLOCK_ORIGIN and CLOCK_REAL_ORIGIN.
+
+    Without CLOCK_SPEED (or with a speed of 1 and no origin) this is the system clock.
+
+    Args:
+        default_origin (float, optional): Virtual start time used when CLOCK_ORIGIN is not set
+            (e.g. the first timestamp of a recording being replayed).
+    """
+    speed = float(os.getenv("CLOCK_SPEED", 1))
+    origin = os.getenv("CLOCK_ORIGIN") or default_origin
+    if speed == 1 and origin is None:
+        return SystemClock()
+    return ScaledClock(origin if origin is not None else time.time(), speed, os.getenv("CLOCK_REAL_ORIGIN") or None)
@@ -0,0 +1,230 @@
+import os
+import threading
+
+import numpy as np
+
+# Status codes stored in the history (Statuspage component statuses)
+STATUSES = ("operational", "degraded_performance", "partial_outage", "major_outage", "under_maintenance", "unknown")
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+OPERATIONAL = STATUS_CODES["operational"]
+MAINTENANCE = STATUS_CODES["under_maintenance"]
+UNKNOWN = STATUS_CODES["unknown"]
+
+# Upper bounds (seconds) of the outage duration histogram buckets; the last bucket is open ended
+DURATION_BUCKETS = (300, 900, 3600, 4 * 3600, 24 * 3600)
+DURATION_BUCKET_LABELS = ("<5m", "5m-15m", "15m-1h", "1h-4h", "4h-1d", ">1d")
+
+HISTORY_PATH = os.getenv("COMPONENT_HISTORY_PATH")
+HISTORY_SAVE_INTERVAL = int(os.getenv("COMPONENT_HISTORY_SAVE_INTERVAL", 900))
+
+
+class _Column:
+    """
+    Growable, array-backed column (amortized O(1) appends, contiguous for vectorized reads).
+    """
+
+    def __init__(self, dtype, values=None, capacity=1024):
+        values = np.asarray(values if values is not None else [], dtype=dtype)
+        self._data = np.empty(max(capacity, len(values) * 2), dtype=dtype)
+        self._data[:len(values)] = values
+        self.size = len(values)
+
+    def append(self, value):
+        if self.size == len(self._data):
+            grown = np.empty(len(self._data) * 2, dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size] = value
+        self.size += 1
+
+    def view(self):
+        # Later appends never write inside [0, size), so this view stays valid without a copy
+        return self._data[:self.size]
+
+
+class ComponentHistory:
+    """
+    Columnar history of GitHub component statuses.
+
+    Storage is change-point encoded: each monitoring cycle appends its timestamp to the cycle
+    column, and a (timestamp, component, status code) row is appended only when a component's
+    status differs from the previous cycle. A component's status between two of its rows is the
+    status of the earlier row; time not covered by monitoring cycles (the monitor was down or the
+    summary could not be read) is excluded from every report.
+
+    Attributes:
+        max_gap (float): Seconds between two cycles above which the time in between counts as not observed.
+    """
+
+    def __init__(self, max_gap):
+        self.max_gap = max_gap
+        self.component_ids = []  # component index -> component_id
+        self.component_names = []  # component index -> latest name
+        self._component_index = {}
+        self._last_status = []  # component index -> last recorded status code
+        self._cycles = _Column(np.int64)
+        self._times = _Column(np.int64)
+        self._components = _Column(np.int32)
+        self._statuses = _Column(np.int8)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._times.size
+
+    def record(self, timestamp, components):
+        """
+        Append one monitoring cycle.
+
+        Args:
+            timestamp (float): Epoch seconds of the cycle.
+            components (dict): component_id -> (name, status, group_id) for every component in the summary.
+        """
+        timestamp = int(timestamp)
+        with self._lock:
+            self._cycles.append(timestamp)
+            for component_id, (name, status, _) in components.items():
+                index = self._component_index.get(component_id)
+                if index is None:
+                    index = self._component_index[component_id] = len(self.component_ids)
+                    self.component_ids.append(component_id)
+                    self.component_names.append(name)
+                    self._last_status.append(-1)
+                self.component_names[index] = name
+                code = STATUS_CODES.get(status, UNKNOWN)
+                if code != self._last_status[index]:
+                    self._last_status[index] = code
+                    self._times.append(timestamp)
+                    self._components.append(index)
+                    self._statuses.append(code)
+
+    def _columns(self):
+        with self._lock:
+            return (self._cycles.view(), self._times.view(), self._components.view(), self._statuses.view(),
+                    list(self.component_ids), list(self.component_names))
+
+    def _unobserved_time(self, cycles, start, end):
+        """
+        Return (x, y) points of the cumulative unobserved time, to be evaluated with np.interp.
+
+        Unobserved time is before the first cycle, inside gaps longer than max_gap and after the last cycle.
+        """
+        gaps = np.flatnonzero(np.diff(cycles) > self.max_gap)
+        gap_starts = np.concatenate(([min(start, cycles[0])], cycles[gaps], [cycles[-1]])).astype(np.float64)
+        gap_ends = np.concatenate(([cycles[0]], cycles[gaps + 1], [max(end, cycles[-1])])).astype(np.float64)
+        lengths = gap_ends - gap_starts
+        before = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+        return np.column_stack((gap_starts, gap_ends)).ravel(), np.column_stack((before, before + lengths)).ravel()
+
+    def report(self, start, end, component_ids=None):
+        """
+        Compute uptime, time per status, MTTR and an outage duration histogram for every component.
+
+        Args:
+            start (float): Window start (epoch seconds, inclusive).
+            end (float): Window end (epoch seconds, exclusive).
+            component_ids (iterable, optional): Only report these components (ids or names).
+
+        Returns:
+            dict: component_id -> {name, uptime, observed_seconds, seconds_by_status, degraded_minutes,
+                outages, mttr_seconds, outage_duration_histogram}. uptime excludes maintenance time; outages,
+                MTTR and the histogram cover outages that recovered inside the window. uptime and mttr_seconds
+                are None when there is no observed time or no recovered outage.
+        """
+        cycles, times, components, statuses, ids, names = self._columns()
+        count = len(ids)
+        if not count or not len(cycles) or end <= start:
+            return {}
+
+        # Transitions grouped by component, in time order
+        order = np.lexsort((times, components))
+        t = times[order].astype(np.float64)
+        c = components[order].astype(np.int64)
+        s = statuses[order].astype(np.int64)
+        first_in_group = np.ones(len(t), dtype=bool)
+        first_in_group[1:] = c[1:] != c[:-1]
+        last_in_group = np.ones(len(t), dtype=bool)
+        last_in_group[:-1] = first_in_group[1:]
+
+        # Each row holds its status until the component's next row (or the last cycle)
+        next_t = np.empty_like(t)
+        next_t[:-1] = t[1:]
+        next_t[last_in_group] = float(cycles[-1])
+        clipped_start = np.clip(t, start, end)
+        clipped_end = np.clip(next_t, start, end)
+        gap_x, gap_y = self._unobserved_time(cycles, start, end)
+        unobserved = np.interp(clipped_end, gap_x, gap_y) - np.interp(clipped_start, gap_x, gap_y)
+        durations = np.maximum(clipped_end - clipped_start - unobserved, 0.0)
+
+        seconds = np.bincount(c * len(STATUSES) + s, weights=durations, minlength=count * len(STATUSES))
+        seconds = seconds.reshape(count, len(STATUSES))
+        known = seconds[:, :UNKNOWN].sum(axis=1)
+
+        # Outages: maximal runs of non-operational rows; recovered when an operational row follows
+        down = s != OPERATIONAL
+        previous_down = np.zeros(len(t), dtype=bool)
+        previous_down[1:] = down[:-1]
+        previous_down[first_in_group] = False
+        outage_start = down & ~previous_down
+        recovered = ~down & previous_down
+        outage_number = np.cumsum(outage_start) - 1
+        outage_started_at = t[outage_start]
+        recovery_rows = np.flatnonzero(recovered & (t >= start) & (t < end))
+        repair_seconds = t[recovery_rows] - outage_started_at[outage_number[recovery_rows]]
+        repaired_components = c[recovery_rows]
+        outages = np.bincount(repaired_components, minlength=count)
+        repair_total = np.bincount(repaired_components, weights=repair_seconds, minlength=count)
+        buckets = np.searchsorted(np.asarray(DURATION_BUCKETS, dtype=np.float64), repair_seconds, side="right")
+        histogram = np.bincount(repaired_components * len(DURATION_BUCKET_LABELS) + buckets,
+                                minlength=count * len(DURATION_BUCKET_LABELS)).reshape(count, len(DURATION_BUCKET_LABELS))
+
+        wanted = None if component_ids is None else set(component_ids)
+        report = {}
+        for index, component_id in enumerate(ids):
+            if wanted is not None and component_id not in wanted and names[index] not in wanted:
+                continue
+            observed = float(known[index])
+            # Scheduled maintenance counts as neither up nor down
+            accountable = observed - float(seconds[index, MAINTENANCE])
+            report[component_id] = {
+                "name": names[index],
+                "uptime": float(seconds[index, OPERATIONAL] / accountable) if accountable else None,
+                "observed_seconds": observed,
+                "seconds_by_status": {status: float(seconds[index, code]) for code, status in enumerate(STATUSES) if seconds[index, code]},
+                "degraded_minutes": float((accountable - seconds[index, OPERATIONAL]) / 60),
+                "outages": int(outages[index]),
+                "mttr_seconds": float(repair_total[index] / outages[index]) if outages[index] else None,
+                "outage_duration_histogram": dict(zip(DURATION_BUCKET_LABELS, histogram[index].tolist())),
+            }
+        return report
+
+    def save(self, path):
+        """
+        Write the history to path (NumPy .npz), atomically replacing any previous file.
+        """
+        cycles, times, components, statuses, ids, names = self._columns()
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as history_file:
+            np.savez(history_file, cycles=cycles, times=times, components=components, statuses=statuses,
+                     component_ids=np.asarray(ids, dtype=str), component_names=np.asarray(names, dtype=str))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path, max_gap):
+        """
+        Read a history written by save(), or return an empty history if the file does not exist.
+        """
+        history = cls(max_gap)
+        if not os.path.exists(path):
+            return history
+        with np.load(path) as saved:
+            history._cycles = _Column(np.int64, saved["cycles"])
+            history._times = _Column(np.int64, saved["times"])
+            history._components = _Column(np.int32, saved["components"])
+            history._statuses = _Column(np.int8, saved["statuses"])
+            history.component_ids = saved["component_ids"].tolist()
+            history.component_names = saved["component_names"].tolist()
+        history._component_index = {component_id: index for index, component_id in enumerate(history.component_ids)}
+        history._last_status = [-1] * len(history.component_ids)
+        for index, code in zip(history._components.view().tolist(), history._statuses.view().tolist()):
+            history._last_status[index] = code
+        return history
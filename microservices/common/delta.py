@@ -0,0 +1,144 @@
+from datetime import datetime, timezone
+
+# Incident attributes compared between cycles (ids and creation time never change)
+TRACKED_FIELDS = (
+    "impact",
+    "status",
+    "name",
+    "updated_at",
+    "resolved_at",
+    "last_update_id",
+    "last_update_body",
+    "affected_components",
+    "github_status",
+)
+RESOLVED_STATUSES = ("resolved", "postmortem")
+
+
+class IncidentDelta:
+    """
+    A change to one incident between two consecutive summaries.
+
+    Attributes:
+        kind (str): CREATED, UPDATED, RESOLVED or DISAPPEARED.
+        incident (Incident): The incident as currently known (for DISAPPEARED, its closing state).
+        changes (dict): Changed attribute names mapped to their new values (empty for CREATED).
+        component_transitions (tuple): (component name, old status, new status) for the incident's components.
+    """
+    __slots__ = ("kind", "incident", "changes", "component_transitions")
+
+    CREATED = "created"
+    UPDATED = "updated"
+    RESOLVED = "resolved"
+    DISAPPEARED = "disappeared"
+
+    def __init__(self, kind, incident, changes=None, component_transitions=()):
+        self.kind = kind
+        self.incident = incident
+        self.changes = changes or {}
+        self.component_transitions = tuple(component_transitions)
+
+    @property
+    def incident_id(self):
+        return self.incident.incident_id
+
+    def __repr__(self):
+        return f"IncidentDelta({self.kind}, {self.incident_id}, changes={self.changes}, components={self.component_transitions})"
+
+
+class DeltaEngine:
+    """
+    Compares each summary against the previous one and emits the incident deltas between them.
+
+    Faulty components without a GitHub incident get a fresh internal id every time the summary
+    is processed; the engine keeps the id of the ongoing outage per component, so the same
+    outage maps to the same incident for as long as the component stays non-operational.
+    """
+
+    def __init__(self):
+        self.incidents = {}  # incident_id -> Incident from the previous summary
+        self.components = {}  # component_id -> (name, status, group_id) from the previous summary
+        self.component_transitions = []  # All component transitions seen in the last diff
+
+    def _carry_over_identity(self, incidents):
+        by_component = {
+            incident.component_id: incident
+            for incident in self.incidents.values() if incident.component_id
+        }
+        for incident in incidents:
+            previous = by_component.get(incident.component_id) if incident.component_id else self.incidents.get(incident.incident_id)
+            if previous is None:
+                continue
+            incident.incident_id = previous.incident_id
+            incident.internal_incident_id = previous.internal_incident_id
+            incident.created_at = previous.created_at
+            if incident.component_id and incident.status == previous.status:
+                incident.updated_at = previous.updated_at
+
+    def diff(self, incidents, components, partial=False, now_time=None):
+        """
+        Diff the current summary against the previous one and remember it for the next call.
+
+        Args:
+            incidents (list[Incident]): Incidents from process_github_summary, in summary order.
+                Their ids are rewritten in place to the ids already assigned to ongoing outages.
+            components (dict): component_id -> (name, status, group_id) for every component in the summary.
+            partial (bool): The summary could not be fully parsed. Incidents missing from it are kept
+                as they were instead of being reported as disappeared.
+            now_time (str, optional): ISO time stamped on disappeared incidents (default: now).
+
+        Returns:
+            list[IncidentDelta]: One delta per incident that was created, changed or is gone.
+        """
+        self._carry_over_identity(incidents)
+
+        transitions_by_incident = {}
+        self.component_transitions = []
+        for component_id, (name, status, group_id) in components.items():
+            previous_status = self.components.get(component_id, (name, "operational", group_id))[1]
+            if previous_status == status:
+                continue
+            transition = (name, previous_status, status)
+            self.component_transitions.append(transition)
+            transitions_by_incident.setdefault(group_id or component_id, []).append(transition)
+
+        deltas = []
+        current = {}
+        for incident in incidents:
+            current[incident.incident_id] = incident
+            transitions = transitions_by_incident.get(incident.component_id or incident.incident_id, ())
+            previous = self.incidents.get(incident.incident_id)
+            if previous is None:
+                deltas.append(IncidentDelta(IncidentDelta.CREATED, incident, component_transitions=transitions))
+                continue
+            changes = {
+                field: getattr(incident, field)
+                for field in TRACKED_FIELDS if getattr(incident, field) != getattr(previous, field)
+            }
+            if not changes and not transitions:
+                continue
+            kind = IncidentDelta.UPDATED
+            if "github_status" in changes and incident.github_status in RESOLVED_STATUSES:
+                kind = IncidentDelta.RESOLVED
+            deltas.append(IncidentDelta(kind, incident, changes, transitions))
+
+        now_time = now_time or datetime.now(timezone.utc).isoformat()
+        for incident_id, previous in self.incidents.items():
+            if incident_id in current or previous.github_status in RESOLVED_STATUSES:
+                continue
+            if partial:
+                current[incident_id] = previous
+                continue
+            # GitHub only lists unresolved incidents, and a component without an incident is gone once it is operational
+            closing_status = "operational" if previous.component_id else "resolved"
+            changes = {"status": closing_status, "github_status": closing_status, "resolved_at": now_time, "updated_at": now_time}
+            closed = previous.replace(**changes)
+            transitions = transitions_by_incident.get(previous.component_id or incident_id, ())
+            deltas.append(IncidentDelta(IncidentDelta.DISAPPEARED, closed, changes, transitions))
+
+        self.incidents = current
+        if partial:
+            self.components.update(components)
+        else:
+            self.components = dict(components)
+        return deltas
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUFFER_SIZE = int(os.getenv("SSE_BUFFER_SIZE", 10000))
+MAX_SUBSCRIBERS = int(os.getenv("SSE_MAX_SUBSCRIBERS", 5000))
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+
+
+class TooManySubscribers(Exception):
+    """
+    Raised when a subscription would exceed MAX_SUBSCRIBERS.
+    """
+
+
+class Subscription:
+    """
+    One subscriber slot of an EventHub, reserved by EventHub.acquire().
+
+    Released once, by release() or when the stream given it ends; a slot whose stream never started
+    (the client left before the response was sent) is released when the subscription is collected.
+    """
+    __slots__ = ("hub", "released")
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.released = False
+
+    def release(self):
+        with self.hub._lock:
+            if self.released:
+                return
+            self.released = True
+            self.hub.subscribers -= 1
+
+    def __del__(self):
+        self.release()
+
+
+class EventHub:
+    """
+    Fan-out of incident and component changes to Server-Sent Events subscribers.
+
+    Events are serialized once, into a bounded ring buffer shared by every subscriber; each
+    subscriber only keeps a cursor (the id of the last event it was sent), so a subscriber costs
+    the same no matter how many events are pending for it. A client that reads too slowly for
+    its cursor to stay inside the buffer is sent a "reset" event (resynchronize through the
+    query API) and disconnected, instead of the hub buffering for it.
+
+    publish() is called from the monitor thread; subscribers run on the server's event loop
+    and are woken through it. An API worker process does not number events itself: it mirror()s
+    the poller's events with the poller's ids, so every worker hands out the same id for the same
+    event and a client can resume on any of them.
+    """
+
+    def __init__(self, capacity=EVENT_BUFFER_SIZE, max_subscribers=MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._events = deque(maxlen=capacity)  # (event_id, encoded event, event type, JSON data)
+        # Ids continue from the start time, so ids handed out before a restart are recognized as stale
+        self._last_id = int(time.time() * 1000)
+        self._first_id = self._last_id
+        self._mirroring = False  # True once the ids follow another process's (see mirror())
+        self._lock = threading.Lock()
+        self._waiters = {}  # event loop -> asyncio.Event set on the next publish
+        self.subscribers = 0
+
+    @property
+    def last_event_id(self):
+        return self._last_id
+
+    def publish(self, event_type, data):
+        """
+        Append an event to the buffer and wake every subscriber.
+
+        Returns:
+            int: The id of the event.
+        """
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        with self._lock:
+            self._last_id += 1
+            event_id = self._last_id
+            self._append(event_id, event_type, payload)
+        self._wake()
+        return event_id
+
+    def _append(self, event_id, event_type, payload):
+        self._events.append((event_id, f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode("utf-8"), event_type, payload))
+
+    def _wake(self):
+        with self._lock:
+            waiters = list(self._waiters.items())
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                # The loop was closed (e.g. the server stopped)
+                with self._lock:
+                    self._waiters.pop(loop, None)
+
+    def recent(self, limit):
+        """
+        Returns:
+            list[tuple]: (event_id, event type, JSON data) of the newest buffered events (at most limit), oldest first.
+        """
+        with self._lock:
+            events = list(islice(reversed(self._events), limit))
+        return [(event_id, event_type, payload) for event_id, _, event_type, payload in reversed(events)]
+
+    def mirror(self, events, last_event_id):
+        """
+        Publish events numbered by another process (the poller), keeping their ids.
+
+        Events already mirrored are skipped. The first call, and any call whose events do not continue
+        the mirrored ids (events were missed), restarts the buffer at the incoming ids, so clients resuming
+        from before the gap get a reset instead of a stream with events missing.
+
+        Args:
+            events (list[tuple]): (event_id, event type, JSON data) in id order, as returned by recent().
+            last_event_id (int): The other process's last event id.
+        """
+        with self._lock:
+            events = [event for event in events if not self._mirroring or event[0] > self._last_id]
+            start_id = events[0][0] - 1 if events else last_event_id
+            if not self._mirroring or start_id != self._last_id:
+                self._events.clear()
+                self._first_id = self._last_id = start_id
+                self._mirroring = True
+            for event_id, event_type, payload in events:
+                if event_id != self._last_id + 1:
+                    # A gap inside the batch: keep only what follows it
+                    self._events.clear()
+                    self._first_id = event_id - 1
+                self._append(event_id, event_type, payload)
+                self._last_id = event_id
+        if events:
+            self._wake()
+
+    def _events_after(self, event_id):
+        """
+        Return the encoded events after event_id, or None if some of them were already dropped.
+        """
+        with self._lock:
+            if event_id == self._last_id:
+                return []
+            oldest = self._events[0][0] if self._events else self._last_id + 1
+            if event_id < self._first_id or event_id > self._last_id or (event_id + 1 < oldest):
+                return None
+            # Ids are contiguous, so the pending events are the newest ones; read them from the right end
+            pending = [event[1] for event in islice(reversed(self._events), self._last_id - event_id)]
+        pending.reverse()
+        return pending
+
+    def _waiter(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._waiters.get(loop)
+            if waiter is None:
+                waiter = self._waiters[loop] = asyncio.Event()
+        return waiter
+
+    def parse_event_id(self, value):
+        try:
+            return int(value) if value else None
+        except ValueError:
+            return -1
+
+    def acquire(self):
+        """
+        Reserve a subscriber slot, before the response is started (so a full hub can still answer 503).
+
+        Returns:
+            Subscription: The reserved slot, to pass to subscribe(), or None if MAX_SUBSCRIBERS are connected.
+        """
+        with self._lock:
+            if self.subscribers >= self.max_subscribers:
+                return None
+            self.subscribers += 1
+        return Subscription(self)
+
+    async def subscribe(self, last_event_id=None, heartbeat=HEARTBEAT_SECONDS, subscription=None):
+        """
+        Yield the SSE stream for one subscriber.
+
+        Args:
+            last_event_id (int, optional): Resume after this event (the client's Last-Event-ID).
+                Without it the stream starts with the next event.
+            heartbeat (float): Seconds between keep-alive comments while there are no events.
+            subscription (Subscription, optional): A slot reserved with acquire(); released when the stream ends.
+
+        Yields:
+            bytes: Encoded SSE frames.
+
+        Raises:
+            TooManySubscribers: If no slot was reserved and MAX_SUBSCRIBERS are already connected.
+        """
+        if subscription is None:
+            subscription = self.acquire()
+            if subscription is None:
+                raise TooManySubscribers(f"{self.subscribers} subscribers connected")
+        try:
+            cursor = self._last_id if last_event_id is None else last_event_id
+            yield f"retry: {RETRY_MILLISECONDS}\n\n".encode("utf-8")
+            while True:
+                waiter = self._waiter()
+                pending = self._events_after(cursor)
+                if pending is None:
+                    # Resume point no longer buffered (client too slow, or ids from before a restart)
+                    reset_id = self._last_id
+                    yield self._reset_frame(reset_id)
+                    if last_event_id is not None and cursor == last_event_id:
+                        # Fresh reconnect: the client reloads its state and continues after the reset
+                        cursor = reset_id
+                        last_event_id = None
+                        continue
+                    return
+                if pending:
+                    cursor += len(pending)
+                    yield b"".join(pending)
+                    continue
+                waiter.clear()
+                if self._last_id != cursor:
+                    continue
+                try:
+                    await asyncio.wait_for(waiter.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            subscription.release()
+
+    def _reset_frame(self, event_id):
+        data = json.dumps({"reason": "events missed, reload state from the query API", "last_event_id": event_id})
+        return f"id: {event_id}\nevent: reset\ndata: {data}\n\n".encode("utf-8")
+
+
+def delta_events(deltas, component_transitions):
+    """
+    Turn one monitoring cycle's deltas and component transitions into (event type, data) pairs.
+    """
+    events = []
+    for delta in deltas:
+        events.append(("incident", {
+            "kind": delta.kind,
+            "incident": delta.incident.to_dict(),
+            "changes": sorted(delta.changes),
+        }))
+    for name, old_status, new_status in component_transitions:
+        events.append(("component", {"name": name, "old_status": old_status, "new_status": new_status}))
+    return events
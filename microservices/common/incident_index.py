@@ -0,0 +1,223 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from common.delta import IncidentDelta
+from common.lifecycle import CLOSED_GITHUB_STATUSES
+
+# Closed incidents stay queryable for this long after GitHub closed them
+CLOSED_RETENTION_SECONDS = int(os.getenv("INDEX_CLOSED_RETENTION_SECONDS", 24 * 3600))
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rendered responses kept per snapshot (distinct filter/page combinations)
+RENDER_CACHE_SIZE = 256
+
+
+def _digest(*parts):
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class IndexSnapshot:
+    """
+    Immutable view of the index at one point in time.
+
+    Readers take the current snapshot once and work on it without locking; the monitor loop
+    builds a new snapshot whenever the incidents or components change and swaps it in.
+
+    Attributes:
+        version (int): Incremented on every change (0 before the first summary).
+        fingerprint (str): Digest of the content, identical on every monitor pod serving the same data.
+        updated_at (str): When the content last changed (ISO time).
+        incidents (tuple[dict]): Incidents, most recently updated first.
+        by_id (dict): incident_id -> incident.
+        components (tuple[dict]): Components by name.
+    """
+    __slots__ = ("version", "fingerprint", "updated_at", "incidents", "by_id", "components")
+
+    def __init__(self, version=0, updated_at="", incidents=(), components=()):
+        self.version = version
+        self.updated_at = updated_at
+        self.incidents = tuple(sorted(incidents, key=lambda incident: incident["updated_at"] or "", reverse=True))
+        self.by_id = {incident["incident_id"]: incident for incident in self.incidents}
+        self.components = tuple(sorted(components, key=lambda component: component["name"]))
+        self.fingerprint = _digest(json.dumps([self.incidents, self.components], sort_keys=True, default=str))
+
+
+class IncidentIndex:
+    """
+    In-memory index of GitHub incidents and component statuses, fed by the monitor's summary deltas.
+
+    Open incidents are kept for as long as they are in the summary, closed ones for
+    CLOSED_RETENTION_SECONDS. Responses rendered from a snapshot are cached (serialized and gzip
+    compressed) until the next change, so repeated queries cost a dictionary lookup.
+    """
+
+    def __init__(self, closed_retention=CLOSED_RETENTION_SECONDS):
+        self.closed_retention = closed_retention
+        self._incidents = {}  # incident_id -> Incident
+        self._closed_at = {}  # incident_id -> epoch seconds the incident was seen closed
+        self._components = {}  # component_id -> (name, status, group_id)
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._rendered = OrderedDict()
+        self.snapshot = IndexSnapshot()
+
+    def apply(self, deltas, components, now=None):
+        """
+        Apply the deltas of one monitoring cycle and the current component statuses.
+
+        Args:
+            deltas (list[IncidentDelta]): Deltas from DeltaEngine.diff.
+            components (dict): component_id -> (name, status, group_id), e.g. DeltaEngine.components.
+            now (float, optional): Current epoch time (for tests).
+
+        Returns:
+            bool: True if a new snapshot was published.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            changed = bool(deltas) or components != self._components
+            for delta in deltas:
+                incident = delta.incident
+                self._incidents[incident.incident_id] = incident
+                if incident.github_status in CLOSED_GITHUB_STATUSES or delta.kind == IncidentDelta.DISAPPEARED:
+                    self._closed_at.setdefault(incident.incident_id, now)
+                else:
+                    self._closed_at.pop(incident.incident_id, None)
+            for incident_id, closed_at in list(self._closed_at.items()):
+                if now - closed_at > self.closed_retention:
+                    del self._closed_at[incident_id]
+                    del self._incidents[incident_id]
+                    changed = True
+            if not changed:
+                return False
+            self._components = dict(components)
+            self.snapshot = self._build_snapshot(now)
+        with self._render_lock:
+            self._rendered.clear()
+        return True
+
+    def _build_snapshot(self, now):
+        incidents = []
+        for incident_id, incident in self._incidents.items():
+            view = incident.to_dict()
+            view["open"] = incident_id not in self._closed_at
+            incidents.append(view)
+        components = [
+            {"id": component_id, "name": name, "status": status, "group_id": group_id}
+            for component_id, (name, status, group_id) in self._components.items()
+        ]
+        return IndexSnapshot(
+            version=self.snapshot.version + 1,
+            updated_at=datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            incidents=incidents,
+            components=components,
+        )
+
+    def render(self, key, build):
+        """
+        Return a cached rendering of a response built from the current snapshot.
+
+        Args:
+            key (tuple): Identifies the response (view name and normalized parameters).
+            build (callable): build(snapshot) -> JSON-serializable body, or None if there is nothing to render.
+
+        Returns:
+            RenderedResponse: The response, or None if build returned None.
+        """
+        snapshot = self.snapshot
+        cache_key = (snapshot.version,) + tuple(key)
+        with self._render_lock:
+            rendered = self._rendered.get(cache_key)
+            if rendered is not None:
+                self._rendered.move_to_end(cache_key)
+                return rendered
+        body = build(snapshot)
+        if body is None:
+            return None
+        rendered = RenderedResponse(body, f'"{_digest(snapshot.fingerprint, repr(key))[:32]}"')
+        with self._render_lock:
+            if snapshot is self.snapshot:
+                self._rendered[cache_key] = rendered
+                while len(self._rendered) > RENDER_CACHE_SIZE:
+                    self._rendered.popitem(last=False)
+        return rendered
+
+
+class RenderedResponse:
+    """
+    A serialized JSON response body with its ETag, and its gzip encoding built on first use.
+    """
+    __slots__ = ("body", "etag", "_gzipped")
+
+    def __init__(self, body, etag):
+        self.body = json.dumps(body, separators=(",", ":"), default=str).encode("utf-8")
+        self.etag = etag
+        self._gzipped = None
+
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+    def matches(self, if_none_match):
+        """
+        Return True if an If-None-Match header value names this response's ETag.
+        """
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+
+
+def _split(value):
+    return {part.strip().lower() for part in value.split(",") if part.strip()} if value else None
+
+
+def query_incidents(snapshot, status=None, impact=None, state="all", limit=DEFAULT_PAGE_SIZE, offset=0):
+    """
+    Filter and page the incidents of a snapshot.
+
+    Args:
+        status (str, optional): Comma-separated GitHub statuses (e.g. "investigating,identified").
+        impact (str, optional): Comma-separated impacts (e.g. "major,critical").
+        state (str): "open", "closed" or "all".
+        limit (int): Page size (at most MAX_PAGE_SIZE).
+        offset (int): Number of matching incidents to skip.
+
+    Returns:
+        dict: items, total (matching incidents), offset, limit, next_offset (None on the last page), updated_at.
+    """
+    statuses = _split(status)
+    impacts = _split(impact)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    matching = [
+        incident for incident in snapshot.incidents
+        if (statuses is None or (incident["github_status"] or "").lower() in statuses)
+        and (impacts is None or (incident["impact"] or "").lower() in impacts)
+        and (state == "all" or incident["open"] == (state == "open"))
+    ]
+    page = matching[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(matching) else None
+    return {
+        "items": page,
+        "total": len(matching),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset,
+        "updated_at": snapshot.updated_at,
+    }
+
+
+def query_components(snapshot, status=None):
+    """
+    Return the components of a snapshot, optionally only those in the given comma-separated statuses.
+    """
+    statuses = _split(status)
+    items = [component for component in snapshot.components if statuses is None or component["status"] in statuses]
+    return {"items": items, "total": len(items), "updated_at": snapshot.updated_at}
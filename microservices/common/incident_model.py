@@ -0,0 +1,282 @@
+import json
+import uuid
+from decimal import Decimal
+
+
+class _Record:
+    """
+    Base for the compact incident records shared by the monitor and notifier.
+
+    Subclasses list their attributes in __slots__ and declare which of them are stored as
+    JSON-encoded lists (LIST_FIELDS). Records also support dict-style access (record["status"])
+    so call sites that used to pass plain dicts keep working.
+
+    The codec converts to and from two representations:
+        - items: plain Python values, as used by the boto3 Table resource.
+        - attribute maps: the low-level {"S": ...} format used by the DynamoDB client,
+          TransactWriteItems and DynamoDB Streams records.
+    """
+    __slots__ = ()
+    LIST_FIELDS = ()
+    DEFAULTS = {}
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            if name in fields:
+                value = fields[name]
+            else:
+                value = self.DEFAULTS.get(name)
+            if name in self.LIST_FIELDS:
+                value = tuple(value or ())
+            setattr(self, name, value)
+
+    # Dict-style access
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        if key not in self.__slots__:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def replace(self, **changes):
+        """
+        Return a copy of the record with some attributes changed.
+        """
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return type(self)(**fields)
+
+    @classmethod
+    def coerce(cls, value):
+        """
+        Return value as a record of this type, building one from a dict if needed.
+        """
+        if isinstance(value, cls):
+            return value
+        return cls(**{name: value[name] for name in cls.__slots__ if name in value})
+
+    def to_dict(self):
+        """
+        Return the record as a JSON-ready dict (list fields as lists).
+        """
+        return {
+            name: list(getattr(self, name)) if name in self.LIST_FIELDS else getattr(self, name)
+            for name in self.__slots__
+        }
+
+    # Boto3 resource items
+
+    @classmethod
+    def encode_field(cls, name, value):
+        """
+        Return the stored representation of a single attribute value.
+        """
+        if name in cls.LIST_FIELDS:
+            return json.dumps(list(value))
+        return value
+
+    def to_item(self):
+        item = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if name in self.LIST_FIELDS:
+                value = json.dumps(list(value))
+            item[name] = value
+        return item
+
+    @classmethod
+    def from_item(cls, item):
+        fields = {}
+        for name in cls.__slots__:
+            if name not in item:
+                continue
+            value = item[name]
+            if name in cls.LIST_FIELDS and isinstance(value, str):
+                value = json.loads(value) if value else ()
+            fields[name] = value
+        return cls(**fields)
+
+    # Low-level attribute maps
+
+    def to_attribute_map(self):
+        attributes = {}
+        for name, value in self.to_item().items():
+            attributes[name] = encode_attribute(value)
+        return attributes
+
+    @classmethod
+    def from_attribute_map(cls, attributes):
+        return cls.from_item({name: decode_attribute(value) for name, value in attributes.items()})
+
+
+def encode_attribute(value):
+    """
+    Encode a plain value (str, int, float, bool, None) as a DynamoDB attribute value.
+    """
+    if value is None:
+        return {"NULL": True}
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, (int, float, Decimal)):
+        return {"N": str(value)}
+    if isinstance(value, (list, tuple)):
+        return {"L": [encode_attribute(element) for element in value]}
+    if isinstance(value, dict):
+        return {"M": {key: encode_attribute(element) for key, element in value.items()}}
+    return {"S": str(value)}
+
+
+def decode_attribute(attribute):
+    """
+    Decode a DynamoDB attribute value into a plain value.
+    """
+    (attribute_type, value), = attribute.items()
+    if attribute_type == "S":
+        return value
+    if attribute_type == "N":
+        return int(value) if value.lstrip("-").isdigit() else float(value)
+    if attribute_type == "NULL":
+        return None
+    if attribute_type == "BOOL":
+        return value
+    if attribute_type == "L":
+        return [decode_attribute(element) for element in value]
+    if attribute_type == "M":
+        return {key: decode_attribute(element) for key, element in value.items()}
+    raise ValueError(f"Unsupported DynamoDB attribute type: {attribute_type}")
+
+
+class Incident(_Record):
+    """
+    A GitHub incident (or a faulty component without one) as stored in the GitHub incidents table.
+    """
+    __slots__ = (
+        "incident_id",
+        "internal_incident_id",
+        "created_at",
+        "impact",
+        "status",
+        "name",
+        "updated_at",
+        "resolved_at",
+        "last_update_id",
+        "last_update_body",
+        "affected_components",
+        "github_status",
+        "component_id",
+    )
+    LIST_FIELDS = ("affected_components",)
+    # component_id is only set for faulty components reported without a GitHub incident
+    DEFAULTS = {"impact": "unknown", "resolved_at": "", "last_update_id": "", "last_update_body": "", "component_id": ""}
+
+    def __init__(self, **fields):
+        super().__init__(**fields)
+        if self.github_status is None:
+            self.github_status = self.status
+
+    @classmethod
+    def from_statuspage(cls, item, affected_components=()):
+        """
+        Build the record of a Statuspage incident, as listed in summary.json or incidents.json.
+
+        Args:
+            item (dict): The incident; its incident_updates are ordered newest first.
+            affected_components (iterable[str]): Names of the components it affects.
+        """
+        latest_update = (item.get("incident_updates") or [{}])[0]
+        return cls(
+            incident_id=item["id"],
+            internal_incident_id=f"cyberark-{uuid.uuid4()}",
+            created_at=item["created_at"],
+            impact=item["impact"],
+            status=item["status"],
+            name=item["name"],
+            updated_at=item["updated_at"],
+            resolved_at=item.get("resolved_at") or "",
+            last_update_id=item.get("last_update_id") or latest_update.get("id", ""),
+            last_update_body=latest_update.get("body", ""),
+            affected_components=tuple(affected_components),
+        )
+
+
+class EscalationRecord(_Record):
+    """
+    The CyberArk escalation record tracking how an incident is being handled internally.
+    """
+    __slots__ = (
+        "incident_id",
+        "internal_incident_id",
+        "escalation_status",
+        "incident_status",
+        "last_escalation_update_time",
+        "last_incident_update_time",
+        "escalation_details",
+        "created_at",
+        "acknowledgment_time",
+        "slack_message_thread_ts",
+        "notified_update_id",
+        "version",
+        "lease_owner",
+        "lease_expires_at",
+        "trace_parent",
+        "notified_at",
+        "routing_policy",
+        "slack_channel",
+        "digest_id",
+    )
+    DEFAULTS = {
+        "escalation_status": "Pending",
+        "incident_status": "new",
+        "escalation_details": "Initial escalation record created.",
+        "acknowledgment_time": "",
+        # Id of the last GitHub incident update posted to the Slack thread
+        "notified_update_id": "",
+        # Optimistic-concurrency counter, bumped by every versioned update
+        "version": 0,
+        # Notifier replica currently handling the incident, and until when (epoch seconds)
+        "lease_owner": "",
+        "lease_expires_at": 0,
+        # W3C traceparent of the monitor's detection span; the notifier continues the incident's trace from it
+        "trace_parent": "",
+        # When the incident was first published to Slack (start of the time-to-acknowledge measurement)
+        "notified_at": "",
+        # Routing policy the incident was published under, and the Slack channel of its thread
+        "routing_policy": "",
+        "slack_channel": "",
+        # Incident id of the digest the incident is published in, during a broad outage
+        "digest_id": "",
+    }
+
+    @classmethod
+    def new(cls, incident, now_time, trace_parent=""):
+        """
+        Build the initial escalation record for a newly detected incident.
+        """
+        return cls(
+            incident_id=incident.incident_id,
+            internal_incident_id=incident.internal_incident_id,
+            last_escalation_update_time=now_time,
+            last_incident_update_time=now_time,
+            created_at=now_time,
+            trace_parent=trace_parent,
+        )
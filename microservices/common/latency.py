@@ -0,0 +1,250 @@
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+SLO_REPORT_INTERVAL = int(os.getenv("SLO_REPORT_INTERVAL", 3600))
+SLO_REPORT_PATH = os.getenv("SLO_REPORT_PATH")  # JSON lines, one report per interval
+
+# Intervals of an incident's path from GitHub to a human (seconds)
+GITHUB_TO_SIGHTING = "github_to_sighting"  # GitHub created_at -> first summary the monitor saw it in
+SIGHTING_TO_WRITE = "sighting_to_write"  # -> records written to DynamoDB
+GITHUB_TO_WRITE = "github_to_write"
+WRITE_TO_SLACK = "write_to_slack"  # records written -> first Slack post
+GITHUB_TO_SLACK = "github_to_slack"
+SLACK_TO_ACK = "slack_to_ack"  # first Slack post -> acknowledged with a reaction
+WRITE_TO_PAGE = "write_to_page_{tier}"  # records written -> page of an escalation tier
+GITHUB_TO_PAGE = "github_to_page_{tier}"
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Fixed buckets (seconds), so replicas' histograms add up: histogram_quantile(0.95, sum by (le, interval)
+# (rate(incident_latency_seconds_bucket[1h]))) is the fleet-wide p95. Finer quantiles come from the sketches
+LATENCY_BUCKETS = (1, 2, 5, 10, 15, 30, 60, 120, 180, 300, 600, 900, 1800, 3600, 7200, 14400, 43200, 86400)
+LATENCY_SECONDS = Histogram("incident_latency_seconds", "Incident latency per interval", ["interval"], buckets=LATENCY_BUCKETS)
+
+
+def seconds_between(start, end):
+    """
+    Seconds from one ISO 8601 time to another, or None if either is missing or malformed.
+    """
+    try:
+        started = datetime.fromisoformat(start.replace("Z", "+00:00"))
+        ended = datetime.fromisoformat(end.replace("Z", "+00:00"))
+        return (ended - started).total_seconds()
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class QuantileSketch:
+    """
+    Streaming quantile estimator with bounded memory and relative error (DDSketch).
+
+    Values are counted in logarithmic buckets: bucket k holds values in (gamma^(k-1), gamma^k], so any
+    quantile is returned within relative_accuracy of an actual value. When there are more than
+    max_buckets buckets, the lowest ones are merged, which only affects the smallest quantiles.
+    Values below min_value (including negative ones from clock skew) are counted as zero.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048, min_value=1e-3):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        value = max(float(value), 0.0)
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value < self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            lowest, second = sorted(self.buckets)[:2]
+            self.buckets[second] += self.buckets.pop(lowest)
+
+    def merge(self, other):
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        while len(self.buckets) > self.max_buckets:
+            lowest, second = sorted(self.buckets)[:2]
+            self.buckets[second] += self.buckets.pop(lowest)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The sketch in a JSON-serializable form, which from_dict reads back (e.g. to merge replicas' sketches).
+        """
+        return {
+            "relative_accuracy": self.relative_accuracy, "max_buckets": self.max_buckets, "min_value": self.min_value,
+            "buckets": {str(key): count for key, count in sorted(self.buckets.items())},
+            "zero_count": self.zero_count, "count": self.count, "sum": self.sum,
+            "min": self.min if self.count else None, "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"], data["max_buckets"], data["min_value"])
+        sketch.buckets = {int(key): count for key, count in data["buckets"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if data["count"]:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+    def quantile(self, q):
+        """
+        Returns:
+            float: Estimate of the q-quantile (0 <= q <= 1), or None if nothing was added.
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                estimate = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        summary = {"count": self.count, "mean": self.sum / self.count, "min": self.min, "max": self.max}
+        for q in QUANTILES:
+            summary[f"p{round(q * 100)}"] = self.quantile(q)
+        return summary
+
+
+def merge_sketches(serialized):
+    """
+    Merge serialized sketches (e.g. the "sketches" of several replicas' reports or /slo/latency/sketch).
+
+    Args:
+        serialized (list[dict]): {interval: serialized sketch} each.
+
+    Returns:
+        dict: {interval: QuantileSketch} of everything measured.
+    """
+    merged = {}
+    for sketches in serialized:
+        for interval, data in sketches.items():
+            sketch = QuantileSketch.from_dict(data)
+            if interval in merged:
+                merged[interval].merge(sketch)
+            else:
+                merged[interval] = sketch
+    return merged
+
+
+class LatencyTracker:
+    """
+    Latency sketches per interval, since start and for the current reporting period.
+
+    Args:
+        service (str): Named in the periodic report.
+        report_interval (float): Seconds between reports (see maybe_report).
+    """
+
+    def __init__(self, service, report_interval=SLO_REPORT_INTERVAL, report_path=SLO_REPORT_PATH):
+        self.service = service
+        self.report_interval = report_interval
+        self.report_path = report_path
+        self._lifetime = {}
+        self._period = {}
+        self._period_started = None
+        self._lock = threading.Lock()
+
+    def record(self, interval, seconds):
+        """
+        Add one measurement of interval; None (an unknown start or end time) is ignored.
+        """
+        if seconds is None:
+            return
+        with self._lock:
+            for sketches in (self._lifetime, self._period):
+                sketches.setdefault(interval, QuantileSketch()).add(seconds)
+        LATENCY_SECONDS.labels(interval=interval).observe(max(seconds, 0.0))
+
+    def summary(self):
+        """
+        Returns:
+            dict: {"intervals": {interval: summary since start}, "current_period": {interval: summary}}
+        """
+        with self._lock:
+            return {
+                "intervals": {interval: sketch.summary() for interval, sketch in sorted(self._lifetime.items())},
+                "current_period": {interval: sketch.summary() for interval, sketch in sorted(self._period.items())},
+            }
+
+    def sketches(self):
+        """
+        Returns:
+            dict: {interval: serialized sketch since start} (see QuantileSketch.to_dict), for merging across replicas.
+        """
+        with self._lock:
+            return {interval: sketch.to_dict() for interval, sketch in sorted(self._lifetime.items())}
+
+    def maybe_report(self, now):
+        """
+        Log (and append to report_path) the current period's summary once report_interval has passed,
+        then start a new period. The report carries the period's serialized sketches, so the reports of
+        several replicas (or periods) can be merged with merge_sketches.
+
+        Returns:
+            dict: The report, or None if it is not due.
+        """
+        with self._lock:
+            if self._period_started is None:
+                self._period_started = now
+                return None
+            if now - self._period_started < self.report_interval:
+                return None
+            report = {
+                "service": self.service,
+                "start": self._period_started,
+                "end": now,
+                "intervals": {interval: sketch.summary() for interval, sketch in sorted(self._period.items())},
+                "sketches": {interval: sketch.to_dict() for interval, sketch in sorted(self._period.items())},
+            }
+            self._period = {}
+            self._period_started = now
+        for interval, summary in report["intervals"].items():
+            logger.info(f"SLO {self.service} {interval}: n={summary['count']} p50={summary['p50']:.1f}s "
+                        f"p95={summary['p95']:.1f}s p99={summary['p99']:.1f}s max={summary['max']:.1f}s")
+        if not report["intervals"]:
+            logger.info(f"SLO {self.service}: no incidents measured in the last {self.report_interval}s.")
+        if self.report_path:
+            try:
+                with open(self.report_path, "a") as report_file:
+                    report_file.write(json.dumps(report) + "\n")
+            except OSError as report_error:
+                logger.error(f"Failed to write the SLO report: {report_error}")
+        return report
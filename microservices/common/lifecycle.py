@@ -0,0 +1,134 @@
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+# incident_status of an escalation record once the incident is closed
+RESOLVED = "Resolved"
+# GitHub statuses that close an incident ("operational" is set when a faulty component recovers)
+CLOSED_GITHUB_STATUSES = ("resolved", "postmortem", "operational")
+
+# Closed records stay in the hot tables for ARCHIVE_AFTER_SECONDS, are then archived and deleted.
+# The DynamoDB TTL on expires_at is a backstop in case archiving keeps failing.
+ARCHIVE_AFTER_SECONDS = int(os.getenv("ARCHIVE_AFTER_SECONDS", 7 * 24 * 3600))
+EXPIRE_AFTER_SECONDS = int(os.getenv("EXPIRE_AFTER_SECONDS", 30 * 24 * 3600))
+ARCHIVE_INTERVAL = int(os.getenv("ARCHIVE_INTERVAL", 3600))
+
+
+def closing_attributes(now=None):
+    """
+    Attributes stamped on a record when its incident is closed.
+
+    Returns:
+        dict: closed_at (ISO time), archive_at and expires_at (epoch seconds, expires_at is the TTL attribute).
+    """
+    now = time.time() if now is None else now
+    return {
+        "closed_at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+        "archive_at": int(now + ARCHIVE_AFTER_SECONDS),
+        "expires_at": int(now + ARCHIVE_AFTER_SECONDS + EXPIRE_AFTER_SECONDS),
+    }
+
+
+class LocalArchiveStore:
+    """
+    Writes archive objects under a local directory (stand-in for S3 in tests and local runs).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def put(self, key, body):
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as archive_file:
+            archive_file.write(body)
+        return path
+
+
+class S3ArchiveStore:
+    """
+    Writes archive objects to an S3 bucket.
+    """
+
+    def __init__(self, s3_client, bucket, prefix=""):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def put(self, key, body):
+        object_key = f"{self.prefix}{key}"
+        self.s3_client.put_object(Bucket=self.bucket, Key=object_key, Body=body, ContentEncoding="gzip",
+                                  ContentType="application/x-ndjson")
+        return f"s3://{self.bucket}/{object_key}"
+
+
+def archive_store_from_env(aws):
+    """
+    Build the archive store configured by ARCHIVE_BUCKET (S3) or ARCHIVE_DIR (local), or None if neither is set.
+    """
+    bucket = os.getenv("ARCHIVE_BUCKET")
+    if bucket:
+        return S3ArchiveStore(aws.s3(), bucket, os.getenv("ARCHIVE_PREFIX", "incident-archive/"))
+    directory = os.getenv("ARCHIVE_DIR")
+    if directory:
+        return LocalArchiveStore(directory)
+    return None
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class Archiver:
+    """
+    Moves closed records whose archive_at has passed from an incidents table to gzip-compressed JSONL objects.
+
+    Args:
+        storage: The incident storage (DynamoDBStore or SqliteStore).
+        table_name (str): Table to archive.
+        store: Where archive objects are written (S3ArchiveStore or LocalArchiveStore).
+    """
+
+    def __init__(self, storage, table_name, store, batch_size=500):
+        self.storage = storage
+        self.table_name = table_name
+        self.store = store
+        self.batch_size = batch_size
+
+    def _archive_batch(self, items, now, batch_number):
+        body = gzip.compress("".join(json.dumps(item, default=_json_default) + "\n" for item in items).encode("utf-8"))
+        day = datetime.fromtimestamp(now, timezone.utc)
+        key = f"{self.table_name}/{day:%Y/%m/%d}/{int(now)}-{batch_number:04d}.jsonl.gz"
+        location = self.store.put(key, body)
+        # Only delete once the archive object has been written
+        self.storage.batch_delete(self.table_name, [item["incident_id"] for item in items])
+        logger.info(f"Archived {len(items)} record(s) from {self.table_name} to {location}")
+
+    def run_once(self, now=None):
+        """
+        Archive and delete every record due for archiving.
+
+        Returns:
+            int: Number of records archived.
+        """
+        now = time.time() if now is None else now
+        archived = 0
+        batch = []
+        for item in self.storage.due_for_archive(self.table_name, now):
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._archive_batch(batch, now, archived // self.batch_size)
+                archived += len(batch)
+                batch = []
+        if batch:
+            self._archive_batch(batch, now, archived // self.batch_size)
+            archived += len(batch)
+        return archived
@@ -0,0 +1,201 @@
+import cProfile
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from prometheus_client import Counter as MetricCounter
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles")
+PROFILE_SIGNAL_CYCLES = int(os.getenv("PROFILE_SIGNAL_CYCLES", 3))  # Cycles profiled per SIGUSR1
+PROFILE_MODE = os.getenv("PROFILE_MODE", "pstats")
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+
+# Deterministic profile (cProfile), written as .pstats
+PSTATS = "pstats"
+# Stack samples of the cycle's thread, written as collapsed stacks (.collapsed, one "frame;frame;frame count" per line)
+COLLAPSED = "collapsed"
+MODES = (PSTATS, COLLAPSED)
+
+PROFILED_SECONDS = MetricCounter("profiled_function_seconds_total", "Cumulative time in tracked functions during profiled cycles", ["function"])
+PROFILED_CALLS = MetricCounter("profiled_function_calls_total", "Calls of tracked functions during profiled cycles (pstats mode)", ["function"])
+
+
+class _StackSampler:
+    """
+    Samples the stack of one thread every interval seconds from a background thread.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class CycleProfiler:
+    """
+    Profiles the next N cycles of a service loop on request.
+
+    The loop runs each cycle inside cycle(); while no profile is requested that is a single
+    counter check, so the service runs without any tracing or sampling. Each profiled cycle is
+    written to directory as <service>-<time>-<n>.pstats or .collapsed, and the time spent in the
+    tracked functions is added to the live totals (timings(), and the profiled_function_* metrics).
+
+    Args:
+        service (str): File name prefix ("monitor", "notifier").
+        functions (tuple): Names of the functions whose cumulative time is tracked.
+    """
+
+    def __init__(self, service, functions=(), directory=PROFILE_DIR, sample_interval=SAMPLE_INTERVAL):
+        self.service = service
+        self.functions = tuple(functions)
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.files = []  # Profiles written so far
+        self._remaining = 0
+        self._mode = PSTATS
+        self._profiled = 0
+        self._timings = {name: {"calls": 0, "seconds": 0.0} for name in self.functions}
+        # Reentrant: start() also runs from a signal handler, possibly while the loop holds the lock
+        self._lock = threading.RLock()
+
+    def start(self, cycles=1, mode=PSTATS):
+        """
+        Profile the next cycles cycles (replacing any pending request).
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected one of {MODES}")
+        with self._lock:
+            self._remaining = int(cycles)
+            self._mode = mode
+        logger.info(f"Profiling the next {cycles} {self.service} cycle(s) ({mode}).")
+
+    def status(self):
+        with self._lock:
+            return {
+                "remaining_cycles": self._remaining,
+                "mode": self._mode,
+                "profiled_cycles": self._profiled,
+                "files": list(self.files[-20:]),
+                "timings": self.timings(),
+            }
+
+    def timings(self):
+        """
+        Returns:
+            dict: function name -> {calls, seconds}: cumulative time (including callees) over all profiled
+                cycles; calls is 0 in collapsed mode, where time is estimated from the samples.
+        """
+        return {name: dict(timing) for name, timing in self._timings.items()}
+
+    @contextmanager
+    def cycle(self):
+        if not self._remaining:
+            yield
+            return
+        with self._lock:
+            if not self._remaining:
+                mode = None
+            else:
+                self._remaining -= 1
+                self._profiled += 1
+                mode, number = self._mode, self._profiled
+        if mode is None:
+            yield
+        elif mode == PSTATS:
+            with self._profile(number):
+                yield
+        else:
+            with self._sample(number):
+                yield
+
+    def _path(self, number, extension):
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{self.service}-{time.strftime('%Y%m%dT%H%M%S')}-{number}.{extension}")
+
+    @contextmanager
+    def _profile(self, number):
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            try:
+                path = self._path(number, PSTATS)
+                profile.dump_stats(path)
+                stats = pstats.Stats(profile).stats
+                totals = {name: [0, 0.0] for name in self.functions}
+                for (_, _, function_name), (_, calls, _, cumulative, _) in stats.items():
+                    if function_name in totals:
+                        totals[function_name][0] += calls
+                        totals[function_name][1] += cumulative
+                self._add(totals, path)
+            except Exception as profile_error:
+                logger.error(f"Failed to write the {self.service} profile: {profile_error}")
+
+    @contextmanager
+    def _sample(self, number):
+        sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            try:
+                path = self._path(number, COLLAPSED)
+                with open(path, "w") as collapsed_file:
+                    for stack, count in sampler.stacks.most_common():
+                        collapsed_file.write(f"{stack} {count}\n")
+                totals = {name: [0, 0.0] for name in self.functions}
+                for stack, count in sampler.stacks.items():
+                    on_stack = {frame.rsplit(":", 1)[1] for frame in stack.split(";")}
+                    for name in on_stack.intersection(totals):
+                        totals[name][1] += count * self.sample_interval
+                self._add(totals, path)
+            except Exception as profile_error:
+                logger.error(f"Failed to write the {self.service} profile: {profile_error}")
+
+    def _add(self, totals, path):
+        with self._lock:
+            self.files.append(path)
+            for name, (calls, seconds) in totals.items():
+                self._timings[name]["calls"] += calls
+                self._timings[name]["seconds"] += seconds
+        for name, (calls, seconds) in totals.items():
+            PROFILED_CALLS.labels(function=name).inc(calls)
+            PROFILED_SECONDS.labels(function=name).inc(seconds)
+        logger.info(f"Wrote {self.service} profile {path}")
+
+
+def install_signal_handler(profiler, cycles=PROFILE_SIGNAL_CYCLES, mode=PROFILE_MODE):
+    """
+    Profile the next cycles cycles whenever the process receives SIGUSR1 (must be called from the main thread).
+    """
+    signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.start(cycles, mode))
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import deque
+
+BUDGET_WINDOW = 60  # Seconds the requests-per-minute budget is counted over
+
+
+class _Entry:
+    __slots__ = ("priority", "state", "interval", "next_due")
+
+    def __init__(self, priority, state, interval, next_due):
+        self.priority = priority
+        self.state = state
+        self.interval = interval
+        self.next_due = next_due
+
+
+class RefreshScheduler:
+    """
+    Decides when each tracked item (an incident) is refreshed from a rate-limited source.
+
+    An item is refreshed every fast_interval seconds after it was added, after its state changed (e.g. it
+    was escalated) and after a refresh found it changed. Each refresh that finds it unchanged multiplies its
+    interval by decay, up to slow_interval. All refreshes share one budget of requests_per_minute: when
+    more items are due than the budget allows, the highest priorities go first and the rest stay due.
+
+    Args:
+        clock (callable): Monotonic seconds.
+    """
+
+    def __init__(self, fast_interval, slow_interval, requests_per_minute, decay=2.0, clock=time.monotonic):
+        self.fast_interval = fast_interval
+        self.slow_interval = max(slow_interval, fast_interval)
+        self.requests_per_minute = requests_per_minute
+        self.decay = decay
+        self._clock = clock
+        self._entries = {}
+        self._sent = deque()  # Times of the requests made in the last BUDGET_WINDOW seconds
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def sync(self, items):
+        """
+        Track exactly these items (the others are dropped).
+
+        Args:
+            items (dict): key -> (priority, state). A higher priority is refreshed first; a new key or a
+                changed state makes the item due now, at the fast interval.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key not in items]:
+                del self._entries[key]
+            self._track(items)
+
+    def track(self, items):
+        """
+        Track these items too, like sync but leaving the other tracked items as they are (for a partial view,
+        e.g. the incidents of a batch of changes).
+        """
+        with self._lock:
+            self._track(items)
+
+    def _track(self, items):
+        now = self._clock()
+        for key, (priority, state) in items.items():
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = _Entry(priority, state, self.fast_interval, now)
+                continue
+            entry.priority = priority
+            if entry.state != state:
+                entry.state = state
+                entry.interval = self.fast_interval
+                entry.next_due = min(entry.next_due, now)
+
+    def due(self):
+        """
+        Take the items to refresh now: the due ones, highest priority (then longest overdue) first, as many
+        as the budget has left. Each one taken counts against the budget.
+
+        Returns:
+            list: Their keys.
+        """
+        now = self._clock()
+        with self._lock:
+            while self._sent and self._sent[0] <= now - BUDGET_WINDOW:
+                self._sent.popleft()
+            available = self.requests_per_minute - len(self._sent)
+            if available <= 0:
+                return []
+            due = [(key, entry) for key, entry in self._entries.items() if entry.next_due <= now]
+            due.sort(key=lambda item: (-item[1].priority, item[1].next_due))
+            taken = []
+            for key, entry in due[:available]:
+                self._sent.append(now)
+                # Not due again until its refresh is recorded (or its interval passes, if it never is)
+                entry.next_due = now + entry.interval
+                taken.append(key)
+            return taken
+
+    def record(self, key, changed):
+        """
+        Schedule an item's next refresh after refreshing it.
+
+        Args:
+            changed (bool): Whether the refresh found the item changed (back to the fast interval) or not
+                (the interval decays toward the slow one).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.interval = self.fast_interval if changed else min(self.slow_interval, entry.interval * self.decay)
+            entry.next_due = self._clock() + entry.interval
+
+    def forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def interval(self, key):
+        """
+        Returns:
+            float: The item's current refresh interval, or None if it is not tracked.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.interval if entry else None
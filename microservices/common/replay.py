@@ -0,0 +1,147 @@
+import argparse
+import bisect
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+RECORD_PATH = os.getenv("RECORD_PATH")
+REPLAY_PATH = os.getenv("REPLAY_PATH")
+
+
+class ReplayFinished(Exception):
+    """
+    Raised when the replay clock has moved past the last recorded payload.
+    """
+
+
+class SummaryRecorder:
+    """
+    Appends fetched summary payloads to a gzip-compressed recording.
+
+    Each record is a header line "<epoch seconds> <length>" followed by the raw payload. A payload
+    identical to the previous one is not written again: during replay a payload stays current
+    until the next recorded one. The stream is flushed after every record, so a crash loses at
+    most the record being written; reopening a recording appends to it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = gzip.open(path, "ab")
+        self._last_digest = None
+        self._lock = threading.Lock()
+
+    def record(self, timestamp, payload):
+        """
+        Record a payload fetched at timestamp.
+
+        Returns:
+            bool: False if the payload was unchanged and skipped.
+        """
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        digest = hashlib.sha1(payload).digest()
+        with self._lock:
+            if digest == self._last_digest:
+                return False
+            self._file.write(f"{timestamp:.3f} {len(payload)}\n".encode("ascii"))
+            self._file.write(payload)
+            self._file.flush()
+            self._last_digest = digest
+        return True
+
+    def tee(self, chunks, timestamp):
+        """
+        Pass chunks through unchanged and record their concatenation once all were read.
+        """
+        received = []
+        for chunk in chunks:
+            received.append(chunk)
+            yield chunk
+        self.record(timestamp, b"".join(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8") for chunk in received))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_recording(path):
+    """
+    Yield (timestamp, payload bytes) for every complete record of a recording.
+    """
+    with gzip.open(path, "rb") as recording:
+        while True:
+            try:
+                header = recording.readline()
+                if not header:
+                    return
+                timestamp, length = header.split()
+                payload = recording.read(int(length))
+            except (EOFError, ValueError):
+                logger.warning(f"Recording {path} ends with an incomplete record; ignoring it.")
+                return
+            if len(payload) < int(length):
+                logger.warning(f"Recording {path} ends with an incomplete record; ignoring it.")
+                return
+            yield float(timestamp), payload
+
+
+class ReplaySource:
+    """
+    Serves the payload that was current at a given (virtual) time from a recording.
+    """
+
+    def __init__(self, path):
+        records = sorted(read_recording(path), key=lambda record: record[0])
+        if not records:
+            raise ValueError(f"Recording {path} is empty")
+        self.timestamps = [timestamp for timestamp, _ in records]
+        self.payloads = [payload for _, payload in records]
+        self._served_last = False
+
+    @property
+    def start(self):
+        return self.timestamps[0]
+
+    @property
+    def end(self):
+        return self.timestamps[-1]
+
+    def payload_at(self, timestamp, linger=0):
+        """
+        Return the latest payload recorded at or before timestamp.
+
+        Args:
+            linger (float): Seconds after the last record during which it is still served.
+
+        Raises:
+            ReplayFinished: If timestamp is past the end of the recording (plus linger). The last payload
+                is always served once first, even if a slow cycle let the clock run past it.
+        """
+        if timestamp > self.end + linger and self._served_last:
+            raise ReplayFinished(f"Replay reached the end of the recording ({len(self.payloads)} payloads)")
+        index = bisect.bisect_right(self.timestamps, timestamp) - 1
+        if index == len(self.payloads) - 1:
+            self._served_last = True
+        return self.payloads[max(index, 0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a summary recording.")
+    parser.add_argument("recording")
+    args = parser.parse_args()
+    source = ReplaySource(args.recording)
+    print(f"payloads: {len(source.payloads)}")
+    print(f"start: {source.start:.0f} ({datetime.fromtimestamp(source.start, timezone.utc).isoformat()})")
+    print(f"end: {source.end:.0f} ({datetime.fromtimestamp(source.end, timezone.utc).isoformat()})")
+    print(f"bytes: {sum(len(payload) for payload in source.payloads)}")
+    print(f"to replay both services on the same virtual clock export: CLOCK_ORIGIN={source.start:.0f} "
+          f"CLOCK_REAL_ORIGIN=<epoch seconds when the replay starts> CLOCK_SPEED=<speed-up>")
+
+
+if __name__ == "__main__":
+    main()
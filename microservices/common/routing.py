@@ -0,0 +1,298 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ROUTING_POLICY_PATH = os.getenv("ROUTING_POLICY_PATH")
+ROUTING_RELOAD_INTERVAL = float(os.getenv("ROUTING_RELOAD_INTERVAL", 30))
+
+WILDCARD = "*"
+# escalation_status of an incident that has only been posted to its policy's first tier
+PENDING = "Pending"
+MATCH_FIELDS = ("provider", "impact", "component")
+# Mentions and SNS targets can name a secret instead of holding the value ("secret:director_phone")
+SECRET_PREFIX = "secret:"
+
+
+def resolve_secret(value, secrets):
+    """
+    Resolve a "secret:<name>" reference of a routing policy.
+
+    Args:
+        value (str): A literal value, or a reference to a secret.
+        secrets (dict): Secret values by name.
+
+    Returns:
+        str: The value, the referenced secret's value, or None if the secret is unknown.
+    """
+    if isinstance(value, str) and value.startswith(SECRET_PREFIX):
+        return secrets.get(value[len(SECRET_PREFIX):])
+    return value
+
+
+class PolicyError(ValueError):
+    """
+    Raised when a routing policy document is invalid.
+    """
+
+
+class Tier:
+    """
+    One escalation tier of a routing policy.
+
+    Attributes:
+        name (str): Tier name; the incident's escalation_status is "<name>_escalation" once this tier is paged
+            ("Pending" for the first tier).
+        label (str): How the tier is named in Slack ("escalating to <label>").
+        timeout (float): Seconds this tier has to acknowledge before the next tier is paged.
+        deadline (float): Seconds after publication without acknowledgment at which this tier is paged.
+        slack_channel (str): Channel notified in addition to the incident's thread ("" for the thread only).
+        mention (str): Slack display name (or "secret:<name>") mentioned when the tier is notified.
+        sns_targets (tuple): Phone numbers, SNS topic ARNs or "secret:<name>" references paged over SNS.
+    """
+    __slots__ = ("name", "label", "timeout", "deadline", "slack_channel", "mention", "sns_targets", "escalation_status")
+
+    def __init__(self, name, index, deadline, timeout=None, label=None, slack_channel="", mention="", sns_targets=()):
+        self.name = name
+        self.label = label or name.upper()
+        self.timeout = None if timeout is None else float(timeout)
+        self.deadline = deadline
+        self.slack_channel = slack_channel or ""
+        self.mention = mention or ""
+        self.sns_targets = tuple(sns_targets or ())
+        self.escalation_status = PENDING if index == 0 else f"{name}_escalation"
+
+
+class Policy:
+    """
+    A compiled routing policy: the incidents it matches and the tiers they are escalated through.
+    """
+
+    def __init__(self, name, priority, tiers, slack_channel=""):
+        self.name = name
+        self.priority = priority
+        self.slack_channel = slack_channel or ""
+        self.tiers = tiers
+        self._tier_by_status = {tier.escalation_status: index for index, tier in enumerate(tiers)}
+
+    def tier_index(self, escalation_status):
+        """
+        Returns:
+            int: Index of the tier an incident with this escalation_status was last routed to, or None if
+                the policy has no such tier (e.g. it was renamed by a reload).
+        """
+        return self._tier_by_status.get(escalation_status or PENDING)
+
+    def due_tier(self, elapsed):
+        """
+        Returns:
+            int: Index of the last tier whose deadline has passed after elapsed unacknowledged seconds.
+        """
+        due = 0
+        for index, tier in enumerate(self.tiers):
+            if elapsed > tier.deadline:
+                due = index
+        return due
+
+
+def _as_list(value, field, policy_name):
+    if value is None or value == WILDCARD:
+        return [WILDCARD]
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not value or not all(isinstance(element, str) and element for element in value):
+        raise PolicyError(f"Policy {policy_name!r}: match.{field} must be a non-empty string or list of strings")
+    return [element.lower() for element in value]
+
+
+def _compile_policy(document, priority):
+    name = document.get("name") or f"policy-{priority}"
+    tier_documents = document.get("tiers")
+    if not isinstance(tier_documents, list) or not tier_documents:
+        raise PolicyError(f"Policy {name!r} needs at least one tier")
+    tiers = []
+    deadline = 0.0
+    for index, tier_document in enumerate(tier_documents):
+        if not isinstance(tier_document, dict) or not tier_document.get("name"):
+            raise PolicyError(f"Policy {name!r}: tier {index} needs a name")
+        timeout = tier_document.get("timeout")
+        if index < len(tier_documents) - 1 and (not isinstance(timeout, (int, float)) or timeout < 0):
+            raise PolicyError(f"Policy {name!r}: tier {tier_document['name']!r} needs a timeout before the next tier")
+        targets = tier_document.get("sns_targets", [])
+        if isinstance(targets, str):
+            targets = [targets]
+        tiers.append(Tier(tier_document["name"], index, deadline, timeout, tier_document.get("label"),
+                          tier_document.get("slack_channel"), tier_document.get("mention"), targets))
+        deadline += timeout or 0
+    statuses = [tier.escalation_status for tier in tiers]
+    if len(set(statuses)) != len(statuses):
+        raise PolicyError(f"Policy {name!r}: tier names must be unique")
+    return Policy(name, priority, tiers, document.get("slack_channel"))
+
+
+class RoutingTable:
+    """
+    Routing policies compiled into a lookup table.
+
+    Every (provider, impact, component) combination a policy lists, with "*" for the fields it leaves
+    open, is a key of one dict holding the highest-priority (first listed) policy for that key. Matching
+    an incident probes the 8 wildcard combinations of each of its components, so it takes the same time
+    with 10 or 10,000 policies.
+
+    Args:
+        policies (list[Policy]): Policies in priority order.
+        default (Policy): Used when no policy matches.
+    """
+
+    def __init__(self, policies, default):
+        self.policies = {policy.name: policy for policy in policies}
+        self.default = default
+        self._index = {}
+
+    @classmethod
+    def compile(cls, document, default):
+        """
+        Compile a policy document: {"policies": [{"name", "match": {"component", "impact", "provider"},
+        "slack_channel", "tiers": [{"name", "timeout", "label", "slack_channel", "mention", "sns_targets"}]}]}.
+
+        Raises:
+            PolicyError: If the document is invalid.
+        """
+        if not isinstance(document, dict) or not isinstance(document.get("policies", []), list):
+            raise PolicyError("A routing document needs a list of policies")
+        policies = []
+        names = set()
+        for priority, policy_document in enumerate(document.get("policies", [])):
+            if not isinstance(policy_document, dict):
+                raise PolicyError(f"Policy {priority} is not an object")
+            policy = _compile_policy(policy_document, priority)
+            if policy.name in names or policy.name == default.name:
+                raise PolicyError(f"Duplicate policy name {policy.name!r}")
+            names.add(policy.name)
+            policies.append(policy)
+        table = cls(policies, default)
+        for policy, policy_document in zip(policies, document.get("policies", [])):
+            match = policy_document.get("match") or {}
+            unknown = set(match) - set(MATCH_FIELDS)
+            if unknown:
+                raise PolicyError(f"Policy {policy.name!r}: unknown match field(s) {sorted(unknown)}")
+            for provider in _as_list(match.get("provider"), "provider", policy.name):
+                for impact in _as_list(match.get("impact"), "impact", policy.name):
+                    for component in _as_list(match.get("component"), "component", policy.name):
+                        # Policies come in priority order, so the first one to claim a key keeps it
+                        table._index.setdefault((provider, impact, component), policy)
+        return table
+
+    def __len__(self):
+        return len(self._index)
+
+    def match(self, components, impact, provider):
+        """
+        Find the policy of an incident.
+
+        Args:
+            components (iterable[str]): Names of the affected components (may be empty).
+            impact (str): The incident's impact ("minor", "major", "critical", "unknown", ...).
+            provider (str): Status page the incident comes from ("github").
+
+        Returns:
+            Policy: The highest-priority matching policy, or the default policy.
+        """
+        best = None
+        providers = (provider.lower(), WILDCARD) if provider else (WILDCARD,)
+        impacts = (impact.lower(), WILDCARD) if impact else (WILDCARD,)
+        candidates = [component.lower() for component in components if component] + [WILDCARD]
+        for provider_key in providers:
+            for impact_key in impacts:
+                for component in candidates:
+                    policy = self._index.get((provider_key, impact_key, component))
+                    if policy is not None and (best is None or policy.priority < best.priority):
+                        best = policy
+        return best or self.default
+
+    def policy(self, name):
+        """
+        Return the policy with this name (the default policy included), or None.
+        """
+        if name == self.default.name:
+            return self.default
+        return self.policies.get(name)
+
+
+def default_policy(tiers, slack_channel=""):
+    """
+    Build the policy used when no policy matches (or no policy file is configured).
+
+    Args:
+        tiers (list[dict]): Tier documents, as in a policy file.
+    """
+    return _compile_policy({"name": "default", "tiers": tiers, "slack_channel": slack_channel}, priority=-1)
+
+
+class RoutingPolicies:
+    """
+    The routing table of a policy file, reloaded when the file changes.
+
+    The file is checked at most every reload_interval seconds; an invalid file is logged and the
+    previous table kept, so a bad edit never stops escalations.
+
+    Args:
+        path (str): JSON policy file, or None to route everything with the default policy.
+        default_factory (callable): Returns the default Policy. It is called again at every reload_interval
+            check, whether or not the file changed (or there is none), so it can follow configuration that
+            changes at runtime.
+    """
+
+    def __init__(self, path, default_factory, reload_interval=ROUTING_RELOAD_INTERVAL, clock=time.monotonic):
+        self.path = path
+        self.default_factory = default_factory
+        self.reload_interval = reload_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._table = None
+        self._signature = None
+        self._next_check = 0.0
+
+    def _file_signature(self):
+        try:
+            status = os.stat(self.path)
+        except OSError:
+            return None
+        return status.st_ino, status.st_mtime_ns, status.st_size
+
+    def current(self):
+        """
+        Returns:
+            RoutingTable: The table of the current policy file.
+        """
+        with self._lock:
+            if self._table is not None and self._clock() < self._next_check:
+                return self._table
+            self._next_check = self._clock() + self.reload_interval
+            default = self.default_factory()
+            signature = self._file_signature() if self.path else None
+            if self._table is not None and signature == self._signature:
+                self._table.default = default
+                return self._table
+            self._load(signature, default)
+            return self._table
+
+    def _load(self, signature, default):
+        if not self.path:
+            self._table, self._signature = RoutingTable([], default), signature
+            return
+        try:
+            with open(self.path) as policy_file:
+                table = RoutingTable.compile(json.load(policy_file), default)
+        except (OSError, ValueError) as load_error:
+            logger.error(f"Failed to load routing policies from {self.path}: {load_error}")
+            if self._table is None:
+                self._table = RoutingTable([], default)
+            else:
+                self._table.default = default
+            return
+        logger.info(f"Loaded {len(table.policies)} routing policies ({len(table)} index keys) from {self.path}")
+        self._table, self._signature = table, signature
@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import MutableMapping
+
+logger = logging.getLogger(__name__)
+
+SECRETS_TTL = float(os.getenv("SECRETS_TTL", 3600))  # Seconds fetched secret values are considered current
+SECRETS_REFRESH_MARGIN = float(os.getenv("SECRETS_REFRESH_MARGIN", 300))  # Refresh this long before they expire
+SECRETS_RETRY_INTERVAL = 30  # Seconds between attempts after a failed refresh
+
+
+class SecretsError(RuntimeError):
+    """
+    Raised when secrets cannot be loaded.
+    """
+
+
+def parse_secret_string(secret_string):
+    """
+    Return the value of a secret: the (first) value of a JSON object, or the string itself.
+    """
+    try:
+        secret = json.loads(secret_string)
+    except ValueError:
+        return secret_string
+    if isinstance(secret, dict):
+        return next(iter(secret.values()), None)
+    return secret_string
+
+
+class SecretsProvider(MutableMapping):
+    """
+    Secrets Manager values, fetched together in one BatchGetSecretValue call and refreshed in the background.
+
+    The provider is a mapping of secret name to value, so it can be read like a dict (routing policies
+    resolve their "secret:<name>" references against it). Values are cached for ttl seconds and refreshed
+    refresh_margin seconds before they expire, so a rotated secret is picked up without a restart. Reads
+    never wait on Secrets Manager: if a refresh fails the previous values are kept (and the refresh retried)
+    rather than leaving the service without a token. Requested refreshes are limited to one per
+    retry_interval, so a revoked token rejected on every request does not cost a fetch per request.
+
+    Args:
+        client_factory (callable): Returns the Secrets Manager client.
+        names (list[str]): Secrets to fetch.
+        defaults (dict, optional): Values used until (and unless) a secret of the same name is fetched.
+        clock (callable): Monotonic seconds.
+    """
+
+    def __init__(self, client_factory, names, defaults=None, ttl=SECRETS_TTL, refresh_margin=SECRETS_REFRESH_MARGIN,
+                 retry_interval=SECRETS_RETRY_INTERVAL, clock=time.monotonic):
+        self.client_factory = client_factory
+        self.names = list(names)
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl)
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self._values = dict(defaults or {})
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._expires_at = None  # None until the first successful fetch
+        self._fetched_at = None  # Time of the last fetch, successful or not
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.fetches = 0  # BatchGetSecretValue calls made
+
+    def __getitem__(self, name):
+        with self._lock:
+            return self._values[name]
+
+    def __setitem__(self, name, value):
+        with self._lock:
+            self._values[name] = value
+
+    def __delitem__(self, name):
+        with self._lock:
+            del self._values[name]
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._values))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._values)
+
+    def copy(self):
+        with self._lock:
+            return dict(self._values)
+
+    def on_change(self, callback):
+        """
+        Call callback(changed) after every refresh that changed values (changed: name -> new value).
+        """
+        self._listeners.append(callback)
+
+    def fetch(self):
+        """
+        Fetch every secret in one BatchGetSecretValue call (following NextToken if the result is paged).
+
+        Returns:
+            tuple: (values by name, errors by name) of this fetch.
+        """
+        with self._lock:
+            self._fetched_at = self._clock()
+        client = self.client_factory()
+        values = {}
+        errors = {}
+        request = {"SecretIdList": self.names}
+        while True:
+            response = client.batch_get_secret_value(**request)
+            self.fetches += 1
+            for secret in response.get("SecretValues", []):
+                if secret.get("SecretString") is not None:
+                    values[secret["Name"]] = parse_secret_string(secret["SecretString"])
+            for error in response.get("Errors", []):
+                errors[error.get("SecretId")] = f"{error.get('ErrorCode')}: {error.get('Message')}"
+            if not response.get("NextToken"):
+                return values, errors
+            request["NextToken"] = response["NextToken"]
+
+    def refresh(self):
+        """
+        Fetch the secrets and swap in the new values. Secrets that failed to fetch keep their previous value.
+
+        Returns:
+            dict: The names and new values of the secrets that changed.
+
+        Raises:
+            Exception: If the BatchGetSecretValue call itself failed.
+        """
+        values, errors = self.fetch()
+        for name, error in errors.items():
+            logger.error(f"Failed to retrieve secret {name}: {error}")
+        with self._lock:
+            changed = {name: value for name, value in values.items() if self._values.get(name) != value}
+            self._values.update(values)
+            self._expires_at = self._clock() + self.ttl
+        if changed:
+            logger.info(f"Secrets updated: {', '.join(sorted(changed))}")
+            for listener in self._listeners:
+                try:
+                    listener(changed)
+                except Exception as listener_error:
+                    logger.error(f"Failed to apply updated secrets: {listener_error}")
+        return changed
+
+    def load(self):
+        """
+        Fetch the secrets for the first time (at startup).
+
+        Raises:
+            SecretsError: If the fetch failed or a secret is missing.
+        """
+        try:
+            values, errors = self.fetch()
+        except Exception as fetch_error:
+            raise SecretsError(f"Failed to retrieve secrets: {fetch_error}") from fetch_error
+        missing = [name for name in self.names if name not in values]
+        if missing:
+            raise SecretsError(f"Failed to retrieve secrets {missing}: {errors}")
+        with self._lock:
+            self._values.update(values)
+            self._expires_at = self._clock() + self.ttl
+        for listener in self._listeners:
+            listener(dict(values))
+
+    def seconds_to_refresh(self):
+        """
+        Returns:
+            float: Seconds until the next refresh is due (0 if it is due, or nothing was fetched yet).
+        """
+        with self._lock:
+            if self._expires_at is None:
+                return 0.0
+            return max(0.0, self._expires_at - self.refresh_margin - self._clock())
+
+    def expired(self):
+        with self._lock:
+            return self._expires_at is None or self._clock() >= self._expires_at
+
+    def request_refresh(self):
+        """
+        Refresh in the background now (e.g. after a credential was rejected) instead of at the next due time,
+        unless the last fetch was less than retry_interval seconds ago.
+
+        Returns:
+            bool: Whether a refresh was requested.
+        """
+        with self._lock:
+            if self._fetched_at is not None and self._clock() - self._fetched_at < self.retry_interval:
+                return False
+        self._wake.set()
+        return True
+
+    def start(self):
+        """
+        Start the background refresh thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="secrets-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        delay = self.seconds_to_refresh()
+        while not self._stopped.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                self.refresh()
+                delay = self.seconds_to_refresh()
+            except Exception as refresh_error:
+                state = "expired, still using them" if self.expired() else "still current"
+                logger.error(f"Failed to refresh secrets ({state}): {refresh_error}")
+                delay = self.retry_interval
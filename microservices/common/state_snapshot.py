@@ -0,0 +1,212 @@
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime
+
+from common.incident_model import Incident
+
+MAGIC = b"GHMS"
+FORMAT_VERSION = 2
+
+# magic, format version, flags, saved_at, summary fingerprint (sha1), incident count, component count,
+# ETag offset and length in the string heap, last event id, event count
+_HEADER = struct.Struct("<4sHHd20sIIIIqI")
+# sha1(incident_id), updated_at (epoch seconds, NaN if unknown), record offset and length in the heap
+_INCIDENT_ENTRY = struct.Struct("<20sdII")
+# record offset and length in the heap
+_COMPONENT_ENTRY = struct.Struct("<II")
+# record offset and length in the heap
+_EVENT_ENTRY = struct.Struct("<II")
+# CRC32 of everything before it
+_TRAILER = struct.Struct("<I")
+
+
+def _id_digest(incident_id):
+    return hashlib.sha1(incident_id.encode("utf-8")).digest()
+
+
+def _epoch(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return float("nan")
+
+
+class SnapshotError(Exception):
+    """
+    Raised when a snapshot file is missing, truncated, corrupt or of an unknown format.
+    """
+
+
+def write_snapshot(path, saved_at, fingerprint, etag, incidents, components, last_event_id=0, events=()):
+    """
+    Write the monitor's working state to path, atomically replacing the previous snapshot.
+
+    The file is written next to path, flushed to disk and renamed over it, so a crash leaves
+    either the old or the new snapshot, never a partial one.
+
+    Args:
+        saved_at (float): Epoch seconds.
+        fingerprint (str): Hex sha1 of the last processed summary ("" if unknown).
+        etag (str): ETag of the last processed summary ("" if unknown).
+        incidents (iterable[Incident]): Incidents the monitor knows about.
+        components (dict): component_id -> (name, status, group_id).
+        last_event_id (int): Id of the last event the monitor published.
+        events (iterable[tuple]): (event_id, event type, JSON data) of the latest events, oldest first
+            (EventHub.recent()), which API workers republish with the same ids.
+    """
+    heap = bytearray()
+
+    def add(data):
+        offset = len(heap)
+        heap.extend(data)
+        return offset, len(data)
+
+    etag_offset, etag_length = add((etag or "").encode("utf-8"))
+    incident_entries = []
+    for incident in incidents:
+        offset, length = add(json.dumps(incident.to_dict(), separators=(",", ":")).encode("utf-8"))
+        incident_entries.append((_id_digest(incident.incident_id), _epoch(incident.updated_at), offset, length))
+    # Sorted by id digest, so one incident can be looked up with a binary search over the mapped file
+    incident_entries.sort()
+    component_entries = [
+        add(json.dumps([component_id, name, status, group_id], separators=(",", ":")).encode("utf-8"))
+        for component_id, (name, status, group_id) in components.items()
+    ]
+    event_entries = [add(json.dumps(list(event), separators=(",", ":")).encode("utf-8")) for event in events]
+
+    body = bytearray(_HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, saved_at, bytes.fromhex(fingerprint) if fingerprint else b"\0" * 20,
+        len(incident_entries), len(component_entries), etag_offset, etag_length, last_event_id, len(event_entries),
+    ))
+    for entry in incident_entries:
+        body.extend(_INCIDENT_ENTRY.pack(*entry))
+    for entry in component_entries:
+        body.extend(_COMPONENT_ENTRY.pack(*entry))
+    for entry in event_entries:
+        body.extend(_EVENT_ENTRY.pack(*entry))
+    body.extend(heap)
+    body.extend(_TRAILER.pack(zlib.crc32(body)))
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as snapshot_file:
+        snapshot_file.write(body)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temporary_path, path)
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+class StateSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot written by write_snapshot.
+
+    Only the header is decoded when the snapshot is opened; incident records are decoded on access.
+    """
+
+    def __init__(self, path):
+        try:
+            with open(path, "rb") as snapshot_file:
+                self._map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as open_error:
+            raise SnapshotError(f"Cannot open snapshot {path}: {open_error}")
+        size = len(self._map)
+        if size < _HEADER.size + _TRAILER.size:
+            self.close()
+            raise SnapshotError(f"Snapshot {path} is truncated")
+        (magic, version, _, self.saved_at, fingerprint, self.incident_count, self.component_count,
+         etag_offset, etag_length, self.last_event_id, self.event_count) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise SnapshotError(f"Snapshot {path} has an unknown format")
+        if _TRAILER.unpack_from(self._map, size - _TRAILER.size)[0] != zlib.crc32(self._map[:size - _TRAILER.size]):
+            self.close()
+            raise SnapshotError(f"Snapshot {path} is corrupt")
+        self.fingerprint = fingerprint.hex() if fingerprint.strip(b"\0") else ""
+        self._incidents_at = _HEADER.size
+        self._components_at = self._incidents_at + self.incident_count * _INCIDENT_ENTRY.size
+        self._events_at = self._components_at + self.component_count * _COMPONENT_ENTRY.size
+        self._heap_at = self._events_at + self.event_count * _EVENT_ENTRY.size
+        self.etag = self._heap(etag_offset, etag_length).decode("utf-8")
+
+    def _heap(self, offset, length):
+        start = self._heap_at + offset
+        return self._map[start:start + length]
+
+    def _incident_entry(self, index):
+        return _INCIDENT_ENTRY.unpack_from(self._map, self._incidents_at + index * _INCIDENT_ENTRY.size)
+
+    def updated_at(self, incident_id):
+        """
+        Return the stored updated_at (epoch seconds) of an incident, or None if it is not in the snapshot.
+        """
+        digest = _id_digest(incident_id)
+        digests = _DigestView(self)
+        index = bisect.bisect_left(digests, digest)
+        if index < self.incident_count and digests[index] == digest:
+            return self._incident_entry(index)[1]
+        return None
+
+    def incidents(self):
+        """
+        Decode every incident in the snapshot.
+
+        Returns:
+            list[Incident]
+        """
+        return [Incident.coerce(json.loads(self._heap(*self._incident_entry(index)[2:]))) for index in range(self.incident_count)]
+
+    def components(self):
+        """
+        Returns:
+            dict: component_id -> (name, status, group_id)
+        """
+        components = {}
+        for index in range(self.component_count):
+            offset, length = _COMPONENT_ENTRY.unpack_from(self._map, self._components_at + index * _COMPONENT_ENTRY.size)
+            component_id, name, status, group_id = json.loads(self._heap(offset, length))
+            components[component_id] = (name, status, group_id)
+        return components
+
+    def events(self):
+        """
+        Returns:
+            list[tuple]: (event_id, event type, JSON data) of the latest events, oldest first.
+        """
+        events = []
+        for index in range(self.event_count):
+            offset, length = _EVENT_ENTRY.unpack_from(self._map, self._events_at + index * _EVENT_ENTRY.size)
+            events.append(tuple(json.loads(self._heap(offset, length))))
+        return events
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _DigestView:
+    """
+    Sequence of the incident id digests of a snapshot, for bisect.
+    """
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def __len__(self):
+        return self._snapshot.incident_count
+
+    def __getitem__(self, index):
+        return self._snapshot._incident_entry(index)[0]
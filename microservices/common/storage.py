@@ -0,0 +1,432 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from common.aws_clients import is_conditional_check_failure
+from common.incident_model import encode_attribute
+from common.lifecycle import RESOLVED
+
+logger = logging.getLogger(__name__)
+
+# Incident storage used by the monitor and the notifier. Both backends store items (plain dicts keyed by
+# incident_id) in named tables and provide the same operations:
+#     get(table_name, incident_id, consistent=False) -> item or None
+#     batch_put(table_name, items)
+#     put_new(puts): atomically insert [(table_name, item)], only if none of them exists yet
+#     update(table_name, incident_id, changes, condition=None): set attributes, creating the item if needed
+#     open_incidents(table_name) -> items whose incident_status is not Resolved
+#     due_for_archive(table_name, now) -> items whose archive_at has passed
+#     batch_delete(table_name, incident_ids)
+#     missing_tables(table_names) -> the tables that cannot be used
+# A write whose condition does not hold raises ConditionFailed.
+
+_TABLE_NAME = re.compile(r"^[A-Za-z0-9_.-]{3,255}$")
+
+
+class ConditionFailed(Exception):
+    """
+    Raised when a conditional write is rejected because the stored item does not meet its condition.
+    """
+
+
+class Condition:
+    """
+    Condition on the stored item that a write requires.
+
+    expression() translates it into a DynamoDB ConditionExpression; matches() evaluates it on the
+    stored item (None if there is no item), which is how the SQLite backend applies it.
+    Conditions can be combined with |.
+    """
+
+    def __or__(self, other):
+        return AnyOf(self, other)
+
+    def expression(self, placeholders):
+        raise NotImplementedError
+
+    def matches(self, item):
+        raise NotImplementedError
+
+
+class ItemExists(Condition):
+
+    def expression(self, placeholders):
+        return "attribute_exists(incident_id)"
+
+    def matches(self, item):
+        return item is not None
+
+
+class ItemMissing(Condition):
+
+    def expression(self, placeholders):
+        return "attribute_not_exists(incident_id)"
+
+    def matches(self, item):
+        return item is None
+
+
+class AttributeMissing(Condition):
+
+    def __init__(self, name):
+        self.name = name
+
+    def expression(self, placeholders):
+        return f"attribute_not_exists({placeholders.name(self.name)})"
+
+    def matches(self, item):
+        return item is None or self.name not in item
+
+
+class Equals(Condition):
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def expression(self, placeholders):
+        return f"{placeholders.name(self.name)} = {placeholders.value(self.value)}"
+
+    def matches(self, item):
+        return item is not None and self.name in item and item[self.name] == self.value
+
+
+class LessThan(Condition):
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def expression(self, placeholders):
+        return f"{placeholders.name(self.name)} < {placeholders.value(self.value)}"
+
+    def matches(self, item):
+        if item is None or item.get(self.name) is None:
+            return False
+        try:
+            return item[self.name] < self.value
+        except TypeError:
+            return False
+
+
+class AnyOf(Condition):
+
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def __or__(self, other):
+        return AnyOf(*self.conditions, other)
+
+    def expression(self, placeholders):
+        return " OR ".join(condition.expression(placeholders) for condition in self.conditions)
+
+    def matches(self, item):
+        return any(condition.matches(item) for condition in self.conditions)
+
+
+class _Placeholders:
+    """
+    Collects the ExpressionAttributeNames and ExpressionAttributeValues of a condition expression.
+    """
+
+    def __init__(self, names=None):
+        self.names = dict(names or {})
+        self.values = {}
+
+    def name(self, attribute_name):
+        for placeholder, name in self.names.items():
+            if name == attribute_name:
+                return placeholder
+        placeholder = f"#c{len(self.names)}"
+        self.names[placeholder] = attribute_name
+        return placeholder
+
+    def value(self, value):
+        placeholder = f":c{len(self.values)}"
+        self.values[placeholder] = value
+        return placeholder
+
+
+class DynamoDBStore:
+    """
+    Incident storage on DynamoDB tables (partition key incident_id), through the service's AwsClients.
+    """
+
+    def __init__(self, aws):
+        self.aws = aws
+
+    def get(self, table_name, incident_id, consistent=False):
+        response = self.aws.table(table_name).get_item(Key={"incident_id": incident_id}, ConsistentRead=consistent)
+        return response.get("Item")
+
+    def batch_put(self, table_name, items):
+        """
+        Write items unconditionally, 25 per BatchWriteItem request; unprocessed items are retried by boto3.
+        """
+        with self.aws.table(table_name).batch_writer(overwrite_by_pkeys=["incident_id"]) as batch:
+            for item in items:
+                batch.put_item(Item=item)
+
+    def put_missing(self, table_name, items):
+        """
+        Insert each item that does not exist yet, leaving existing ones untouched (one conditional PutItem each:
+        BatchWriteItem takes no conditions, and a transaction would fail as a whole on one existing item).
+
+        Returns:
+            int: The number of items written.
+        """
+        table = self.aws.table(table_name)
+        written = 0
+        for item in items:
+            try:
+                table.put_item(Item=item, ConditionExpression="attribute_not_exists(incident_id)")
+                written += 1
+            except Exception as put_error:
+                if not is_conditional_check_failure(put_error):
+                    raise
+        return written
+
+    def put_new(self, puts):
+        """
+        Insert items into one or more tables in a single transaction, each conditioned on not existing yet.
+
+        Raises:
+            ConditionFailed: If any of the items already exists; nothing is written.
+        """
+        try:
+            self.aws.dynamodb().meta.client.transact_write_items(TransactItems=[
+                {"Put": {
+                    "TableName": table_name,
+                    "Item": {name: encode_attribute(value) for name, value in item.items()},
+                    "ConditionExpression": "attribute_not_exists(incident_id)",
+                }}
+                for table_name, item in puts
+            ])
+        except Exception as put_error:
+            if is_conditional_check_failure(put_error):
+                raise ConditionFailed(str(put_error)) from put_error
+            raise
+
+    def update(self, table_name, incident_id, changes, condition=None):
+        """
+        Set the given attributes of an item in one UpdateItem request.
+
+        Raises:
+            ConditionFailed: If condition does not hold for the stored item.
+        """
+        placeholders = _Placeholders(names={f"#a{index}": name for index, name in enumerate(changes)})
+        kwargs = {
+            "Key": {"incident_id": incident_id},
+            "UpdateExpression": "SET " + ", ".join(f"#a{index} = :v{index}" for index in range(len(changes))),
+        }
+        if condition is not None:
+            kwargs["ConditionExpression"] = condition.expression(placeholders)
+        kwargs["ExpressionAttributeNames"] = placeholders.names
+        kwargs["ExpressionAttributeValues"] = {**{f":v{index}": value for index, value in enumerate(changes.values())},
+                                               **placeholders.values}
+        try:
+            self.aws.table(table_name).update_item(**kwargs)
+        except Exception as update_error:
+            if is_conditional_check_failure(update_error):
+                raise ConditionFailed(str(update_error)) from update_error
+            raise
+
+    def _scan(self, table_name, **scan_kwargs):
+        table = self.aws.table(table_name)
+        while True:
+            response = table.scan(**scan_kwargs)
+            yield from response.get("Items", [])
+            if "LastEvaluatedKey" not in response:
+                return
+            scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def open_incidents(self, table_name):
+        return list(self._scan(table_name, FilterExpression="incident_status <> :resolved",
+                               ExpressionAttributeValues={":resolved": RESOLVED}))
+
+    def due_for_archive(self, table_name, now):
+        return self._scan(table_name, FilterExpression="archive_at < :now", ExpressionAttributeValues={":now": int(now)})
+
+    def batch_delete(self, table_name, incident_ids):
+        with self.aws.table(table_name).batch_writer() as batch:
+            for incident_id in incident_ids:
+                batch.delete_item(Key={"incident_id": incident_id})
+
+    def missing_tables(self, table_names):
+        existing = set(self.aws.dynamodb().meta.client.list_tables().get("TableNames", []))
+        return [table_name for table_name in table_names if table_name not in existing]
+
+    def warm(self, table_names):
+        """
+        Build the DynamoDB client and table resources ahead of the first request.
+        """
+        return self.aws.warm("dynamodb", table_names=table_names)
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class SqliteStore:
+    """
+    Embedded incident storage in one SQLite database file, for edge deployments and offline tests.
+
+    Each table holds the item as JSON next to the columns it is queried by (incident_status, archive_at),
+    with partial indexes for the open-incident and archive queries. The database runs in WAL mode, so
+    the monitor and the notifier can share the file: readers never block the (serialized) writer.
+    Conditional writes read and write the item inside one BEGIN IMMEDIATE transaction.
+
+    Args:
+        path (str): Database file (":memory:" for a private in-memory database).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # Durable at every checkpoint rather than every commit; a crash loses at most the last commits
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self._tables = set()
+
+    def _table(self, table_name):
+        """
+        Create the table and its indexes on first use, and return its quoted name.
+        """
+        if not _TABLE_NAME.match(table_name):
+            raise ValueError(f"Invalid table name: {table_name}")
+        quoted = f'"{table_name}"'
+        if table_name not in self._tables:
+            with self._lock:
+                self._connection.executescript(f"""
+                    CREATE TABLE IF NOT EXISTS {quoted} (
+                        incident_id TEXT PRIMARY KEY,
+                        incident_status TEXT,
+                        archive_at INTEGER,
+                        item TEXT NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS "{table_name}_open" ON {quoted} (incident_status)
+                        WHERE incident_status != '{RESOLVED}';
+                    CREATE INDEX IF NOT EXISTS "{table_name}_archive_at" ON {quoted} (archive_at)
+                        WHERE archive_at IS NOT NULL;
+                """)
+                self._tables.add(table_name)
+        return quoted
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    @staticmethod
+    def _row(item):
+        archive_at = item.get("archive_at")
+        return (
+            item["incident_id"],
+            item.get("incident_status"),
+            int(archive_at) if archive_at not in (None, "") else None,
+            json.dumps(item, default=_json_default),
+        )
+
+    def _upsert(self, connection, quoted, items):
+        connection.executemany(
+            f"INSERT OR REPLACE INTO {quoted} (incident_id, incident_status, archive_at, item) VALUES (?, ?, ?, ?)",
+            [self._row(item) for item in items],
+        )
+
+    def get(self, table_name, incident_id, consistent=False):
+        quoted = self._table(table_name)
+        with self._lock:
+            row = self._connection.execute(f"SELECT item FROM {quoted} WHERE incident_id = ?", (incident_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def batch_put(self, table_name, items):
+        quoted = self._table(table_name)
+        with self._transaction() as connection:
+            self._upsert(connection, quoted, items)
+
+    def put_missing(self, table_name, items):
+        quoted = self._table(table_name)
+        with self._transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                f"INSERT OR IGNORE INTO {quoted} (incident_id, incident_status, archive_at, item) VALUES (?, ?, ?, ?)",
+                [self._row(item) for item in items],
+            )
+            return connection.total_changes - before
+
+    def put_new(self, puts):
+        tables = [(self._table(table_name), item) for table_name, item in puts]
+        with self._transaction() as connection:
+            for quoted, item in tables:
+                if connection.execute(f"SELECT 1 FROM {quoted} WHERE incident_id = ?", (item["incident_id"],)).fetchone():
+                    raise ConditionFailed(f"Item {item['incident_id']} already exists")
+            for quoted, item in tables:
+                self._upsert(connection, quoted, [item])
+
+    def update(self, table_name, incident_id, changes, condition=None):
+        quoted = self._table(table_name)
+        with self._transaction() as connection:
+            row = connection.execute(f"SELECT item FROM {quoted} WHERE incident_id = ?", (incident_id,)).fetchone()
+            item = json.loads(row[0]) if row else None
+            if condition is not None and not condition.matches(item):
+                raise ConditionFailed(f"Condition failed for {incident_id} in {table_name}")
+            self._upsert(connection, quoted, [{**(item or {"incident_id": incident_id}), **changes}])
+
+    def open_incidents(self, table_name):
+        quoted = self._table(table_name)
+        with self._lock:
+            rows = self._connection.execute(f"SELECT item FROM {quoted} WHERE incident_status != '{RESOLVED}'").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def due_for_archive(self, table_name, now):
+        quoted = self._table(table_name)
+        with self._lock:
+            rows = self._connection.execute(f"SELECT item FROM {quoted} WHERE archive_at < ?", (int(now),)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def batch_delete(self, table_name, incident_ids):
+        quoted = self._table(table_name)
+        with self._transaction() as connection:
+            connection.executemany(f"DELETE FROM {quoted} WHERE incident_id = ?", [(incident_id,) for incident_id in incident_ids])
+
+    def missing_tables(self, table_names):
+        # Tables are created on first use
+        for table_name in table_names:
+            self._table(table_name)
+        return []
+
+    def warm(self, table_names):
+        self.missing_tables(table_names)
+        return {}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def storage_from_env(aws):
+    """
+    Build the incident storage configured by STORAGE_BACKEND: "dynamodb" (default) or "sqlite" (file SQLITE_PATH).
+    """
+    backend = os.getenv("STORAGE_BACKEND", "dynamodb").lower()
+    if backend == "sqlite":
+        return SqliteStore(os.getenv("SQLITE_PATH", "/data/incidents.db"))
+    if backend != "dynamodb":
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; expected 'dynamodb' or 'sqlite'")
+    return DynamoDBStore(aws)
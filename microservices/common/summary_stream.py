@@ -0,0 +1,183 @@
+import codecs
+import json
+import re
+
+# Top-level arrays of a Statuspage summary.json that the services consume
+SUMMARY_SECTIONS = ("components", "incidents")
+
+_WHITESPACE = " \t\n\r"
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_PRIMITIVE_END = re.compile(r'[,\]}\s]')
+
+
+class _Reader:
+    """
+    Buffered reader over an iterable of text or bytes chunks.
+
+    Only the value currently being read is kept in the buffer; consumed input is dropped
+    before each value, and values that are skipped are discarded while they are scanned.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        while not self.eof:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.eof = True
+                chunk = self._decoder.decode(b"", final=True)
+            else:
+                if isinstance(chunk, bytes):
+                    chunk = self._decoder.decode(chunk)
+            if chunk:
+                self.buf += chunk
+                return True
+        return False
+
+    def _compact(self):
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+    def peek(self):
+        """
+        Return the next non-whitespace character without consuming it.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def take(self, expected=None):
+        char = self.peek()
+        if expected is not None and char != expected:
+            raise ValueError(f"Expected '{expected}' in JSON stream, found '{char}'")
+        self.pos += 1
+        return char
+
+    def _value_end(self, discard):
+        """
+        Return the buffer index just past the JSON value starting at self.pos.
+
+        If discard is set, already scanned input is dropped while reading more, so skipping
+        a large value never holds more than one chunk.
+        """
+        self.peek()
+        self._compact()
+        index = 0
+        first = self.buf[0]
+
+        if first not in '"[{':
+            while True:
+                match = _PRIMITIVE_END.search(self.buf, index)
+                if match:
+                    return match.start()
+                if not self._fill():
+                    return len(self.buf)
+
+        depth = 0
+        in_string = False
+        while True:
+            if in_string:
+                match = _STRING_SPECIAL.search(self.buf, index)
+                if match and match.group() == "\\" and match.end() < len(self.buf):
+                    index = match.end() + 1
+                    continue
+                if match and match.group() == '"':
+                    in_string = False
+                    index = match.end()
+                    if depth == 0:
+                        return index
+                    continue
+                index = match.start() if match else len(self.buf)
+            else:
+                match = _STRUCTURE.search(self.buf, index)
+                if match:
+                    index = match.end()
+                    char = match.group()
+                    if char == '"':
+                        in_string = True
+                    elif char in "[{":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            return index
+                    continue
+                index = len(self.buf)
+
+            if discard:
+                self.buf = self.buf[index:]
+                index = 0
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def read_value(self):
+        end = self._value_end(discard=False)
+        value = json.loads(self.buf[:end])
+        self.pos = end
+        return value
+
+    def skip_value(self):
+        self.pos = self._value_end(discard=True)
+
+
+def iter_summary_items(chunks, sections=SUMMARY_SECTIONS):
+    """
+    Incrementally parse a summary.json body and yield the elements of the wanted arrays.
+
+    Elements are decoded one at a time as soon as they are complete; every other top-level
+    field (page, status, scheduled_maintenances, ...) is skipped without being decoded.
+
+    Args:
+        chunks (iterable[bytes | str]): The response body, e.g. response.iter_content().
+        sections (tuple[str]): Names of the top-level arrays to yield elements from.
+
+    Yields:
+        tuple[str, dict]: (section name, element) in document order.
+    """
+    reader = _Reader(chunks)
+    reader.take("{")
+    while True:
+        char = reader.take()
+        if char == "}":
+            return
+        if char == ",":
+            continue
+        if char != '"':
+            raise ValueError(f"Expected a key in JSON stream, found '{char}'")
+        reader.pos -= 1
+        key = reader.read_value()
+        reader.take(":")
+        if key not in sections or reader.peek() != "[":
+            reader.skip_value()
+            continue
+        reader.take("[")
+        while True:
+            char = reader.peek()
+            if char == "]":
+                reader.take()
+                break
+            if char == ",":
+                reader.take()
+                continue
+            yield key, reader.read_value()
+
+
+def iter_summary_dict(data, sections=SUMMARY_SECTIONS):
+    """
+    Yield the same (section, element) pairs as iter_summary_items from an already decoded summary.
+    """
+    for section in sections:
+        for item in data.get(section, []):
+            yield section, item
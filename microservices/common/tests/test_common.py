@@ -0,0 +1,1200 @@
+import asyncio
+import gc
+import gzip
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+from common.aws_clients import AwsClients, StartupTimer
+from common.incident_model import Incident, EscalationRecord
+from common.summary_stream import iter_summary_items
+from common.delta import DeltaEngine, IncidentDelta
+from common.component_history import ComponentHistory
+from common.clock import ScaledClock
+from common.replay import ReplayFinished, ReplaySource, SummaryRecorder, read_recording
+from common.state_snapshot import SnapshotError, StateSnapshot, write_snapshot
+from common.event_hub import EventHub, TooManySubscribers
+from common.incident_index import IncidentIndex, query_incidents
+from common.lifecycle import EXPIRE_AFTER_SECONDS, Archiver, LocalArchiveStore, closing_attributes
+from common.tracing import FileSpanExporter, Tracer, parse_traceparent, trace_boto3_client
+from common.profiling import COLLAPSED, PSTATS, CycleProfiler
+from common.storage import ConditionFailed, DynamoDBStore, Equals, ItemExists, LessThan, SqliteStore, AttributeMissing
+from common.latency import LATENCY_SECONDS, LatencyTracker, QuantileSketch, merge_sketches, seconds_between
+from common.backfill import HistoryBackfill
+from common.routing import PolicyError, RoutingPolicies, RoutingTable, default_policy, resolve_secret
+from common.secrets_provider import SecretsError, SecretsProvider
+from common.refresh_scheduler import RefreshScheduler
+from common.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, instrument_boto3_client
+
+
+class TestAwsClients(unittest.TestCase):
+
+    @patch("common.aws_clients.boto3.session.Session")
+    def test_clients_are_built_lazily_and_once(self, mock_session):
+        clients = AwsClients(region_name="us-west-2")
+        mock_session.assert_not_called()
+
+        first = clients.sns()
+        second = clients.sns()
+
+        self.assertIs(first, second, "SNS client should be cached after the first call.")
+        mock_session.assert_called_once_with(region_name="us-west-2")
+
+    @patch("common.aws_clients.boto3.session.Session")
+    def test_concurrent_first_use_builds_one_client(self, mock_session):
+        clients = AwsClients()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(clients.dynamodb())) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(id(result) for result in results)), 1)
+        self.assertEqual(mock_session.call_count, 1)
+
+    @patch("common.aws_clients.boto3.session.Session")
+    def test_warm_builds_clients_and_tables(self, mock_session):
+        mock_session.return_value.resource.return_value = MagicMock()
+        clients = AwsClients()
+
+        timings = clients.warm("dynamodb", "sns", table_names=("TestGithubIncidents",))
+
+        self.assertEqual(set(timings), {"dynamodb", "sns", "table:TestGithubIncidents"})
+        mock_session.return_value.resource.return_value.Table.assert_called_once_with("TestGithubIncidents")
+
+    def test_startup_timer_records_phases(self):
+        timer = StartupTimer()
+        with timer.phase("load"):
+            pass
+        report = timer.report("test")
+        self.assertIn("load", report)
+        self.assertGreaterEqual(report["total"], report["load"])
+
+
+class TestIncidentModel(unittest.TestCase):
+
+    def make_incident(self):
+        return Incident(
+            incident_id="abc123",
+            internal_incident_id="cyberark-1",
+            created_at="2024-11-23T12:00:00Z",
+            impact="major",
+            status="investigating",
+            name="API Outage",
+            updated_at="2024-11-23T12:30:00Z",
+            affected_components=["API Requests", "Webhooks"],
+        )
+
+    def test_item_round_trip(self):
+        incident = self.make_incident()
+        item = incident.to_item()
+
+        self.assertEqual(json.loads(item["affected_components"]), ["API Requests", "Webhooks"])
+        self.assertEqual(item["github_status"], "investigating")
+        self.assertEqual(Incident.from_item(item), incident)
+
+    def test_attribute_map_round_trip(self):
+        record = EscalationRecord.new(self.make_incident(), "2024-11-23T12:31:00Z")
+        attributes = record.to_attribute_map()
+
+        self.assertEqual(attributes["escalation_status"], {"S": "Pending"})
+        self.assertEqual(attributes["slack_message_thread_ts"], {"NULL": True})
+        self.assertEqual(EscalationRecord.from_attribute_map(attributes), record)
+
+    def test_dict_style_access_and_coerce(self):
+        incident = Incident.coerce({"incident_id": "x", "status": "investigating", "history": []})
+
+        self.assertEqual(incident["status"], "investigating")
+        self.assertEqual(incident.get("resolved_at"), "")
+        incident["status"] = "resolved"
+        self.assertEqual(incident.status, "resolved")
+        with self.assertRaises(KeyError):
+            incident["history"]
+        with self.assertRaises(AttributeError):
+            incident.history = []
+
+
+class TestSummaryStream(unittest.TestCase):
+
+    summary = {
+        "page": {"id": "kctbh9vrtdwd", "name": "GitHub", "url": "https://www.githubstatus.com"},
+        "components": [
+            {"id": "c1", "name": "API Requests", "status": "major_outage", "group_id": "i1"},
+            {"id": "c2", "name": "Git \"Operations\" \\ \u00e9", "status": "operational", "group_id": None},
+        ],
+        "incidents": [
+            {"id": "i1", "name": "Degraded [API] {latency}", "status": "investigating", "impact": "major",
+             "incident_updates": [{"id": "u1", "body": "We are investigating ]} reports"}]},
+        ],
+        "scheduled_maintenances": [{"id": "m1", "name": "Database Upgrade", "status": "in_progress"}],
+        "status": {"indicator": "major", "description": "Partial System Outage"},
+    }
+
+    def chunked(self, size):
+        body = json.dumps(self.summary, indent=1).encode("utf-8")
+        return [body[i:i + size] for i in range(0, len(body), size)]
+
+    def test_yields_only_wanted_sections_for_any_chunk_size(self):
+        expected = [("components", component) for component in self.summary["components"]]
+        expected += [("incidents", incident) for incident in self.summary["incidents"]]
+        for size in (1, 2, 7, 64, 100000):
+            self.assertEqual(list(iter_summary_items(self.chunked(size))), expected, f"chunk size {size}")
+
+    def test_truncated_stream_raises(self):
+        body = b"".join(self.chunked(100000))
+        with self.assertRaises(ValueError):
+            list(iter_summary_items([body[:len(body) // 2]]))
+
+
+class TestDeltaEngine(unittest.TestCase):
+
+    def github_incident(self, **fields):
+        defaults = {"incident_id": "i1", "internal_incident_id": f"cyberark-{fields.pop('internal', 'a')}",
+                    "created_at": "t0", "impact": "major", "status": "investigating", "name": "API Outage",
+                    "updated_at": "t0", "affected_components": ["API"]}
+        defaults.update(fields)
+        return Incident(**defaults)
+
+    def component_incident(self, internal_id, status="major_outage", updated_at="t0"):
+        return Incident(incident_id=internal_id, internal_incident_id=internal_id, created_at=updated_at,
+                        status=status, name="Pages", updated_at=updated_at, affected_components=["Pages"],
+                        component_id="c2")
+
+    def test_first_summary_creates_everything(self):
+        engine = DeltaEngine()
+        deltas = engine.diff([self.github_incident()], {"c1": ("API", "major_outage", "i1")})
+
+        self.assertEqual([delta.kind for delta in deltas], [IncidentDelta.CREATED])
+        self.assertEqual(deltas[0].component_transitions, (("API", "operational", "major_outage"),))
+
+    def test_only_changed_fields_are_reported(self):
+        engine = DeltaEngine()
+        engine.diff([self.github_incident()], {})
+
+        deltas = engine.diff([self.github_incident(internal="b", status="monitoring", updated_at="t1")], {})
+
+        self.assertEqual(len(deltas), 1)
+        self.assertEqual(deltas[0].kind, IncidentDelta.UPDATED)
+        self.assertEqual(deltas[0].changes, {"status": "monitoring", "updated_at": "t1", "github_status": "monitoring"})
+        self.assertEqual(deltas[0].incident.internal_incident_id, "cyberark-a", "internal id must be kept across cycles")
+        self.assertEqual(engine.diff([self.github_incident(status="monitoring", updated_at="t1")], {}), [])
+
+    def test_resolved_and_disappeared(self):
+        engine = DeltaEngine()
+        engine.diff([self.github_incident(), self.github_incident(incident_id="i2")], {})
+
+        deltas = engine.diff([self.github_incident(status="resolved", resolved_at="t2")], {})
+
+        kinds = {delta.incident_id: delta.kind for delta in deltas}
+        self.assertEqual(kinds, {"i1": IncidentDelta.RESOLVED, "i2": IncidentDelta.DISAPPEARED})
+        disappeared = next(delta for delta in deltas if delta.incident_id == "i2")
+        self.assertEqual(disappeared.incident.github_status, "resolved")
+        self.assertEqual(engine.diff([], {}), [], "resolved incidents dropping out are not reported again")
+
+    def test_component_outage_keeps_its_id(self):
+        engine = DeltaEngine()
+        engine.diff([self.component_incident("cyberark-1")], {"c2": ("Pages", "major_outage", None)})
+
+        deltas = engine.diff([self.component_incident("cyberark-2", status="partial_outage", updated_at="t1")],
+                             {"c2": ("Pages", "partial_outage", None)})
+        self.assertEqual(len(deltas), 1)
+        self.assertEqual(deltas[0].incident_id, "cyberark-1")
+        self.assertEqual(deltas[0].component_transitions, (("Pages", "major_outage", "partial_outage"),))
+
+        deltas = engine.diff([], {"c2": ("Pages", "operational", None)})
+        self.assertEqual([(delta.kind, delta.incident_id) for delta in deltas], [(IncidentDelta.DISAPPEARED, "cyberark-1")])
+        self.assertEqual(deltas[0].incident.github_status, "operational")
+
+    def test_partial_summary_does_not_close_incidents(self):
+        engine = DeltaEngine()
+        engine.diff([self.github_incident()], {})
+
+        self.assertEqual(engine.diff([], {}, partial=True), [])
+        self.assertIn("i1", engine.incidents)
+
+
+class TestLifecycle(unittest.TestCase):
+
+    def test_closing_attributes_schedule_archive_before_expiry(self):
+        attributes = closing_attributes(now=1000)
+
+        self.assertEqual(attributes["closed_at"], "1970-01-01T00:16:40+00:00")
+        self.assertGreater(attributes["archive_at"], 1000)
+        self.assertGreater(attributes["expires_at"], attributes["archive_at"])
+
+    def test_archiver_writes_jsonl_then_deletes(self):
+        table = MagicMock()
+        table.name = "TestGithubIncidents"
+        table.scan.side_effect = [
+            {"Items": [{"incident_id": "i1", "archive_at": 5}], "LastEvaluatedKey": {"incident_id": "i1"}},
+            {"Items": [{"incident_id": "i2", "archive_at": 6}, {"incident_id": "i3", "archive_at": 7}]},
+        ]
+        writer = table.batch_writer.return_value.__enter__.return_value
+        aws = MagicMock()
+        aws.table.return_value = table
+
+        with tempfile.TemporaryDirectory() as directory:
+            archived = Archiver(DynamoDBStore(aws), "TestGithubIncidents", LocalArchiveStore(directory), batch_size=2).run_once(now=86400)
+
+            self.assertEqual(archived, 3)
+            self.assertEqual(table.scan.call_args_list[1].kwargs["ExclusiveStartKey"], {"incident_id": "i1"})
+            day_directory = os.path.join(directory, "TestGithubIncidents", "1970", "01", "02")
+            records = []
+            for name in sorted(os.listdir(day_directory)):
+                with gzip.open(os.path.join(day_directory, name), "rt") as archive_file:
+                    records += [json.loads(line) for line in archive_file]
+        self.assertEqual([record["incident_id"] for record in records], ["i1", "i2", "i3"])
+        self.assertEqual(writer.delete_item.call_count, 3)
+
+
+class TestSqliteStore(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "incidents.db")
+        self.store = SqliteStore(self.path)
+        self.addCleanup(self.store.close)
+
+    def test_put_new_is_atomic_across_tables(self):
+        record = EscalationRecord(incident_id="i1", created_at="2024-11-23T12:00:00+00:00")
+        self.store.put_new([("GithubIncidents", Incident(incident_id="i1", status="investigating").to_item()),
+                            ("CyberArkIncidents", record.to_item())])
+        self.store.batch_put("GithubIncidents", [Incident(incident_id="i2", status="investigating").to_item()])
+
+        with self.assertRaises(ConditionFailed):
+            self.store.put_new([("GithubIncidents", Incident(incident_id="i3").to_item()),
+                                ("CyberArkIncidents", EscalationRecord(incident_id="i1").to_item())])
+        self.assertIsNone(self.store.get("GithubIncidents", "i3"), "A failed transaction must not write anything.")
+        self.assertEqual(EscalationRecord.from_item(self.store.get("CyberArkIncidents", "i1")), record)
+
+    def test_conditional_update(self):
+        self.store.batch_put("CyberArkIncidents", [{"incident_id": "i1", "incident_status": "new", "version": 0}])
+        unleased = AttributeMissing("lease_owner") | Equals("lease_owner", "me") | LessThan("lease_expires_at", 100)
+
+        self.store.update("CyberArkIncidents", "i1", {"lease_owner": "other", "lease_expires_at": 200}, condition=unleased)
+        with self.assertRaises(ConditionFailed):
+            self.store.update("CyberArkIncidents", "i1", {"lease_owner": "me"}, condition=unleased)
+        with self.assertRaises(ConditionFailed):
+            self.store.update("CyberArkIncidents", "missing", {"status": "resolved"}, condition=ItemExists())
+
+        self.assertEqual(self.store.get("CyberArkIncidents", "i1")["lease_owner"], "other")
+        self.assertIsNone(self.store.get("CyberArkIncidents", "missing"))
+
+    def test_open_incident_and_archive_queries_use_their_indexes(self):
+        self.store.batch_put("CyberArkIncidents", [
+            {"incident_id": "open", "incident_status": "new"},
+            {"incident_id": "closed", "incident_status": "Resolved", "archive_at": 50},
+        ])
+
+        self.assertEqual([item["incident_id"] for item in self.store.open_incidents("CyberArkIncidents")], ["open"])
+        self.assertEqual([item["incident_id"] for item in self.store.due_for_archive("CyberArkIncidents", 100)], ["closed"])
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(Archiver(self.store, "CyberArkIncidents", LocalArchiveStore(directory)).run_once(now=100), 1)
+        self.assertIsNone(self.store.get("CyberArkIncidents", "closed"))
+        plans = [" ".join(row[-1] for row in self.store._connection.execute(f'EXPLAIN QUERY PLAN {query}'))
+                 for query in ("SELECT item FROM \"CyberArkIncidents\" WHERE incident_status != 'Resolved'",
+                               "SELECT item FROM \"CyberArkIncidents\" WHERE archive_at < 100")]
+        self.assertIn("CyberArkIncidents_open", plans[0])
+        self.assertIn("CyberArkIncidents_archive_at", plans[1])
+
+    def test_writes_are_visible_to_another_process_connection(self):
+        self.store.batch_put("GithubIncidents", [{"incident_id": f"i{index}", "status": "investigating"} for index in range(2000)])
+        other = SqliteStore(self.path)
+        self.addCleanup(other.close)
+
+        self.assertEqual(other.get("GithubIncidents", "i1999")["status"], "investigating")
+        self.assertEqual(self.store._connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+
+def history_incident(number, status="resolved", created_at=None):
+    return {
+        "id": f"h{number}", "name": f"Incident {number}", "status": status, "impact": "minor",
+        "created_at": created_at or f"2023-01-{number % 28 + 1:02d}T12:00:00.000Z", "updated_at": "2023-02-01T00:00:00.000Z",
+        "resolved_at": "2023-02-01T00:00:00.000Z", "incident_updates": [{"id": f"u{number}", "body": "Listed"}],
+        "components": [],
+    }
+
+
+class FakeStatuspage:
+    """
+    Serves pages of incidents.json (page_size per page) and each incident's own JSON.
+    """
+
+    def __init__(self, incidents, page_size=3, failing_pages=()):
+        self.incidents = incidents
+        self.page_size = page_size
+        self.failing_pages = set(failing_pages)
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def get_json(self, url):
+        with self._lock:
+            self.requests.append(url)
+        if "?page=" in url:
+            page = int(url.rsplit("=", 1)[1])
+            if page in self.failing_pages:
+                raise ValueError("invalid JSON")
+            return {"incidents": self.incidents[(page - 1) * self.page_size:page * self.page_size]}
+        incident_id = url.rsplit("/", 1)[1][:-len(".json")]
+        incident = next(incident for incident in self.incidents if incident["id"] == incident_id)
+        return {"incident": {**incident, "incident_updates": [{"id": f"u{incident_id}-2", "body": "Resolved"}],
+                             "components": [{"name": "Actions"}]}}
+
+
+class TestHistoryBackfill(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint_path = os.path.join(directory.name, "backfill.json")
+        self.store = SqliteStore(os.path.join(directory.name, "incidents.db"))
+        self.addCleanup(self.store.close)
+
+    def backfill(self, statuspage, **options):
+        return HistoryBackfill(self.store, "GithubIncidents", "https://status.example.com", workers=4, write_workers=2,
+                               batch_size=2, checkpoint_path=self.checkpoint_path, get_json=statuspage.get_json, **options)
+
+    def test_closed_incidents_are_loaded_with_their_details(self):
+        incidents = [history_incident(number) for number in range(1, 8)]
+        incidents[0]["status"] = "investigating"
+        self.store.batch_put("GithubIncidents", [Incident(incident_id="h2", status="resolved", name="Known").to_item()])
+
+        report = self.backfill(FakeStatuspage(incidents)).run()
+
+        self.assertTrue(report["complete"])
+        self.assertEqual((report["pages"], report["listed"], report["written"]), (3, 7, 5))
+        self.assertEqual((report["skipped_open"], report["skipped_existing"], report["details"]), (1, 1, 5))
+        self.assertIsNone(self.store.get("GithubIncidents", "h1"), "Open incidents are left to the monitor.")
+        self.assertEqual(self.store.get("GithubIncidents", "h2")["name"], "Known", "Stored incidents are not overwritten.")
+        loaded = Incident.from_item(self.store.get("GithubIncidents", "h3"))
+        self.assertEqual((loaded.last_update_id, loaded.affected_components, loaded.github_status), ("uh3-2", ("Actions",), "resolved"))
+        self.assertTrue(loaded.internal_incident_id.startswith("cyberark-"))
+        with open(self.checkpoint_path) as checkpoint_file:
+            self.assertEqual(json.load(checkpoint_file)["next_page"], 4)
+
+    def test_loaded_incidents_are_due_for_archiving_from_their_resolution(self):
+        self.backfill(FakeStatuspage([history_incident(1)])).run()
+        now = time.time()
+
+        item = self.store.get("GithubIncidents", "h1")
+        self.assertEqual(item["archive_at"], closing_attributes(1675209600)["archive_at"])  # resolved 2023-02-01
+        self.assertGreaterEqual(item["expires_at"], int(now + EXPIRE_AFTER_SECONDS) - 5)
+        self.assertEqual([due["incident_id"] for due in self.store.due_for_archive("GithubIncidents", now)], ["h1"])
+
+    def test_monitor_write_after_the_existence_check_is_not_overwritten(self):
+        backfill = self.backfill(FakeStatuspage([]), fetch_details=False)
+        incident = backfill.normalize(history_incident(1))
+        monitor_record = Incident(incident_id="h1", status="investigating", internal_incident_id="cyberark-live").to_item()
+        self.store.batch_put("GithubIncidents", [monitor_record])
+
+        backfill.write_batch([incident, backfill.normalize(history_incident(2))])
+
+        self.assertEqual(self.store.get("GithubIncidents", "h1")["internal_incident_id"], "cyberark-live")
+        self.assertIsNotNone(self.store.get("GithubIncidents", "h2"))
+        self.assertEqual((backfill.counts["written"], backfill.counts["skipped_existing"]), (1, 1))
+
+    def test_resumes_from_the_checkpoint(self):
+        incidents = [history_incident(number) for number in range(1, 10)]
+        report = self.backfill(FakeStatuspage(incidents, failing_pages={2})).run()
+        self.assertFalse(report["complete"])
+        self.assertEqual((report["written"], report["next_page"]), (3, 2))
+
+        statuspage = FakeStatuspage(incidents)
+        report = self.backfill(statuspage).run()
+
+        self.assertTrue(report["complete"])
+        self.assertEqual(report["written"], 6)
+        self.assertNotIn("https://status.example.com/api/v2/incidents.json?page=1", statuspage.requests)
+        self.assertEqual(len([incident for incident in incidents if self.store.get("GithubIncidents", incident["id"])]), 9)
+
+    def test_stops_at_since(self):
+        incidents = [history_incident(number, created_at=f"2023-01-{10 - number:02d}T12:00:00Z") for number in range(1, 10)]
+
+        report = self.backfill(FakeStatuspage(incidents), since="2023-01-05T00:00:00+00:00", fetch_details=False).run()
+
+        self.assertEqual((report["pages"], report["written"], report["details"]), (2, 5, 0))
+        self.assertIsNotNone(self.store.get("GithubIncidents", "h5"))
+        self.assertIsNone(self.store.get("GithubIncidents", "h6"))
+
+
+class TestIncidentIndex(unittest.TestCase):
+
+    def test_unchanged_cycles_keep_the_snapshot(self):
+        index = IncidentIndex()
+        incident = Incident(incident_id="i1", status="investigating", updated_at="t0")
+
+        self.assertTrue(index.apply([IncidentDelta(IncidentDelta.CREATED, incident)], {}))
+        snapshot = index.snapshot
+        self.assertFalse(index.apply([], {}))
+        self.assertIs(index.snapshot, snapshot)
+
+    def test_closed_incidents_expire_after_retention(self):
+        index = IncidentIndex(closed_retention=60)
+        closed = Incident(incident_id="i1", status="resolved", updated_at="t1")
+        index.apply([IncidentDelta(IncidentDelta.RESOLVED, closed, {"status": "resolved"})], {}, now=1000)
+
+        self.assertEqual(query_incidents(index.snapshot, state="closed")["total"], 1)
+        index.apply([], {}, now=1030)
+        self.assertIn("i1", index.snapshot.by_id)
+        index.apply([], {}, now=1061)
+        self.assertNotIn("i1", index.snapshot.by_id)
+
+    def test_rendered_responses_are_cached_per_snapshot(self):
+        index = IncidentIndex()
+        build = MagicMock(return_value={"items": []})
+
+        first = index.render(("incidents",), build)
+        second = index.render(("incidents",), build)
+
+        self.assertIs(first, second)
+        build.assert_called_once()
+        index.apply([IncidentDelta(IncidentDelta.CREATED, Incident(incident_id="i1", updated_at="t0"))], {})
+        self.assertNotEqual(index.render(("incidents",), build).etag, first.etag)
+
+
+class TestEventHub(unittest.TestCase):
+
+    def collect(self, hub, frames, last_event_id=None, publish=()):
+        async def run():
+            stream = hub.subscribe(last_event_id, heartbeat=0.05)
+            received = [await stream.__anext__()]
+            for event_type, data in publish:
+                hub.publish(event_type, data)
+            while len(received) < frames:
+                received.append(await stream.__anext__())
+            await stream.aclose()
+            return b"".join(received).decode("utf-8")
+        return asyncio.run(run())
+
+    def test_live_events_reach_subscribers(self):
+        hub = EventHub()
+        stream = self.collect(hub, 2, publish=[("incident", {"id": "i1"}), ("component", {"name": "API"})])
+
+        self.assertIn(f"id: {hub.last_event_id - 1}\nevent: incident\ndata: {{\"id\":\"i1\"}}", stream)
+        self.assertIn("event: component", stream)
+        self.assertEqual(hub.subscribers, 0)
+
+    def test_resume_replays_buffered_events(self):
+        hub = EventHub(capacity=10)
+        first = hub.publish("incident", {"n": 1})
+        hub.publish("incident", {"n": 2})
+        hub.publish("incident", {"n": 3})
+
+        stream = self.collect(hub, 2, last_event_id=first)
+
+        self.assertNotIn('"n":1', stream)
+        self.assertIn('"n":2', stream)
+        self.assertIn('"n":3', stream)
+
+    def test_resume_point_out_of_buffer_resets(self):
+        hub = EventHub(capacity=2)
+        first = hub.publish("incident", {"n": 1})
+        for number in range(2, 5):
+            hub.publish("incident", {"n": number})
+
+        stream = self.collect(hub, 3, last_event_id=first)
+
+        self.assertIn(f"id: {hub.last_event_id}\nevent: reset", stream)
+        self.assertNotIn('"n":4', stream)
+        self.assertTrue(stream.endswith(": keepalive\n\n"), "the stream continues after the reset")
+
+    def test_mirrored_events_keep_the_pollers_ids(self):
+        poller = EventHub(capacity=10)
+        first = poller.publish("incident", {"n": 1})
+        poller.publish("incident", {"n": 2})
+        workers = [EventHub(), EventHub()]
+        for worker in workers:
+            worker.mirror(poller.recent(10), poller.last_event_id)
+        poller.publish("incident", {"n": 3})
+        workers[1].mirror(poller.recent(10), poller.last_event_id)  # one worker is a poll behind
+
+        stream = self.collect(workers[1], 3, last_event_id=first)  # the id was handed out by the other worker
+
+        self.assertIn(f'id: {first + 1}\nevent: incident\ndata: {{"n":2}}', stream)
+        self.assertIn(f'id: {first + 2}\nevent: incident\ndata: {{"n":3}}', stream)
+        self.assertEqual(workers[0].last_event_id, first + 1)
+
+    def test_mirror_gap_resets_resuming_clients(self):
+        poller = EventHub(capacity=10)
+        first = poller.publish("incident", {"n": 1})
+        worker = EventHub()
+        worker.mirror(poller.recent(10), poller.last_event_id)
+        for number in range(2, 5):
+            poller.publish("incident", {"n": number})
+        worker.mirror(poller.recent(1), poller.last_event_id)  # events 2 and 3 were never seen
+
+        stream = self.collect(worker, 2, last_event_id=first)
+
+        self.assertIn(f"id: {first + 3}\nevent: reset", stream)
+        self.assertNotIn('"n":2', stream)
+
+    def test_subscriber_limit(self):
+        hub = EventHub(max_subscribers=0)
+
+        async def run():
+            await hub.subscribe().__anext__()
+        with self.assertRaises(TooManySubscribers):
+            asyncio.run(run())
+
+    def test_reserved_slots_count_before_the_stream_starts(self):
+        hub = EventHub(max_subscribers=1)
+        subscription = hub.acquire()
+        self.assertIsNone(hub.acquire(), "The slot is taken as soon as it is reserved.")
+
+        stream = hub.subscribe(subscription=subscription)
+        del stream, subscription  # The client left before the response was sent
+        gc.collect()
+        self.assertEqual(hub.subscribers, 0)
+
+        subscription = hub.acquire()
+        subscription.release()
+        subscription.release()
+        self.assertEqual(hub.subscribers, 0, "A slot is released once.")
+
+
+class TestComponentHistory(unittest.TestCase):
+
+    def make_history(self):
+        # One cycle a minute; API goes down at 10m for 20m, and no cycles ran between 59m and 90m
+        history = ComponentHistory(max_gap=120)
+        for minute in list(range(0, 60)) + list(range(90, 120)):
+            api_status = "major_outage" if 10 <= minute < 20 else "partial_outage" if 20 <= minute < 30 else "operational"
+            history.record(minute * 60, {"c1": ("API", api_status, None), "c2": ("Pages", "operational", None)})
+        return history
+
+    def test_uptime_mttr_and_histogram(self):
+        report = self.make_history().report(0, 119 * 60)
+
+        api = report["c1"]
+        self.assertEqual(api["observed_seconds"], 88 * 60, "the gap between cycles is not observed")
+        self.assertEqual(api["seconds_by_status"], {"operational": 68 * 60, "major_outage": 600, "partial_outage": 600})
+        self.assertAlmostEqual(api["uptime"], 68 / 88)
+        self.assertEqual(api["degraded_minutes"], 20)
+        self.assertEqual(api["outages"], 1)
+        self.assertEqual(api["mttr_seconds"], 1200)
+        self.assertEqual(api["outage_duration_histogram"]["15m-1h"], 1)
+        self.assertEqual(report["c2"]["uptime"], 1.0)
+        self.assertIsNone(report["c2"]["mttr_seconds"])
+
+    def test_window_clips_intervals(self):
+        api = self.make_history().report(15 * 60, 25 * 60, component_ids=["API"])["c1"]
+
+        self.assertEqual(api["seconds_by_status"], {"major_outage": 300, "partial_outage": 300})
+        self.assertEqual(api["uptime"], 0.0)
+        self.assertEqual(api["outages"], 0, "the outage recovers after the window")
+
+    def test_save_and_load(self):
+        history = self.make_history()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "history.npz")
+            history.save(path)
+            loaded = ComponentHistory.load(path, max_gap=120)
+        self.assertEqual(loaded.report(0, 119 * 60), history.report(0, 119 * 60))
+        rows = len(loaded)
+        loaded.record(120 * 60, {"c1": ("API", "operational", None)})
+        self.assertEqual(len(loaded), rows, "an unchanged status appends no row after loading")
+
+
+class TestRecordAndReplay(unittest.TestCase):
+
+    def test_unchanged_payloads_are_recorded_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "summary.rec.gz")
+            recorder = SummaryRecorder(path)
+            self.assertTrue(recorder.record(100, b'{"incidents": []}'))
+            self.assertFalse(recorder.record(400, b'{"incidents": []}'))
+            list(recorder.tee([b'{"incidents": ', b'[{"id": "i1"}]}'], 700))
+            recorder.close()
+            with open(path, "ab") as recording:
+                recording.write(b"\x1f\x8b\x08")  # a record cut short by a crash
+
+            records = list(read_recording(path))
+
+        self.assertEqual(records, [(100.0, b'{"incidents": []}'), (700.0, b'{"incidents": [{"id": "i1"}]}')])
+
+    def test_replay_serves_payload_current_at_time(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "summary.rec.gz")
+            recorder = SummaryRecorder(path)
+            recorder.record(100, b"first")
+            recorder.record(700, b"second")
+            recorder.close()
+            source = ReplaySource(path)
+
+        self.assertEqual(source.payload_at(50), b"first")
+        self.assertEqual(source.payload_at(699), b"first")
+        self.assertEqual(source.payload_at(5000, linger=300), b"second", "the last payload is served at least once")
+        self.assertEqual(source.payload_at(900, linger=300), b"second")
+        with self.assertRaises(ReplayFinished):
+            source.payload_at(1001, linger=300)
+
+    def test_scaled_clock(self):
+        clock = ScaledClock(origin=1000, speed=3600, real_origin=time.time())
+        self.assertAlmostEqual(clock.now(), 1000, delta=36)
+        started = time.monotonic()
+        clock.sleep(360)
+        self.assertLess(time.monotonic() - started, 0.5, "an hour of virtual time takes a second")
+        self.assertAlmostEqual(clock.to_real(7200), 2)
+
+
+class TestStateSnapshot(unittest.TestCase):
+
+    def write(self, directory):
+        path = os.path.join(directory, "monitor.snapshot")
+        incidents = [
+            Incident(incident_id=f"i{number}", internal_incident_id=f"cyberark-{number}", created_at="2024-11-23T12:00:00Z",
+                     status="investigating", name="API Outage", updated_at="2024-11-23T12:30:00+00:00",
+                     affected_components=["API"])
+            for number in range(5)
+        ]
+        components = {"c1": ("API", "major_outage", "i1"), "c2": ("Pages", "operational", None)}
+        write_snapshot(path, 1000.0, "ab" * 20, '"etag-1"', incidents, components,
+                       last_event_id=42, events=[(41, "incident", '{"n":1}'), (42, "component", '{"n":2}')])
+        return path, incidents, components
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path, incidents, components = self.write(directory)
+            with StateSnapshot(path) as snapshot:
+                self.assertEqual(snapshot.etag, '"etag-1"')
+                self.assertEqual(snapshot.fingerprint, "ab" * 20)
+                self.assertEqual(sorted(snapshot.incidents(), key=lambda incident: incident.incident_id), incidents)
+                self.assertEqual(snapshot.components(), components)
+                self.assertEqual(snapshot.updated_at("i3"), 1732365000.0)
+                self.assertIsNone(snapshot.updated_at("missing"))
+                self.assertEqual(snapshot.last_event_id, 42)
+                self.assertEqual(snapshot.events(), [(41, "incident", '{"n":1}'), (42, "component", '{"n":2}')])
+            self.assertFalse(os.path.exists(f"{path}.tmp"))
+
+    def test_corrupt_snapshot_is_rejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path, _, _ = self.write(directory)
+            with open(path, "r+b") as snapshot_file:
+                snapshot_file.seek(80)
+                snapshot_file.write(b"\xff")
+            with self.assertRaises(SnapshotError):
+                StateSnapshot(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.breaker = CircuitBreaker("test", failure_rate_threshold=0.5, minimum_calls=4, window_seconds=60,
+                                      open_seconds=30, clock=lambda: self.now)
+
+    def fail(self):
+        with self.assertRaises(ValueError):
+            self.breaker.call(MagicMock(side_effect=ValueError("down")))
+
+    def test_opens_at_failure_rate_and_fails_fast(self):
+        self.breaker.call(lambda: "ok")
+        self.fail()
+        self.breaker.call(lambda: "ok")
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.fail()  # 2 of 4 calls failed
+
+        self.assertEqual(self.breaker.state, OPEN)
+        dependency = MagicMock()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(dependency)
+        dependency.assert_not_called()
+
+    def test_old_failures_leave_the_window(self):
+        for _ in range(3):
+            self.fail()
+        self.now += 61
+        self.fail()
+        self.assertEqual(self.breaker.state, CLOSED, "Only one call is inside the window.")
+
+    def test_half_open_trial_closes_or_reopens(self):
+        for _ in range(4):
+            self.fail()
+        self.now += 30
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.fail()
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.now += 30
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_admits_limited_trials(self):
+        for _ in range(4):
+            self.fail()
+        self.now += 30
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_predicate_excludes_expected_errors(self):
+        for _ in range(4):
+            with self.assertRaises(KeyError):
+                self.breaker.call(MagicMock(side_effect=KeyError("missing")), is_failure=lambda error: not isinstance(error, KeyError))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_boto3_client_calls_go_through_the_breaker(self):
+        import boto3
+        from botocore.stub import Stubber
+        client = boto3.client("dynamodb", region_name="us-west-2", aws_access_key_id="x", aws_secret_access_key="x")
+        instrument_boto3_client(client, self.breaker)
+        key = {"incident_id": {"S": "1"}}
+        with Stubber(client) as stubber:
+            for _ in range(4):
+                stubber.add_client_error("update_item", "ConditionalCheckFailedException", http_status_code=400)
+            for _ in range(4):
+                stubber.add_client_error("update_item", "InternalServerError", http_status_code=500)
+            for _ in range(8):
+                with self.assertRaises(Exception):
+                    client.update_item(TableName="t", Key=key)
+            self.assertEqual(self.breaker.state, OPEN, "Only the server errors count as failures.")
+
+        # Rejected before any request is sent
+        with self.assertRaises(CircuitOpenError):
+            client.update_item(TableName="t", Key=key)
+
+
+def profiled_helper(seconds):
+    time.sleep(seconds)
+
+
+class TestCycleProfiler(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.profiler = CycleProfiler("test", functions=("profiled_helper",), directory=self.directory, sample_interval=0.001)
+
+    def run_cycles(self, count, seconds=0.0):
+        for _ in range(count):
+            with self.profiler.cycle():
+                profiled_helper(seconds)
+                profiled_helper(seconds)
+
+    def test_idle_profiler_records_nothing(self):
+        self.run_cycles(2)
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertEqual(self.profiler.timings()["profiled_helper"]["calls"], 0)
+
+    def test_profiles_the_requested_number_of_cycles(self):
+        self.profiler.start(cycles=2, mode=PSTATS)
+        self.run_cycles(3)
+
+        self.assertEqual(len(self.profiler.files), 2)
+        self.assertTrue(all(path.endswith(".pstats") and os.path.exists(path) for path in self.profiler.files))
+        self.assertEqual(self.profiler.timings()["profiled_helper"]["calls"], 4)
+        self.assertEqual(self.profiler.status()["remaining_cycles"], 0)
+
+    def test_collapsed_stacks(self):
+        self.profiler.start(cycles=1, mode=COLLAPSED)
+        self.run_cycles(1, seconds=0.05)
+
+        with open(self.profiler.files[0]) as collapsed_file:
+            lines = collapsed_file.read().splitlines()
+        self.assertTrue(any("test_common.py:profiled_helper" in line for line in lines))
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        self.assertGreater(self.profiler.timings()["profiled_helper"]["seconds"], 0.02)
+
+    def test_rejects_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            self.profiler.start(mode="flame")
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def test_quantiles_within_relative_accuracy(self):
+        values = [random.lognormvariate(3, 1.5) for _ in range(20000)]
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        values.sort()
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q), exact, delta=exact * 0.011)
+        self.assertEqual(sketch.summary()["count"], 20000)
+
+    def test_memory_is_bounded(self):
+        sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=100)
+        values = sorted(step * 10.0 ** exponent for exponent in range(-3, 7) for step in range(1, 1000))
+        for value in values:
+            sketch.add(value)
+
+        self.assertLessEqual(len(sketch.buckets), 100)
+        exact = values[int(0.99 * (len(values) - 1))]
+        self.assertAlmostEqual(sketch.quantile(0.99), exact, delta=exact * 0.011)
+
+    def test_merge_matches_a_single_sketch(self):
+        whole, first, second = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for value in range(1, 1001):
+            whole.add(value)
+            (first if value % 2 else second).add(value)
+        first.merge(second)
+
+        self.assertEqual(first.summary(), whole.summary())
+
+    def test_empty_and_negative_values(self):
+        sketch = QuantileSketch()
+        self.assertIsNone(sketch.quantile(0.5))
+        sketch.add(-2)  # clock skew between GitHub and us
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def test_seconds_between(self):
+        self.assertEqual(seconds_between("2024-11-23T12:00:00Z", "2024-11-23T12:01:30.500000+00:00"), 90.5)
+        self.assertIsNone(seconds_between("", "2024-11-23T12:00:00Z"))
+        self.assertIsNone(seconds_between(None, "2024-11-23T12:00:00Z"))
+
+    def test_periodic_report_starts_a_new_period(self):
+        with tempfile.TemporaryDirectory() as directory:
+            report_path = os.path.join(directory, "slo.jsonl")
+            tracker = LatencyTracker("test", report_interval=60, report_path=report_path)
+            self.assertIsNone(tracker.maybe_report(1000))
+            tracker.record("github_to_write", 12.0)
+            tracker.record("github_to_write", None)
+
+            self.assertIsNone(tracker.maybe_report(1030))
+            report = tracker.maybe_report(1060)
+            tracker.record("github_to_write", 20.0)
+
+            self.assertEqual(report["intervals"]["github_to_write"]["count"], 1)
+            self.assertEqual((report["start"], report["end"]), (1000, 1060))
+            with open(report_path) as report_file:
+                self.assertEqual(json.loads(report_file.readline()), report)
+            summary = tracker.summary()
+            self.assertEqual(summary["intervals"]["github_to_write"]["count"], 2)
+            self.assertEqual(summary["current_period"]["github_to_write"]["count"], 1)
+
+    def test_replica_sketches_merge_into_fleet_quantiles(self):
+        replicas = [LatencyTracker("test", report_path=None) for _ in range(2)]
+        for value in range(1, 51):
+            replicas[0].record("write_to_slack", value)
+            replicas[1].record("write_to_slack", value + 50)
+
+        merged = merge_sketches([json.loads(json.dumps(replica.sketches())) for replica in replicas])["write_to_slack"]
+
+        self.assertEqual(merged.count, 100)
+        self.assertAlmostEqual(merged.quantile(0.5), 50, delta=1)
+        self.assertAlmostEqual(merged.quantile(0.99), 99, delta=1)
+        self.assertEqual((merged.min, merged.max), (1.0, 100.0))
+
+    def test_latency_is_exported_as_a_histogram(self):
+        before = LATENCY_SECONDS.labels(interval="test_histogram")._sum.get()
+        LatencyTracker("test", report_path=None).record("test_histogram", 42.0)
+        self.assertEqual(LATENCY_SECONDS.labels(interval="test_histogram")._sum.get() - before, 42.0)
+
+
+ROUTING_DOCUMENT = {"policies": [
+    {"name": "actions-critical", "match": {"component": ["Actions", "Packages"], "impact": "critical"},
+     "slack_channel": "ci-incidents",
+     "tiers": [{"name": "ci_on_call", "timeout": 120, "mention": "ci"},
+               {"name": "ci_lead", "timeout": 300, "sns_targets": ["secret:ci_lead_phone", "arn:aws:sns:us-west-2:1:ci"]},
+               {"name": "director"}]},
+    {"name": "actions", "match": {"component": "actions"}, "tiers": [{"name": "ci_on_call"}]},
+    {"name": "major", "match": {"impact": ["major", "critical"], "provider": "github"}, "tiers": [{"name": "on_call"}]},
+]}
+
+
+class TestRouting(unittest.TestCase):
+
+    def setUp(self):
+        self.default = default_policy([{"name": "on_call", "timeout": 600}, {"name": "devops", "timeout": 300}, {"name": "director"}])
+        self.table = RoutingTable.compile(ROUTING_DOCUMENT, self.default)
+
+    def test_first_matching_policy_wins(self):
+        self.assertEqual(self.table.match(["Actions"], "critical", "github").name, "actions-critical")
+        self.assertEqual(self.table.match(["Git Operations", "Packages"], "critical", "github").name, "actions-critical")
+        self.assertEqual(self.table.match(["Actions"], "minor", "github").name, "actions")
+        self.assertEqual(self.table.match(["Pages"], "Major", "github").name, "major")
+        self.assertEqual(self.table.match([], "critical", "github").name, "major")
+        self.assertIs(self.table.match(["Pages"], "minor", "github"), self.default)
+        self.assertIs(self.table.match(["Pages"], "major", "statuspage"), self.default)
+
+    def test_tiers_escalate_on_cumulative_deadlines(self):
+        policy = self.table.policy("actions-critical")
+        self.assertEqual([tier.deadline for tier in policy.tiers], [0, 120, 420])
+        self.assertEqual([tier.escalation_status for tier in policy.tiers], ["Pending", "ci_lead_escalation", "director_escalation"])
+        self.assertEqual([policy.due_tier(elapsed) for elapsed in (60, 121, 420, 421)], [0, 1, 1, 2])
+        self.assertEqual(policy.tier_index("ci_lead_escalation"), 1)
+        self.assertIsNone(policy.tier_index("devops_escalation"))
+        self.assertIs(self.table.policy("default"), self.default)
+
+    def test_invalid_documents_are_rejected(self):
+        for document in (
+            {"policies": [{"name": "p", "tiers": []}]},
+            {"policies": [{"name": "p", "tiers": [{"name": "a"}, {"name": "b"}]}]},  # a needs a timeout
+            {"policies": [{"name": "p", "match": {"region": "eu"}, "tiers": [{"name": "a"}]}]},
+            {"policies": [{"name": "p", "tiers": [{"name": "a"}]}, {"name": "p", "tiers": [{"name": "a"}]}]},
+            {"policies": [{"name": "default", "tiers": [{"name": "a"}]}]},
+        ):
+            with self.assertRaises(PolicyError):
+                RoutingTable.compile(document, self.default)
+
+    def test_secret_references(self):
+        self.assertEqual(resolve_secret("secret:ci_lead_phone", {"ci_lead_phone": "+15550100"}), "+15550100")
+        self.assertIsNone(resolve_secret("secret:missing", {}))
+        self.assertEqual(resolve_secret("+15550199", {}), "+15550199")
+
+    def test_policy_file_is_reloaded_when_it_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "policies.json")
+            with open(path, "w") as policy_file:
+                json.dump(ROUTING_DOCUMENT, policy_file)
+            now = [0.0]
+            policies = RoutingPolicies(path, lambda: self.default, reload_interval=30, clock=lambda: now[0])
+            first = policies.current()
+            self.assertEqual(first.match(["Actions"], "minor", "github").name, "actions")
+
+            with open(path, "w") as policy_file:
+                json.dump({"policies": ROUTING_DOCUMENT["policies"][2:]}, policy_file)
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+            self.assertIs(policies.current(), first, "The file is not checked again before the reload interval.")
+            now[0] = 31.0
+            self.assertIs(policies.current().match(["Actions"], "minor", "github"), self.default)
+
+            with open(path, "w") as policy_file:
+                policy_file.write("{not json")
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 2 * 10 ** 9))
+            now[0] = 62.0
+            with self.assertLogs("common.routing", level="ERROR"):
+                kept = policies.current()
+            self.assertEqual(kept.match(["Pages"], "major", "github").name, "major", "An invalid file keeps the last table.")
+
+    def test_default_policy_follows_its_factory_without_a_file(self):
+        now = [0.0]
+        tiers = [{"name": "on_call", "timeout": 60}]
+        policies = RoutingPolicies(None, lambda: default_policy(tiers), reload_interval=30, clock=lambda: now[0])
+        self.assertEqual(policies.current().default.tiers[0].timeout, 60)
+
+        tiers = [{"name": "on_call", "timeout": 120}]
+        self.assertEqual(policies.current().default.tiers[0].timeout, 60, "Not rebuilt before the reload interval.")
+        now[0] = 31.0
+        self.assertEqual(policies.current().match(["Pages"], "major", "github").tiers[0].timeout, 120)
+
+
+class TestRefreshScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.scheduler = RefreshScheduler(fast_interval=60, slow_interval=900, requests_per_minute=3, clock=lambda: self.now[0])
+
+    def test_unchanged_items_back_off_and_changes_reset_them(self):
+        self.scheduler.sync({"i1": (1, "published")})
+        self.assertEqual(self.scheduler.due(), ["i1"])
+        self.assertEqual(self.scheduler.due(), [], "An item is not taken twice before its refresh is recorded.")
+        intervals = []
+        for _ in range(6):
+            self.scheduler.record("i1", changed=False)
+            intervals.append(self.scheduler.interval("i1"))
+        self.assertEqual(intervals, [120, 240, 480, 900, 900, 900])
+
+        self.scheduler.record("i1", changed=True)
+        self.assertEqual(self.scheduler.interval("i1"), 60)
+
+        self.scheduler.record("i1", changed=False)
+        self.scheduler.sync({"i1": (2, "devops_escalation")})  # escalated: due now, at the fast interval
+        self.assertEqual(self.scheduler.interval("i1"), 60)
+        self.now[0] = 1.0
+        self.assertEqual(self.scheduler.due(), ["i1"])
+
+        self.scheduler.track({"i2": (1, "published")})
+        self.assertEqual(self.scheduler.interval("i1"), 60, "track leaves the other items as they are.")
+        self.scheduler.sync({})
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_budget_goes_to_the_highest_priorities(self):
+        self.scheduler.sync({f"i{number}": (priority, "s") for number, priority in enumerate([0, 2, 1, 1, 3])})
+
+        self.assertEqual(self.scheduler.due(), ["i4", "i1", "i2"])
+        self.now[0] = 30.0
+        for key in ("i4", "i1", "i2"):
+            self.scheduler.record(key, changed=False)
+        self.assertEqual(self.scheduler.due(), [], "The budget is spent for this minute.")
+        self.now[0] = 60.0
+        self.assertEqual(self.scheduler.due(), ["i3", "i0"])
+
+
+def secrets_response(values, errors=()):
+    return {
+        "SecretValues": [{"Name": name, "SecretString": json.dumps({"value": value})} for name, value in values.items()],
+        "Errors": [{"SecretId": name, "ErrorCode": "ResourceNotFoundException", "Message": "not found"} for name in errors],
+    }
+
+
+class TestSecretsProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.now = [0.0]
+        self.provider = SecretsProvider(lambda: self.client, ["slack_token", "phone"], defaults={"nickname": "ops"},
+                                        ttl=3600, refresh_margin=300, clock=lambda: self.now[0])
+
+    def test_load_fetches_every_secret_in_one_call(self):
+        self.client.batch_get_secret_value.return_value = secrets_response({"slack_token": "xoxb-1", "phone": "+15550100"})
+        applied = []
+        self.provider.on_change(applied.append)
+
+        self.provider.load()
+
+        self.client.batch_get_secret_value.assert_called_once_with(SecretIdList=["slack_token", "phone"])
+        self.assertEqual(self.provider.get("slack_token"), "xoxb-1")
+        self.assertEqual(self.provider.get("nickname"), "ops")
+        self.assertEqual(resolve_secret("secret:phone", self.provider), "+15550100")
+        self.assertEqual(applied, [{"slack_token": "xoxb-1", "phone": "+15550100"}])
+        self.assertEqual(self.provider.seconds_to_refresh(), 3300)
+
+    def test_load_fails_on_missing_secrets(self):
+        self.client.batch_get_secret_value.return_value = secrets_response({"slack_token": "xoxb-1"}, errors=["phone"])
+        with self.assertRaises(SecretsError):
+            self.provider.load()
+
+    def test_pages_are_followed(self):
+        first = secrets_response({"slack_token": "xoxb-1"})
+        first["NextToken"] = "page-2"
+        self.client.batch_get_secret_value.side_effect = [first, secrets_response({"phone": "+15550100"})]
+
+        self.provider.load()
+
+        self.assertEqual(self.client.batch_get_secret_value.call_args.kwargs["NextToken"], "page-2")
+        self.assertEqual(self.provider.fetches, 2)
+
+    def test_refresh_swaps_rotated_values_and_keeps_them_on_failure(self):
+        self.client.batch_get_secret_value.return_value = secrets_response({"slack_token": "xoxb-1", "phone": "+15550100"})
+        self.provider.load()
+        applied = []
+        self.provider.on_change(applied.append)
+
+        self.now[0] = 3300
+        self.assertEqual(self.provider.seconds_to_refresh(), 0)
+        self.client.batch_get_secret_value.return_value = secrets_response({"slack_token": "xoxb-2"}, errors=["phone"])
+        with self.assertLogs("common.secrets_provider", level="ERROR"):
+            self.assertEqual(self.provider.refresh(), {"slack_token": "xoxb-2"})
+        self.assertEqual(applied, [{"slack_token": "xoxb-2"}])
+        self.assertEqual(self.provider["phone"], "+15550100", "A secret that failed to fetch keeps its value.")
+
+        self.client.batch_get_secret_value.side_effect = RuntimeError("throttled")
+        with self.assertRaises(RuntimeError):
+            self.provider.refresh()
+        self.now[0] = 3300 + 3601
+        self.assertTrue(self.provider.expired())
+        self.assertEqual(self.provider["slack_token"], "xoxb-2", "Expired values are kept until a refresh succeeds.")
+
+    def test_background_refresh_on_request(self):
+        self.client.batch_get_secret_value.return_value = secrets_response({"slack_token": "xoxb-1", "phone": "+15550100"})
+        self.provider.load()
+        rotated = threading.Event()
+        self.provider.on_change(lambda changed: rotated.set())
+        self.client.batch_get_secret_value.return_value = secrets_response({"slack_token": "xoxb-2", "phone": "+15550100"})
+
+        self.provider.start()
+        self.addCleanup(self.provider.stop)
+        self.now[0] = 31  # Past the retry interval after the load
+        self.assertTrue(self.provider.request_refresh())
+
+        self.assertTrue(rotated.wait(5))
+        self.assertEqual(self.provider["slack_token"], "xoxb-2")
+
+    def test_requested_refreshes_are_rate_limited(self):
+        self.client.batch_get_secret_value.return_value = secrets_response({"slack_token": "xoxb-1", "phone": "+15550100"})
+        self.provider.load()
+
+        self.now[0] = 10
+        self.assertFalse(self.provider.request_refresh(), "Too soon after the last fetch.")
+        self.now[0] = 30
+        self.assertTrue(self.provider.request_refresh())
+
+
+class ListExporter:
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, payload):
+        for resource_spans in payload["resourceSpans"]:
+            for scope_spans in resource_spans["scopeSpans"]:
+                self.spans.extend(scope_spans["spans"])
+
+
+class TestTracing(unittest.TestCase):
+
+    def test_traceparent_round_trip(self):
+        tracer = Tracer("test")
+        with tracer.span("root") as root:
+            self.assertEqual(parse_traceparent(root.traceparent), (root.trace_id, root.span_id))
+        self.assertIsNone(parse_traceparent("00-" + "0" * 32 + "-" + "1" * 16 + "-01"))
+        self.assertIsNone(parse_traceparent("garbage"))
+        self.assertIsNone(parse_traceparent(None))
+
+    def test_spans_continue_a_remote_trace(self):
+        exporter = ListExporter()
+        tracer = Tracer("test", [exporter])
+        with tracer.span("monitor.detect_incident") as detected:
+            traceparent = detected.traceparent
+        with tracer.span("notifier.handle_incident", parent=traceparent) as handled:
+            with tracer.span("slack.chat.postMessage") as posted:
+                pass
+        tracer.flush()
+
+        self.assertEqual({span["traceId"] for span in exporter.spans}, {detected.trace_id})
+        self.assertEqual(handled.parent_id, detected.span_id)
+        self.assertEqual(posted.parent_id, handled.span_id)
+        self.assertEqual([span["name"] for span in exporter.spans], ["monitor.detect_incident", "slack.chat.postMessage", "notifier.handle_incident"])
+
+    def test_errors_mark_the_span(self):
+        exporter = ListExporter()
+        tracer = Tracer("test", [exporter])
+        with self.assertRaises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("boom")
+        tracer.flush()
+        self.assertEqual(exporter.spans[0]["status"], {"code": 2, "message": "boom"})
+
+    def test_file_exporter_writes_otlp_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+            tracer = Tracer("monitor", [FileSpanExporter(path)])
+            with tracer.span("a", attributes={"incident.id": "i1", "attempt": 2}):
+                pass
+            tracer.flush()
+            with open(path) as trace_file:
+                payload = json.loads(trace_file.readline())
+        resource = payload["resourceSpans"][0]
+        self.assertEqual(resource["resource"]["attributes"][0], {"key": "service.name", "value": {"stringValue": "monitor"}})
+        span = resource["scopeSpans"][0]["spans"][0]
+        self.assertIn({"key": "attempt", "value": {"intValue": "2"}}, span["attributes"])
+
+    def test_boto3_calls_inside_a_span_are_traced(self):
+        import boto3
+        from botocore.awsrequest import AWSResponse
+        exporter = ListExporter()
+        tracer = Tracer("test", [exporter])
+        client = boto3.client("sns", region_name="us-west-2", aws_access_key_id="x", aws_secret_access_key="x")
+        trace_boto3_client(client, tracer)
+        body = b"<PublishResponse><PublishResult><MessageId>m1</MessageId></PublishResult></PublishResponse>"
+        # Answer at the HTTP layer, so the whole call pipeline (and its events) runs
+        client.meta.events.register("before-send.sns", lambda **kwargs: AWSResponse(
+            kwargs["request"].url, 200, {}, MagicMock(stream=MagicMock(return_value=iter([body])))))
+
+        client.publish(PhoneNumber="+15550000000", Message="untraced")
+        with tracer.span("notifier.page") as page:
+            client.publish(PhoneNumber="+15550000000", Message="page")
+        tracer.flush()
+
+        calls = [span for span in exporter.spans if span["name"] == "sns.Publish"]
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0]["parentSpanId"], page.span_id)
+        self.assertIn({"key": "http.status_code", "value": {"intValue": "200"}}, calls[0]["attributes"])
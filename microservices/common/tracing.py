@@ -0,0 +1,286 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Spans are appended to TRACE_PATH as OTLP/JSON lines and/or posted to an OTLP/HTTP collector
+TRACE_PATH = os.getenv("TRACE_PATH")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+EXPORT_INTERVAL = float(os.getenv("TRACE_EXPORT_INTERVAL", 5))
+MAX_QUEUE_SIZE = 10000
+MAX_BATCH_SIZE = 512
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def parse_traceparent(traceparent):
+    """
+    Parse a W3C traceparent header value ("00-<trace id>-<parent span id>-<flags>").
+
+    Returns:
+        tuple: (trace_id, span_id) as hex strings, or None if the value is missing or malformed.
+    """
+    try:
+        version, trace_id, span_id, _ = traceparent.split("-")
+        int(trace_id, 16), int(span_id, 16)
+    except (AttributeError, ValueError):
+        return None
+    if version != "00" or len(trace_id) != 32 or len(span_id) != 16 or not int(trace_id, 16) or not int(span_id, 16):
+        return None
+    return trace_id, span_id
+
+
+class Span:
+    """
+    One timed operation of a trace, with OpenTelemetry semantics (ids, parent, kind, attributes, status).
+    """
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status", "message")
+
+    def __init__(self, name, trace_id=None, parent_id="", kind=INTERNAL, start_ns=None, attributes=None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status = 0
+        self.message = ""
+
+    @property
+    def traceparent(self):
+        """
+        W3C traceparent value that makes this span the parent of spans in another process.
+        """
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, error):
+        self.status = STATUS_ERROR
+        self.message = str(error)
+        self.attributes["exception.type"] = type(error).__name__
+
+    def to_otlp(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status, "message": self.message} if self.status else {},
+        }
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class FileSpanExporter:
+    """
+    Appends each batch of spans to a file as one OTLP/JSON ExportTraceServiceRequest per line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, payload):
+        with open(self.path, "a") as trace_file:
+            trace_file.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """
+    Posts each batch of spans to an OTLP/HTTP collector (JSON encoding), e.g. http://otel-collector:4318.
+    """
+
+    def __init__(self, endpoint, timeout=5):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, payload):
+        response = requests.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class Tracer:
+    """
+    Creates spans and exports the finished ones in the background, in batches.
+
+    Without exporters spans are still created (so trace context can be propagated) but dropped
+    when they end. A full export queue drops spans rather than blocking the service.
+
+    Args:
+        service_name (str): service.name resource attribute of the exported spans.
+        exporters (list): Objects with export(payload), called with OTLP/JSON requests.
+    """
+
+    def __init__(self, service_name, exporters=()):
+        self.service_name = service_name
+        self.exporters = list(exporters)
+        self._pending = []
+        self._pending_changed = threading.Condition()
+        self._export_lock = threading.Lock()  # One batch is exported at a time, in order
+        self._worker = None
+
+    @contextmanager
+    def span(self, name, parent=None, kind=INTERNAL, attributes=None, start_ns=None):
+        """
+        Run the block in a new span, child of parent or else of the current span.
+
+        Args:
+            parent (Span | str, optional): Parent span, or a W3C traceparent from another process.
+            start_ns (int, optional): Start time (epoch nanoseconds), for spans covering work that began earlier.
+        """
+        span = self.start_span(name, parent, kind, attributes, start_ns)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as error:
+            span.record_error(error)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def start_span(self, name, parent=None, kind=INTERNAL, attributes=None, start_ns=None):
+        """
+        Start a span without making it current; it must be finished with end_span().
+        """
+        if parent is None:
+            parent = _current_span.get()
+        if isinstance(parent, Span):
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = parse_traceparent(parent) or (None, "")
+        return Span(name, trace_id, parent_id, kind, start_ns, attributes)
+
+    def end_span(self, span, end_ns=None):
+        span.end_ns = end_ns or time.time_ns()
+        if not self.exporters:
+            return
+        with self._pending_changed:
+            if len(self._pending) >= MAX_QUEUE_SIZE:
+                logger.warning(f"Trace export queue is full; dropping span {span.name}.")
+                return
+            self._pending.append(span)
+            if len(self._pending) >= MAX_BATCH_SIZE:
+                self._pending_changed.notify()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._export_loop, name="trace-exporter", daemon=True)
+                self._worker.start()
+
+    def _export_loop(self):
+        while True:
+            with self._pending_changed:
+                self._pending_changed.wait(EXPORT_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        """
+        Export every finished span now (also used at shutdown and by tests).
+        """
+        with self._export_lock:
+            while True:
+                with self._pending_changed:
+                    batch, self._pending = self._pending[:MAX_BATCH_SIZE], self._pending[MAX_BATCH_SIZE:]
+                if not batch:
+                    return
+                self._export(batch)
+
+    def _export(self, spans):
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "github-status-monitor"}, "spans": [span.to_otlp() for span in spans]}],
+        }]}
+        for exporter in self.exporters:
+            try:
+                exporter.export(payload)
+            except Exception as export_error:
+                logger.warning(f"Failed to export {len(spans)} span(s) with {type(exporter).__name__}: {export_error}")
+
+
+def current_span():
+    return _current_span.get()
+
+
+def tracer_from_env(service_name):
+    """
+    Build the tracer configured by TRACE_PATH and OTEL_EXPORTER_OTLP_ENDPOINT.
+    """
+    exporters = []
+    if TRACE_PATH:
+        exporters.append(FileSpanExporter(TRACE_PATH))
+    if OTLP_ENDPOINT:
+        exporters.append(OtlpHttpSpanExporter(OTLP_ENDPOINT))
+    tracer = Tracer(os.getenv("OTEL_SERVICE_NAME", service_name), exporters)
+    if exporters:
+        atexit.register(tracer.flush)
+    return tracer
+
+
+def trace_boto3_client(client, tracer):
+    """
+    Record a client span for every call a boto3 client makes inside a traced block.
+
+    Calls made while no span is current are not traced.
+    """
+    service = client.meta.service_model.service_id.hyphenize()
+
+    def before_call(model=None, context=None, **kwargs):
+        if _current_span.get() is None or context is None:
+            return
+        context["trace_span"] = tracer.start_span(f"{service}.{model.name}", kind=CLIENT, attributes={
+            "rpc.system": "aws-api", "rpc.service": service, "rpc.method": model.name,
+        })
+
+    def after_call(http_response=None, context=None, **kwargs):
+        span = (context or {}).pop("trace_span", None)
+        if span is None:
+            return
+        status_code = getattr(http_response, "status_code", None)
+        if status_code is not None:
+            span.set_attribute("http.status_code", status_code)
+            if status_code >= 400:
+                span.status = STATUS_ERROR
+        tracer.end_span(span)
+
+    def after_call_error(exception=None, context=None, **kwargs):
+        span = (context or {}).pop("trace_span", None)
+        if span is None:
+            return
+        span.record_error(exception)
+        tracer.end_span(span)
+
+    client.meta.events.register_first(f"before-call.{service}", before_call)
+    client.meta.events.register(f"after-call.{service}", after_call)
+    client.meta.events.register(f"after-call-error.{service}", after_call_error)
+    return client
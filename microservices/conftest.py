@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The services import the shared package as top-level "common" (it is copied next to app.py in
+# the Docker images), so put microservices/ on the path when tests load them as microservices.<service>.app
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -1,17 +1,38 @@
 import os
+import json
+import hashlib
 import threading
 import time
-import boto3
-import json
 import requests
 import uuid
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 
+from prometheus_client import start_http_server
+
+from common.aws_clients import AwsClients, StartupTimer
+from common.storage import ConditionFailed, ItemExists, storage_from_env
+from common.incident_model import Incident, EscalationRecord
+from common.summary_stream import iter_summary_items, iter_summary_dict
+from common.delta import DeltaEngine, IncidentDelta, TRACKED_FIELDS
+from common.lifecycle import ARCHIVE_INTERVAL, CLOSED_GITHUB_STATUSES, Archiver, archive_store_from_env, closing_attributes
+from common.incident_index import IncidentIndex, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, query_incidents, query_components
+from common.event_hub import EventHub, delta_events
+from common.component_history import ComponentHistory, HISTORY_PATH, HISTORY_SAVE_INTERVAL
+from common.clock import clock_from_env
+from common.replay import RECORD_PATH, REPLAY_PATH, ReplayFinished, ReplaySource, SummaryRecorder
+from common.state_snapshot import SnapshotError, StateSnapshot, write_snapshot
+from common.circuit_breaker import CircuitBreaker, CircuitOpenError, is_http_failure
+from common.profiling import MODES, PSTATS, CycleProfiler, install_signal_handler
+from common.tracing import CLIENT, tracer_from_env
+from common.latency import GITHUB_TO_SIGHTING, GITHUB_TO_WRITE, SIGHTING_TO_WRITE, LatencyTracker, seconds_between
+
 # Configuration Constants
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", 300))  # Default to 300 seconds
 MAX_RETRIES = 3  # Maximum retries for failed API calls
@@ -21,21 +42,77 @@ TEST_FLOW = os.getenv("TEST_FLOW", "false").lower() == "true"  # Enable test flo
 GITHUB_TABLE_NAME = os.getenv("GITHUB_TABLE_NAME", "TestGithubIncidents" if TEST_FLOW else "GithubIncidents")
 CYBERARK_TABLE_NAME = os.getenv("CYBERARK_TABLE_NAME", "TestCyberArkIncidents" if TEST_FLOW else "CyberArkIncidents")
 
-# DynamoDB Setup
-dynamodb = boto3.resource("dynamodb", region_name="us-west-2")
-github_table = dynamodb.Table(GITHUB_TABLE_NAME)
-cyberark_table = dynamodb.Table(CYBERARK_TABLE_NAME)
+# Circuit breakers: once a dependency keeps failing, calls to it fail immediately instead of waiting for timeouts
+METRICS_PORT = int(os.getenv("METRICS_PORT", 8000))  # Prometheus metrics, including circuit breaker states
+github_breaker = CircuitBreaker("github")
+dynamodb_breaker = CircuitBreaker("dynamodb")
+
+# Tracing: each new incident starts a trace (TRACE_PATH / OTEL_EXPORTER_OTLP_ENDPOINT) that the notifier continues
+tracer = tracer_from_env("monitor")
+
+# AWS Setup (clients are created on first use)
+aws = AwsClients(region_name="us-west-2", breakers={"dynamodb": dynamodb_breaker}, tracer=tracer)
+# Incident tables: DynamoDB, or an embedded SQLite database (STORAGE_BACKEND=sqlite, SQLITE_PATH)
+storage = storage_from_env(aws)
 
 # GitHub Status API URL
 SUMMARY_URL = "https://www.githubstatus.com/api/v2/summary.json"
+SUMMARY_CHUNK_SIZE = 16 * 1024  # Bytes read at a time when streaming the summary
+GZIP_MIN_SIZE = 1024  # Smaller query responses are sent uncompressed
+
+# Record/replay: RECORD_PATH saves every fetched summary; REPLAY_PATH serves summaries from a recording
+# instead of SUMMARY_URL, on a virtual clock starting at the recording (sped up by CLOCK_SPEED)
+# Production launch mode: with API_WORKERS > 0 the main process runs the poller (the only writer) and the API is
+# served by that many uvicorn worker processes (MONITOR_ROLE=api), which follow the poller's state snapshot
+API_WORKERS = int(os.getenv("API_WORKERS", 0))
+MONITOR_ROLE = os.getenv("MONITOR_ROLE", "all")
+SNAPSHOT_POLL_INTERVAL = float(os.getenv("SNAPSHOT_POLL_INTERVAL", 1))
+SHARED_SNAPSHOT_PATH = "/dev/shm/github-monitor-state.bin"
+SNAPSHOT_EVENTS = 1000  # Latest /events events saved with the snapshot, which the workers republish with the same ids
+
+replay_source = ReplaySource(REPLAY_PATH) if REPLAY_PATH else None
+recorder = SummaryRecorder(RECORD_PATH) if RECORD_PATH and MONITOR_ROLE != "api" else None
+clock = clock_from_env(default_origin=replay_source.start if replay_source else None)
+
+# The monitor's working state is saved here after every changed summary and loaded at startup. Unset by default;
+# with API workers it is how they get the state, so it defaults to shared memory, which a new pod starts without.
+# Either way a restart without a snapshot resumes from the open incidents in storage (seed_from_storage)
+STATE_SNAPSHOT_PATH = os.getenv("STATE_SNAPSHOT_PATH") or (SHARED_SNAPSHOT_PATH if API_WORKERS else None)
+
+
+class SummaryState:
+    """
+    ETag and fingerprint (sha1 of the body) of the last fully processed summary.
+    """
+
+    def __init__(self):
+        self.etag = ""
+        self.fingerprint = ""
+        self.saved = ("", "")  # (fingerprint, etag) of the last written snapshot
+        self.fetched_ns = (0, 0)  # When the current cycle's summary fetch started and finished reading (epoch ns)
+        self.sighted_at = None  # ISO time (on the monitor's clock) the current cycle's summary was read
+
+
+summary_state = SummaryState()
 
 # Logging Configuration
 logging.basicConfig(level=logging.INFO,
                     format="%(asctime)s - %(levelname)s - %(name)s - %(filename)s:%(lineno)d - %(message)s")
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Start an API worker's snapshot follower once uvicorn serves the app. Not at import: uvicorn's worker
+    processes also import this module as __mp_main__, which would start a second, unused follower.
+    """
+    if MONITOR_ROLE == "api":
+        threading.Thread(target=snapshot_follower.run, name="snapshot-follower", daemon=True).start()
+    yield
+
+
 # FastAPI Application Setup
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 class HealthResponse(BaseModel):
@@ -55,13 +132,15 @@ def readiness():
     """
     Readiness probe to check if the application is ready to serve traffic.
     """
+    if MONITOR_ROLE == "api":
+        # API workers only serve the poller's state
+        if snapshot_follower.loaded_at is None:
+            raise HTTPException(status_code=503, detail="No state snapshot from the poller yet")
+        return HealthResponse(status="ready")
     try:
-        # Check DynamoDB table existence
-        tables = dynamodb.meta.client.list_tables()
-        if GITHUB_TABLE_NAME not in tables.get("TableNames", []):
-            raise HTTPException(status_code=503, detail=f"DynamoDB table '{GITHUB_TABLE_NAME}' not found")
-        if CYBERARK_TABLE_NAME not in tables.get("TableNames", []):
-            raise HTTPException(status_code=503, detail=f"DynamoDB table '{CYBERARK_TABLE_NAME}' not found")
+        # Check table existence
+        for table_name in storage.missing_tables((GITHUB_TABLE_NAME, CYBERARK_TABLE_NAME)):
+            raise HTTPException(status_code=503, detail=f"Table '{table_name}' not found")
 
         # Check GitHub Status API accessibility
         try:
@@ -77,16 +156,199 @@ def readiness():
         raise HTTPException(status_code=503, detail=f"Unexpected error: {str(e)}")
 
 
-def fetch_github_summary():
+# Incidents and components as last seen by the monitor loop, served by the query endpoints
+incident_index = IncidentIndex()
+# Incident and component changes pushed to /events subscribers
+event_hub = EventHub()
+# Component statuses of every cycle, for uptime reports (loaded from COMPONENT_HISTORY_PATH at startup)
+component_history = ComponentHistory(max_gap=2 * CHECK_INTERVAL)
+
+
+def indexed_response(request, key, build):
+    """
+    Serve a response rendered from the in-memory incident index.
+
+    Answers 304 when the client's If-None-Match matches the current ETag and
+    gzip-encodes larger bodies for clients that accept it.
+    """
+    rendered = incident_index.render(key, build)
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    headers = {"ETag": rendered.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if rendered.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    body = rendered.body
+    if len(body) >= GZIP_MIN_SIZE and "gzip" in request.headers.get("accept-encoding", ""):
+        body = rendered.gzipped()
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get('/incidents')
+def list_incidents(request: Request, status: Optional[str] = None, impact: Optional[str] = None,
+                   state: str = Query("all", pattern="^(open|closed|all)$"),
+                   limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), offset: int = Query(0, ge=0)):
+    """
+    List known incidents, most recently updated first.
+
+    Filters take comma-separated values, e.g. /incidents?state=open&impact=major,critical.
+    """
+    key = ("incidents", status, impact, state, limit, offset)
+    return indexed_response(request, key, lambda snapshot: query_incidents(snapshot, status, impact, state, limit, offset))
+
+
+@app.get('/incidents/{incident_id}')
+def get_incident(request: Request, incident_id: str):
+    """
+    Return a single incident (open, or closed within the index retention).
+    """
+    return indexed_response(request, ("incident", incident_id), lambda snapshot: snapshot.by_id.get(incident_id))
+
+
+@app.get('/components')
+def list_components(request: Request, status: Optional[str] = None):
+    """
+    List GitHub components and their current status.
+    """
+    return indexed_response(request, ("components", status), lambda snapshot: query_components(snapshot, status))
+
+
+@app.post('/admin/profile')
+def start_profiling(cycles: int = Query(1, ge=1, le=100), mode: str = Query(PSTATS, pattern=f"^({'|'.join(MODES)})$")):
+    """
+    Profile the next monitoring cycles; profiles are written to PROFILE_DIR.
+    """
+    if MONITOR_ROLE == "api":
+        raise HTTPException(status_code=409, detail="The poller runs in the main process; send it SIGUSR1 to profile it")
+    profiler.start(cycles, mode)
+    return profiler.status()
+
+
+@app.get('/admin/profile')
+def profiling_status():
+    """
+    Pending profiled cycles, written profiles and cumulative time in the tracked functions.
+    """
+    if MONITOR_ROLE == "api":
+        raise HTTPException(status_code=409, detail="The poller runs in the main process; its profiles are in PROFILE_DIR")
+    return profiler.status()
+
+
+@app.get('/slo/latency')
+def latency_report():
+    """
+    Detection latency quantiles (p50/p95/p99, seconds) since start and for the current report period.
+    """
+    if MONITOR_ROLE == "api":
+        raise HTTPException(status_code=409, detail="Latency is measured by the poller; see its incident_latency_seconds metrics")
+    return latency.summary()
+
+
+@app.get('/slo/latency/sketch')
+def latency_sketches():
+    """
+    Detection latency sketches since start, serialized so several monitors' can be merged (common.latency.merge_sketches).
+    """
+    if MONITOR_ROLE == "api":
+        raise HTTPException(status_code=409, detail="Latency is measured by the poller; see its incident_latency_seconds metrics")
+    return latency.sketches()
+
+
+def parse_time(value, default):
+    """
+    Parse an epoch-seconds or ISO 8601 query parameter.
+    """
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid time: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+@app.get('/components/uptime')
+def component_uptime(start: Optional[str] = None, end: Optional[str] = None, component: Optional[str] = None):
+    """
+    Uptime, time per status, MTTR and outage duration histogram per component over a window.
+
+    start and end are epoch seconds or ISO 8601 times (default: the last 30 days);
+    component is a comma-separated list of component ids or names.
+    """
+    window_end = parse_time(end, clock.now())
+    window_start = parse_time(start, window_end - 30 * 24 * 3600)
+    if window_start >= window_end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+    wanted = [part.strip() for part in component.split(",")] if component else None
+    return {
+        "start": datetime.fromtimestamp(window_start, timezone.utc).isoformat(),
+        "end": datetime.fromtimestamp(window_end, timezone.utc).isoformat(),
+        "components": component_history.report(window_start, window_end, wanted),
+    }
+
+
+@app.get('/events')
+def stream_events(request: Request, last_event_id: Optional[str] = None):
+    """
+    Server-Sent Events stream of incident ("incident") and component ("component") changes.
+
+    Reconnecting clients resume after their Last-Event-ID header (or ?last_event_id=) while the
+    events are still buffered; otherwise they get a "reset" event and should reload from /incidents.
+    """
+    subscription = event_hub.acquire()
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many event subscribers", headers={"Retry-After": "30"})
+    resume_after = event_hub.parse_event_id(request.headers.get("last-event-id") or last_event_id)
+    return StreamingResponse(
+        event_hub.subscribe(resume_after, subscription=subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def fetch_github_summary(stream=False, if_none_match=None):
     """
     Fetch the GitHub Status API summary data.
+
+    Args:
+        stream (bool): If True, return a generator of (section, element) pairs parsed incrementally
+            from the response body instead of the fully decoded document. Once the generator is
+            exhausted, summary_state holds the summary's ETag and fingerprint.
+        if_none_match (str, optional): ETag of the last processed summary; None is returned
+            if the summary has not changed since (HTTP 304).
+
+    Raises:
+        RuntimeError: If the summary could not be fetched or decoded.
+        ReplayFinished: When replaying, once the clock is past the end of the recording.
     """
+    if replay_source is not None:
+        payload = replay_source.payload_at(clock.now(), linger=CHECK_INTERVAL)
+        if stream:
+            summary_state.fingerprint = hashlib.sha1(payload).hexdigest()
+            return iter_summary_items([payload])
+        return json.loads(payload)
     try:
         session = requests.Session()
         session.headers.update({"Accept": "application/json"})
-        response = session.get(SUMMARY_URL, timeout=10, verify=True)
-        response.raise_for_status()
+        if if_none_match:
+            session.headers.update({"If-None-Match": if_none_match})
+        response = github_breaker.call(_get_summary, session, stream, is_failure=is_http_failure)
+        if response.status_code == 304:
+            response.close()
+            return None
+        if stream:
+            return _stream_summary_items(response)
+        if recorder is not None:
+            recorder.record(clock.now(), response.content)
         return response.json()
+    except CircuitOpenError as open_error:
+        raise RuntimeError(f"GitHub API request skipped: {open_error}")
     except requests.exceptions.RequestException as request_error:
         raise RuntimeError(f"GitHub API request failed: {request_error}")
     except ValueError:
@@ -95,9 +357,43 @@ def fetch_github_summary():
         raise RuntimeError(f"Unexpected error during GitHub API fetch: {general_error}")
 
 
+def _get_summary(session, stream):
+    response = session.get(SUMMARY_URL, timeout=10, verify=True, stream=stream)
+    response.raise_for_status()
+    return response
+
+
+def _stream_summary_items(response):
+    """
+    Yield the components and incidents of a streamed summary response, one element at a time.
+    """
+    fingerprint = hashlib.sha1()
+
+    def fingerprinted(chunks):
+        for chunk in chunks:
+            fingerprint.update(chunk)
+            yield chunk
+
+    chunks = fingerprinted(response.iter_content(chunk_size=SUMMARY_CHUNK_SIZE))
+    if recorder is not None:
+        chunks = recorder.tee(chunks, clock.now())
+    try:
+        yield from iter_summary_items(chunks)
+        # Only a fully read summary may be skipped next time
+        summary_state.etag = response.headers.get("ETag", "")
+        summary_state.fingerprint = fingerprint.hexdigest()
+    except requests.exceptions.RequestException as request_error:
+        github_breaker.record_failure()
+        raise RuntimeError(f"GitHub API request failed: {request_error}")
+    except ValueError:
+        raise RuntimeError("Invalid JSON received from GitHub API")
+    finally:
+        response.close()
+
+
 def get_record_by_id(incident_id, table_name):
     """
-    Retrieve a record from the GitHub DynamoDB table by incident_id.
+    Retrieve a record from the GitHub table by incident_id.
 
     Args:
         incident_id (str): The ID of the incident to retrieve.
@@ -108,13 +404,11 @@ def get_record_by_id(incident_id, table_name):
     if table_name not in ["TestCyberArkIncidents", "TestGithubIncidents", "CyberArkIncidents", "GithubIncidents"]:
         raise Exception(f"Invalid table name: {table_name}")
 
-    table = github_table
-
     try:
-        response = table.get_item(Key={"incident_id": incident_id})
-        if "Item" in response:
-            logger.info(f"Record found: {response['Item']}")
-            return response["Item"]
+        item = storage.get(GITHUB_TABLE_NAME, incident_id)
+        if item is not None:
+            logger.info(f"Record found: {item}")
+            return item
         else:
             logger.warning(f"No record found for incident_id: {incident_id}")
             return None
@@ -126,98 +420,412 @@ def get_record_by_id(incident_id, table_name):
 def process_github_summary(data):
     """
     Parse the GitHub summary data and identify incidents and faulty components.
+
+    Args:
+        data (dict | iterable): The decoded summary, or the (section, element) pairs yielded by
+            fetch_github_summary(stream=True).
+
+    Returns:
+        list[Incident]: One record per GitHub incident and per faulty component without an incident.
     """
-    incidents = []
+    return read_github_summary(data)[0]
+
+
+def read_github_summary(data):
+    """
+    Parse the GitHub summary data into incidents and the status of every component.
+
+    Args:
+        data (dict | iterable): Same as process_github_summary.
+
+    Returns:
+        tuple[list[Incident], dict, bool]: The incidents, component_id -> (name, status, group_id),
+            and whether the whole summary could be parsed.
+    """
+    github_incidents = []
+    component_incidents = []
+    affected_by_group = {}
+    components = {}
+    complete = False
     try:
-        if not isinstance(data.get("incidents", []), list) or not isinstance(data.get("components", []), list):
-            raise ValueError("Unexpected structure in GitHub API response")
-
-        # Process GitHub Incidents
-        for incident in data["incidents"]:
-            affected_components = [
-                component["name"]
-                for component in data["components"]
-                if component.get("group_id") == incident["id"] and component["status"] != "operational"
-            ]
-
-            incidents.append({
-                "incident_id": incident["id"],
-                "internal_incident_id": f"cyberark-{uuid.uuid4()}",
-                "created_at": incident["created_at"],
-                "impact": incident["impact"],
-                "status": incident["status"],
-                "name": incident["name"],
-                "updated_at": incident["updated_at"],
-                "resolved_at": incident.get("resolved_at", ""),
-                "affected_components": affected_components,
-                "last_update_id": incident.get("last_update_id", ""),
-                "github_status": incident["status"]
-            })
-
-        # Process Faulty Components without Incidents
-        for component in data["components"]:
-            if component["status"] != "operational" and not component.get("group_id"):
-                internal_id = f"cyberark-{uuid.uuid4()}"
-                incidents.append({
-                    "incident_id": internal_id,
-                    "internal_incident_id": internal_id,
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "impact": "unknown",
-                    "status": component.get("status", "unknown"),
-                    "name": component.get("name", "unknown_component"),
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                    "resolved_at": "",
-                    "last_update_id": 0,
-                    "affected_components": [component.get("name", "unknown_component")],
-                    "github_status": component.get("status", "unknown")
-                })
+        if isinstance(data, dict):
+            if not isinstance(data.get("incidents", []), list) or not isinstance(data.get("components", []), list):
+                raise ValueError("Unexpected structure in GitHub API response")
+            data = iter_summary_dict(data)
+
+        for section, item in data:
+            if section == "incidents":
+                # Process GitHub Incidents
+                github_incidents.append(Incident.from_statuspage(item))
+                continue
+
+            component_id = item.get("id") or item.get("name", "unknown_component")
+            components[component_id] = (item.get("name", "unknown_component"), item["status"], item.get("group_id"))
+            if item["status"] != "operational":
+                if item.get("group_id"):
+                    # Index non-operational components by the incident (group) they belong to
+                    affected_by_group.setdefault(item["group_id"], []).append(item["name"])
+                else:
+                    # Process Faulty Components without Incidents
+                    internal_id = f"cyberark-{uuid.uuid4()}"
+                    now_time = clock.utcnow().isoformat()
+                    component_name = item.get("name", "unknown_component")
+                    component_incidents.append(Incident(
+                        incident_id=internal_id,
+                        internal_incident_id=internal_id,
+                        created_at=now_time,
+                        status=item.get("status", "unknown"),
+                        name=component_name,
+                        updated_at=now_time,
+                        affected_components=(component_name,),
+                        component_id=component_id,
+                    ))
+        complete = True
+    except RuntimeError:
+        # The summary stream itself failed; let the monitor loop count it as an API failure
+        raise
     except Exception as e:
         logger.error(e)
-    return incidents
+
+    # Components and incidents may arrive in either order, so attach components once both are read
+    for incident in github_incidents:
+        incident.affected_components = tuple(affected_by_group.get(incident.incident_id, ()))
+    return github_incidents + component_incidents, components, complete
 
 
 def log_to_tables(incidents):
     """
-    Log incidents and related escalation data into DynamoDB tables.
+    Log incidents and related escalation data into the incident tables.
+
+    Both records are written in one transaction, each conditioned on the incident not existing yet,
+    so several monitor replicas can log the same incident without duplicating or resetting it.
+
+    Args:
+        incidents (list[Incident | dict]): Incidents to record; dicts are converted to Incident.
+
+    Returns:
+        list[Incident]: The incidents that were new and have been written.
     """
+    logged = []
     for incident in incidents:
-        existing_record = get_record_by_id(incident['incident_id'], GITHUB_TABLE_NAME)
+        incident = Incident.coerce(incident)
+        # The incident's trace starts when GitHub reported it; the escalation record carries it to the notifier
+        with tracer.span("monitor.detect_incident", start_ns=_epoch_ns(incident.created_at), attributes={
+            "incident.id": incident.incident_id, "incident.impact": incident.impact, "github.created_at": incident.created_at,
+        }) as span:
+            fetch_started_ns, fetch_ended_ns = summary_state.fetched_ns
+            if fetch_started_ns:
+                fetch_span = tracer.start_span("github.fetch_summary", parent=span, kind=CLIENT, start_ns=fetch_started_ns,
+                                               attributes={"http.method": "GET", "http.url": SUMMARY_URL})
+                tracer.end_span(fetch_span, end_ns=fetch_ended_ns)
+            try:
+                now_time = clock.utcnow().isoformat()
+                storage.put_new([
+                    # Log incident in GitHub table
+                    (GITHUB_TABLE_NAME, incident.to_item()),
+                    # Log corresponding escalation record in CyberArk table
+                    (CYBERARK_TABLE_NAME, EscalationRecord.new(incident, now_time, trace_parent=span.traceparent).to_item()),
+                ])
+                logged.append(incident)
+                record_detection_latency(incident, clock.utcnow().isoformat())
+            except ConditionFailed:
+                span.set_attribute("incident.already_known", True)
+                logger.debug(f"Incident '{incident['incident_id']}' is already known.")
+            except Exception as log_error:
+                span.record_error(log_error)
+                logger.error(f"Failed to log incident '{incident['incident_id']}': {log_error}")
+    return logged
+
+
+def record_detection_latency(incident, written_at):
+    """
+    Record how long a GitHub incident took to be seen by the monitor and written to its tables.
+
+    Faulty components without a GitHub incident and monitoring failures are skipped: their created_at
+    is the sighting itself.
+    """
+    sighted_at = summary_state.sighted_at
+    if incident.component_id or incident.impact == "monitoring_failure" or not sighted_at:
+        return
+    latency.record(GITHUB_TO_SIGHTING, seconds_between(incident.created_at, sighted_at))
+    latency.record(SIGHTING_TO_WRITE, seconds_between(sighted_at, written_at))
+    latency.record(GITHUB_TO_WRITE, seconds_between(incident.created_at, written_at))
+
+
+def _epoch_ns(timestamp):
+    try:
+        return int(datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp() * 1e9)
+    except (AttributeError, ValueError):
+        return None
+
+
+def update_incident_attributes(incident_id, changes):
+    """
+    Write only the given attributes of an existing incident in the GitHub table.
+
+    Args:
+        incident_id (str): The incident to update.
+        changes (dict): Attribute names mapped to their new values.
+
+    Returns:
+        bool: True if the incident exists and was updated.
+    """
+    encoded = {name: Incident.encode_field(name, value) for name, value in changes.items()}
+    try:
+        storage.update(GITHUB_TABLE_NAME, incident_id, encoded, condition=ItemExists())
+        return True
+    except ConditionFailed:
+        logger.warning(f"Cannot update incident '{incident_id}': it is not in the GitHub table.")
+    except Exception as update_error:
+        logger.error(f"Failed to update incident '{incident_id}': {update_error}")
+    return False
+
+
+def apply_deltas(deltas):
+    """
+    Persist the deltas of one monitoring cycle.
+
+    New incidents are logged to both tables; for every other delta only the changed attributes are written.
+    A "new" incident that is already stored (e.g. right after a restart) gets its tracked attributes refreshed.
+    """
+    created = [delta.incident for delta in deltas if delta.kind == IncidentDelta.CREATED]
+    if created:
+        logged_ids = {incident.incident_id for incident in log_to_tables(created)}
+        for incident in created:
+            if incident.incident_id not in logged_ids:
+                update_incident_attributes(incident.incident_id, {field: getattr(incident, field) for field in TRACKED_FIELDS})
+
+    for delta in deltas:
+        if delta.kind != IncidentDelta.CREATED and delta.changes:
+            logger.info(f"Incident '{delta.incident_id}' {delta.kind}: {sorted(delta.changes)}")
+            changes = delta.changes
+            if delta.kind in (IncidentDelta.RESOLVED, IncidentDelta.DISAPPEARED):
+                # Closed on GitHub's side: schedule archiving and expiry of the record
+                changes = {**changes, **closing_attributes(clock.now())}
+            update_incident_attributes(delta.incident_id, changes)
+
+
+def archive_closed_incidents(now=None):
+    """
+    Archive closed records of both tables whose retention in the hot tables has passed.
+
+    Does nothing unless an archive store is configured (ARCHIVE_BUCKET or ARCHIVE_DIR).
+
+    Returns:
+        int: Number of records archived.
+    """
+    store = archive_store_from_env(aws)
+    if store is None:
+        return 0
+    archived = 0
+    for table_name in (GITHUB_TABLE_NAME, CYBERARK_TABLE_NAME):
         try:
-            if not existing_record:
-                # Log incident in GitHub table
-                github_table.put_item(Item={
-                    "incident_id": incident["incident_id"],
-                    "internal_incident_id": incident["internal_incident_id"],
-                    "created_at": incident["created_at"],
-                    "impact": incident["impact"],
-                    "status": incident["status"],
-                    "name": incident["name"],
-                    "updated_at": incident["updated_at"],
-                    "resolved_at": incident.get("resolved_at", ""),
-                    "last_update_id": incident.get("last_update_id", ""),
-                    "affected_components": json.dumps(incident["affected_components"]),
-                    "github_status": incident["status"]
-                })
-                now_time = datetime.now(timezone.utc).isoformat()
-                # Log corresponding escalation record in CyberArk table
-                cyberark_table.put_item(Item={
-                    "incident_id": incident["incident_id"],
-                    "internal_incident_id": incident["internal_incident_id"],
-                    "escalation_status": "Pending",
-                    "incident_status": "new",
-                    "last_escalation_update_time": now_time,
-                    "last_incident_update_time": now_time,
-                    "escalation_details": "Initial escalation record created.",
-                    "created_at": now_time,
-                    "acknowledgment_time": "",
-                    "slack_message_thread_ts": None
-                })
-
-        except Exception as log_error:
-            logger.error(f"Failed to log incident '{incident['incident_id']}': {log_error}")
+            archived += Archiver(storage, table_name, store).run_once(now)
+        except Exception as archive_error:
+            logger.error(f"Failed to archive closed incidents from {table_name}: {archive_error}")
+    return archived
+
+
+def save_state_snapshot():
+    """
+    Write the monitor's working state to STATE_SNAPSHOT_PATH if it changed since the last snapshot.
+    """
+    state = (summary_state.fingerprint, summary_state.etag)
+    if not STATE_SNAPSHOT_PATH or state == summary_state.saved:
+        return
+    try:
+        write_snapshot(STATE_SNAPSHOT_PATH, clock.now(), summary_state.fingerprint, summary_state.etag,
+                       delta_engine.incidents.values(), delta_engine.components,
+                       event_hub.last_event_id, event_hub.recent(SNAPSHOT_EVENTS))
+        summary_state.saved = state
+    except Exception as snapshot_error:
+        logger.error(f"Failed to write state snapshot: {snapshot_error}")
+
+
+def restore_state_snapshot(path):
+    """
+    Load a state snapshot, if STATE_SNAPSHOT_PATH has one: known incidents (with their ids), component statuses
+    and the last ETag.
+
+    The snapshot only exists across restarts when the path is on a persistent volume; otherwise (no path, or
+    the API workers' tmpfs one after a pod restart) the monitor falls back to seed_from_storage. With a snapshot
+    the first summary is also a conditional request, and its component statuses are exact.
+
+    Returns:
+        int: Number of incidents restored (0 if there is no usable snapshot).
+    """
+    if not os.path.exists(path):
+        logger.info(f"No state snapshot at {path}; starting cold.")
+        return 0
+    try:
+        with StateSnapshot(path) as snapshot:
+            incidents = snapshot.incidents()
+            components = snapshot.components()
+            etag, fingerprint, saved_at = snapshot.etag, snapshot.fingerprint, snapshot.saved_at
+    except SnapshotError as snapshot_error:
+        logger.warning(f"Ignoring state snapshot: {snapshot_error}")
+        return 0
+    delta_engine.incidents = {incident.incident_id: incident for incident in incidents}
+    delta_engine.components = components
+    summary_state.etag, summary_state.fingerprint = etag, fingerprint
+    summary_state.saved = (fingerprint, etag)
+    incident_index.apply([IncidentDelta(IncidentDelta.CREATED, incident) for incident in incidents], components, now=clock.now())
+    logger.info(f"Restored {len(incidents)} incident(s) and {len(components)} component(s) from the snapshot of {saved_at:.0f}.")
+    return len(incidents)
+
+
+def seed_from_storage():
+    """
+    Resume from the open incidents in storage, when there is no usable state snapshot.
+
+    Without it a cold start would treat every ongoing outage as new: a faulty component would get a second
+    cyberark-* record (posted and escalated again), and its first record would never be closed. The GitHub
+    table has no incident_status, so the open incidents are those with an open escalation record whose
+    GitHub record is not closed. Component outages are matched again by component_id on the next summary.
+
+    Returns:
+        int: Number of incidents seeded.
+    """
+    incidents = []
+    for record in storage.open_incidents(CYBERARK_TABLE_NAME):
+        item = storage.get(GITHUB_TABLE_NAME, record["incident_id"])
+        if item is None or item.get("archive_at") or str(item.get("github_status", "")).lower() in CLOSED_GITHUB_STATUSES:
+            continue
+        incidents.append(Incident.from_item(item))
+    delta_engine.incidents = {incident.incident_id: incident for incident in incidents}
+    # The component statuses of the outages, so the next summary reports their transitions against them
+    delta_engine.components = {
+        incident.component_id: (incident.name, incident.github_status, None) for incident in incidents if incident.component_id
+    }
+    incident_index.apply([IncidentDelta(IncidentDelta.CREATED, incident) for incident in incidents], delta_engine.components,
+                        now=clock.now())
+    logger.info(f"Seeded {len(incidents)} open incident(s) from storage.")
+    return len(incidents)
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class SnapshotFollower:
+    """
+    Keeps an API worker's index, event stream and component history in step with the poller.
+
+    The poller rewrites the state snapshot (atomically) after every changed summary; the follower
+    diffs each new snapshot against the previous one to update the worker's index, and republishes the
+    poller's latest events (saved with the snapshot) under the poller's ids, so /events ids mean the
+    same on every worker. The component history is reloaded whenever the poller saves it to
+    COMPONENT_HISTORY_PATH.
+    """
+
+    def __init__(self, path, history_path=None):
+        self.path = path
+        self.history_path = history_path
+        self.engine = DeltaEngine()
+        self.loaded_at = None  # saved_at of the snapshot being served
+        self._signature = None
+        self._history_signature = None
+
+    def poll(self):
+        """
+        Apply the snapshot and reload the component history if they changed since the last call.
+
+        Returns:
+            bool: True if a new snapshot was applied.
+        """
+        self._reload_history()
+        signature = _file_signature(self.path)
+        if signature is None or signature == self._signature:
+            return False
+        try:
+            with StateSnapshot(self.path) as snapshot:
+                incidents = snapshot.incidents()
+                components = snapshot.components()
+                events, last_event_id = snapshot.events(), snapshot.last_event_id
+                saved_at = snapshot.saved_at
+        except SnapshotError as snapshot_error:
+            logger.warning(f"Cannot read the poller's state snapshot: {snapshot_error}")
+            return False
+        self._signature = signature
+        deltas = self.engine.diff(incidents, components, now_time=datetime.fromtimestamp(saved_at, timezone.utc).isoformat())
+        incident_index.apply(deltas, self.engine.components, now=clock.now())
+        event_hub.mirror(events, last_event_id)
+        self.loaded_at = saved_at
+        return True
+
+    def _reload_history(self):
+        global component_history
+        if not self.history_path:
+            return
+        signature = _file_signature(self.history_path)
+        if signature is None or signature == self._history_signature:
+            return
+        try:
+            component_history = ComponentHistory.load(self.history_path, max_gap=2 * CHECK_INTERVAL)
+            self._history_signature = signature
+        except Exception as history_error:
+            logger.warning(f"Cannot reload the component history: {history_error}")
+
+    def run(self):
+        while not shutdown_event.is_set():
+            try:
+                self.poll()
+            except Exception as follow_error:
+                logger.error(f"Failed to follow the state snapshot: {follow_error}")
+            shutdown_event.wait(SNAPSHOT_POLL_INTERVAL)
 
 
 shutdown_event = threading.Event()
+delta_engine = DeltaEngine()
+# Detection latency per incident (the notifier records the rest of the path to a page)
+latency = LatencyTracker("monitor")
+# On-demand profiling of monitoring cycles (POST /admin/profile or SIGUSR1)
+profiler = CycleProfiler("monitor", functions=(
+    "fetch_github_summary", "read_github_summary", "process_github_summary", "log_to_tables", "apply_deltas",
+))
+snapshot_follower = SnapshotFollower(STATE_SNAPSHOT_PATH, HISTORY_PATH)
+
+
+def run_monitor_cycle():
+    """
+    Fetch the summary, diff it against the previous one, and persist and publish the changes.
+    """
+    logger.debug("Fetching GitHub summary.")
+    summary_state.fetched_ns = (0, 0)
+    summary_state.sighted_at = None
+    fetch_started_ns = time.time_ns()
+    summary_data = fetch_github_summary(stream=True, if_none_match=summary_state.etag or None)
+    now = clock.now()
+    if summary_data is None:
+        # Unchanged since the last processed summary
+        component_history.record(now, delta_engine.components)
+        logger.info("GitHub summary not modified.")
+        return
+
+    incidents, components, complete = read_github_summary(summary_data)
+    summary_state.fetched_ns = (fetch_started_ns, time.time_ns())
+    summary_state.sighted_at = clock.utcnow().isoformat()
+    deltas = delta_engine.diff(incidents, components, partial=not complete, now_time=clock.utcnow().isoformat())
+    logger.debug(f"Incident deltas: {deltas}")
+    incident_index.apply(deltas, delta_engine.components, now=now)
+    if complete:
+        # A partially read summary leaves a gap in the history rather than wrong statuses
+        component_history.record(now, components)
+    for event_type, event_data in delta_events(deltas, delta_engine.component_transitions):
+        event_hub.publish(event_type, event_data)
+
+    if deltas:
+        apply_deltas(deltas)
+        logger.info(f"Applied {len(deltas)} incident change(s) to the incident tables.")
+    elif incidents:
+        logger.info(f"No changes to {len(incidents)} open incident(s).")
+    else:
+        logger.info("No issues detected. All systems operational.")
+    save_state_snapshot()
 
 
 def monitor_github_service(max_cycles=None, override_wait_time=False):
@@ -227,61 +835,91 @@ def monitor_github_service(max_cycles=None, override_wait_time=False):
     """
     consecutive_failures = 0
     cycles = 0
+    next_archive_time = clock.now() + ARCHIVE_INTERVAL
+    next_history_save_time = clock.now() + HISTORY_SAVE_INTERVAL
 
     while not shutdown_event.is_set():
         try:
-            logger.debug("Fetching GitHub summary.")
-            summary_data = fetch_github_summary()
-            logger.debug(f"Summary fetched: {summary_data}")
-
-            incidents = process_github_summary(summary_data)
-            logger.debug(f"Incidents processed: {incidents}")
-
-            if incidents:
-                log_to_tables(incidents)
-                logger.info(f"Logged {len(incidents)} incident(s) to DynamoDB.")
-            else:
-                logger.info("No issues detected. All systems operational.")
-
+            with profiler.cycle():
+                run_monitor_cycle()
             consecutive_failures = 0
+        except ReplayFinished as replay_end:
+            logger.info(f"{replay_end}; stopping the monitor loop.")
+            break
         except RuntimeError as api_error:
             consecutive_failures += 1
             logger.warning(f"API call failed ({consecutive_failures}/{MAX_RETRIES}): {api_error}")
 
             if consecutive_failures >= MAX_RETRIES:
                 internal_id = f"monitoring_failure-{uuid.uuid4()}"
-                log_to_tables([{
-                    "incident_id": internal_id,
-                    "internal_incident_id": None,
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "impact": "monitoring_failure",
-                    "status": "Monitoring Failure",
-                    "name": "Monitoring system unable to fetch GitHub status",
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                    "affected_components": [],
-                    "last_update_id": "",
-                    "github_status": "Monitoring Failure"
-                }])
+                now_time = clock.utcnow().isoformat()
+                log_to_tables([Incident(
+                    incident_id=internal_id,
+                    internal_incident_id=None,
+                    created_at=now_time,
+                    impact="monitoring_failure",
+                    status="Monitoring Failure",
+                    name="Monitoring system unable to fetch GitHub status",
+                    updated_at=now_time,
+                )])
                 logger.error(f"Monitoring failure logged with incident ID: {internal_id}")
                 consecutive_failures = 0
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
 
+        if HISTORY_PATH and clock.now() >= next_history_save_time:
+            try:
+                component_history.save(HISTORY_PATH)
+            except Exception as save_error:
+                logger.error(f"Failed to save component history: {save_error}")
+            next_history_save_time = clock.now() + HISTORY_SAVE_INTERVAL
+
+        latency.maybe_report(clock.now())
+
+        if clock.now() >= next_archive_time:
+            archive_closed_incidents(clock.now())
+            next_archive_time = clock.now() + ARCHIVE_INTERVAL
+
         if max_cycles:
             cycles += 1
             if cycles >= max_cycles:
                 break
 
         if override_wait_time is False:
-            time.sleep(CHECK_INTERVAL)
+            clock.wait(shutdown_event, CHECK_INTERVAL)
 
 
 if __name__ == '__main__':
     logger.info(f"Starting monitor service with TEST_FLOW={TEST_FLOW}, CHECK_INTERVAL={CHECK_INTERVAL} seconds.")
 
+    startup = StartupTimer()
+    with startup.phase("warm_clients"):
+        storage.warm((GITHUB_TABLE_NAME, CYBERARK_TABLE_NAME))
+    if HISTORY_PATH:
+        with startup.phase("load_component_history"):
+            component_history = ComponentHistory.load(HISTORY_PATH, max_gap=2 * CHECK_INTERVAL)
+    restored = False
+    if STATE_SNAPSHOT_PATH:
+        with startup.phase("restore_state_snapshot"):
+            restored = restore_state_snapshot(STATE_SNAPSHOT_PATH)
+    if not restored:
+        with startup.phase("seed_from_storage"):
+            seed_from_storage()
+    startup.report("monitor")
+    start_http_server(METRICS_PORT)
+    install_signal_handler(profiler)
+
     # Start the monitor service in a separate thread
     monitor_thread = threading.Thread(target=monitor_github_service)
     monitor_thread.start()
 
-    # Run the FastAPI server
-    uvicorn.run("app:app", host="0.0.0.0", port=5000, reload=True, log_level="error")
+    if API_WORKERS > 0:
+        # This process stays the only poller; the API workers import this module and follow its snapshots
+        logger.info(f"Serving the API from {API_WORKERS} worker processes sharing {STATE_SNAPSHOT_PATH}.")
+        os.environ["MONITOR_ROLE"] = "api"
+        uvicorn.run("app:app", app_dir=os.path.dirname(os.path.abspath(__file__)), host="0.0.0.0", port=5000,
+                    workers=API_WORKERS, log_level="error")
+        shutdown_event.set()
+    else:
+        # Run the FastAPI server in this process, so the query endpoints see the monitor loop's index
+        uvicorn.run(app, host="0.0.0.0", port=5000, log_level="error")
@@ -3,37 +3,71 @@ import logging
 import unittest
 from unittest.mock import patch, MagicMock
 import os
-import boto3
 import requests
+import sqlite3
 import uuid
+import threading
+import time
+import tempfile
 from botocore.exceptions import ClientError
 from microservices.monitor.app import fetch_github_summary, process_github_summary, log_to_tables, monitor_github_service
+from microservices.monitor.app import apply_deltas
+from microservices.monitor import app as monitor
+from fastapi.testclient import TestClient
+from common.incident_index import IncidentIndex
+from common.clock import ScaledClock
+from common.replay import ReplaySource, SummaryRecorder
+from common.delta import DeltaEngine, IncidentDelta
+from common.incident_model import Incident
+from common.latency import QuantileSketch
+from common.storage import DynamoDBStore, SqliteStore
+from common.tracing import Tracer
 
 
 def generate_uuid():
     return str(uuid.uuid4())
 
 
+def use_sqlite_store(test_case):
+    """
+    Point the monitor at the test tables of a fresh SQLite store for the duration of a test.
+    """
+    directory = tempfile.TemporaryDirectory()
+    test_case.addCleanup(directory.cleanup)
+    store = SqliteStore(os.path.join(directory.name, "incidents.db"))
+    test_case.addCleanup(store.close)
+    patcher = patch.multiple(monitor, storage=store, GITHUB_TABLE_NAME="TestGithubIncidents",
+                             CYBERARK_TABLE_NAME="TestCyberArkIncidents")
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
+    return store
+
+
+def use_dynamodb_store(test_case):
+    """
+    Point the monitor at the DynamoDB store over mocked AWS clients, returned for inspecting the calls.
+    """
+    mock_aws = MagicMock()
+    patcher = patch.object(monitor, "storage", DynamoDBStore(mock_aws))
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
+    return mock_aws
+
+
 class TestSpecialScenarios(unittest.TestCase):
 
     def setUp(self):
-        os.environ["TEST_FLOW"] = "true"  # Enable test flow for using test DynamoDB tables
-        self.dynamodb = boto3.resource("dynamodb", region_name="us-west-2")
+        os.environ["TEST_FLOW"] = "true"  # Enable test flow for using test tables
+        self.storage = use_sqlite_store(self)
         self.github_table_name = "TestGithubIncidents"
         self.cyberark_table_name = "TestCyberArkIncidents"
 
         # Ensure the tables exist
-        self.github_table = self.dynamodb.Table(self.github_table_name)
-        self.cyberark_table = self.dynamodb.Table(self.cyberark_table_name)
         self.assert_table_exists(self.github_table_name)
         self.assert_table_exists(self.cyberark_table_name)
 
     def assert_table_exists(self, table_name):
-        try:
-            table = self.dynamodb.Table(table_name)
-            table.load()  # Load metadata to check existence
-        except Exception as e:
-            self.fail(f"DynamoDB table '{table_name}' does not exist or cannot be loaded: {e}")
+        self.assertEqual(self.storage.missing_tables([table_name]), [], f"Table '{table_name}' does not exist.")
 
 
     @patch("microservices.monitor.app.requests.Session.get")
@@ -134,9 +168,8 @@ class TestSpecialScenarios(unittest.TestCase):
 
         # Fetch the logged incident from the GitHub table
         created_incident = incidents[0]
-        github_response = self.github_table.get_item(Key={"incident_id": created_incident["incident_id"]})
-        self.assertIn("Item", github_response, "Incident was not logged in the GitHub table.")
-        github_item = github_response["Item"]
+        github_item = self.storage.get(self.github_table_name, created_incident["incident_id"])
+        self.assertIsNotNone(github_item, "Incident was not logged in the GitHub table.")
 
         # Validate the logged GitHub data
         self.assertEqual(github_item["incident_id"], created_incident["incident_id"], "Logged GitHub incident ID mismatch.")
@@ -147,9 +180,8 @@ class TestSpecialScenarios(unittest.TestCase):
         self.assertIn("API Requests", json.loads(github_item["affected_components"]), "Logged GitHub affected components mismatch.")
 
         # Fetch the logged escalation from the CyberArk table
-        cyberark_response = self.cyberark_table.get_item(Key={"incident_id": created_incident["incident_id"]})
-        self.assertIn("Item", cyberark_response, "Incident was not logged in the CyberArk escalation table.")
-        cyberark_item = cyberark_response["Item"]
+        cyberark_item = self.storage.get(self.cyberark_table_name, created_incident["incident_id"])
+        self.assertIsNotNone(cyberark_item, "Incident was not logged in the CyberArk escalation table.")
 
         # Validate the logged CyberArk escalation data
         self.assertEqual(cyberark_item["incident_id"], created_incident["incident_id"], "Logged CyberArk incident ID mismatch.")
@@ -282,22 +314,15 @@ class TestMonitorService(unittest.TestCase):
 
     def setUp(self):
         os.environ["TEST_FLOW"] = "true"
-        self.dynamodb = boto3.resource("dynamodb", region_name="us-west-2")
+        self.storage = use_sqlite_store(self)
         self.github_table_name = "TestGithubIncidents"
         self.cyberark_table_name = "TestCyberArkIncidents"
         self.assert_table_exists(self.github_table_name)
         self.assert_table_exists(self.cyberark_table_name)
 
     def assert_table_exists(self, table_name):
-        """Verify that a DynamoDB table exists."""
-        try:
-            table = self.dynamodb.Table(table_name)
-            table.load()
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "ResourceNotFoundException":
-                self.fail(f"DynamoDB table '{table_name}' does not exist.")
-            else:
-                raise
+        """Verify that a table exists."""
+        self.assertEqual(self.storage.missing_tables([table_name]), [], f"Table '{table_name}' does not exist.")
 
     @patch("microservices.monitor.app.requests.Session.get")
     def test_fetch_github_summary_timeout(self, mock_get):
@@ -341,7 +366,7 @@ class TestMonitorService(unittest.TestCase):
         self.assertEqual(result[0]["name"], "API Issue", "Incident name mismatch.")
 
     def test_log_to_tables_uuid(self):
-        """Test logging incidents to DynamoDB with UUIDs."""
+        """Test logging incidents to the incident tables with UUIDs."""
         incident_id = generate_uuid()
         mock_incidents = [
             {
@@ -358,10 +383,9 @@ class TestMonitorService(unittest.TestCase):
         ]
         log_to_tables(mock_incidents)
 
-        github_table = self.dynamodb.Table(self.github_table_name)
-        response = github_table.get_item(Key={"incident_id": incident_id})
-        logging.debug(f"DynamoDB response: {response}")
-        self.assertEqual(response["Item"]["status"], "investigating", "Incident status mismatch.")
+        item = self.storage.get(self.github_table_name, incident_id)
+        logging.debug(f"Stored item: {item}")
+        self.assertEqual(item["status"], "investigating", "Incident status mismatch.")
 
     @patch("microservices.monitor.app.fetch_github_summary")
     @patch("microservices.monitor.app.log_to_tables")
@@ -378,19 +402,413 @@ class TestMonitorService(unittest.TestCase):
         self.assertEqual(mock_fetch.call_count, 2, "fetch_github_summary was not called twice.")
         self.assertEqual(mock_log.call_count, 1, "log_to_tables was not called once.")
 
-    @patch("boto3.resource")
-    def test_log_to_tables_write_failure(self, mock_boto3_resource):
-        mock_table = MagicMock()
-        mock_table.put_item.side_effect = ClientError(
-            {"Error": {"Code": "ProvisionedThroughputExceededException"}}, "PutItem"
+    def test_log_to_tables_write_failure(self):
+        with patch.object(self.storage, "put_new", side_effect=sqlite3.OperationalError("database is locked")), \
+                self.assertLogs(level="ERROR") as log:
+            log_to_tables([{"incident_id": generate_uuid(), "status": "investigating"}])
+            self.assertIn("Failed to log incident", log.output[0])
+
+
+class TestConditionalWrites(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_aws = use_dynamodb_store(self)
+
+    def make_incident(self):
+        return {
+            "incident_id": generate_uuid(),
+            "internal_incident_id": f"cyberark-{uuid.uuid4()}",
+            "created_at": "2024-11-23T12:00:00Z",
+            "impact": "high",
+            "status": "investigating",
+            "name": "Conditional Write Test",
+            "updated_at": "2024-11-23T12:30:00Z",
+            "affected_components": ["API"],
+        }
+
+    def test_new_incident_written_in_one_conditional_transaction(self):
+        mock_aws = self.mock_aws
+        client = mock_aws.dynamodb.return_value.meta.client
+        incident = self.make_incident()
+
+        logged = log_to_tables([incident])
+
+        self.assertEqual(len(logged), 1)
+        client.get_item.assert_not_called()
+        transact_items = client.transact_write_items.call_args.kwargs["TransactItems"]
+        self.assertEqual(len(transact_items), 2)
+        for transact_item in transact_items:
+            self.assertEqual(transact_item["Put"]["ConditionExpression"], "attribute_not_exists(incident_id)")
+            self.assertEqual(transact_item["Put"]["Item"]["incident_id"], {"S": incident["incident_id"]})
+        self.assertEqual(transact_items[1]["Put"]["Item"]["escalation_status"], {"S": "Pending"})
+
+    def test_escalation_record_carries_the_detection_trace(self):
+        mock_aws = self.mock_aws
+        client = mock_aws.dynamodb.return_value.meta.client
+        tracer = Tracer("monitor")
+        with patch.object(monitor, "tracer", tracer), patch.object(tracer, "end_span", wraps=tracer.end_span) as end_span:
+            log_to_tables([self.make_incident()])
+
+        detected = end_span.call_args_list[-1].args[0]
+        self.assertEqual(detected.name, "monitor.detect_incident")
+        self.assertEqual(detected.start_ns, 1732363200 * 10 ** 9, "The trace starts when GitHub created the incident.")
+        escalation_item = client.transact_write_items.call_args.kwargs["TransactItems"][1]["Put"]["Item"]
+        self.assertEqual(escalation_item["trace_parent"], {"S": detected.traceparent})
+
+    def test_conditional_check_failure_is_already_known(self):
+        mock_aws = self.mock_aws
+        client = mock_aws.dynamodb.return_value.meta.client
+        client.transact_write_items.side_effect = ClientError(
+            {"Error": {"Code": "TransactionCanceledException"},
+             "CancellationReasons": [{"Code": "ConditionalCheckFailed"}, {"Code": "ConditionalCheckFailed"}]},
+            "TransactWriteItems"
+        )
+
+        with patch("microservices.monitor.app.logger.error") as mock_error:
+            logged = log_to_tables([self.make_incident()])
+        mock_error.assert_not_called()
+        self.assertEqual(logged, [])
+
+    def test_other_transaction_failures_are_logged(self):
+        mock_aws = self.mock_aws
+        client = mock_aws.dynamodb.return_value.meta.client
+        client.transact_write_items.side_effect = ClientError(
+            {"Error": {"Code": "TransactionCanceledException"},
+             "CancellationReasons": [{"Code": "None"}, {"Code": "ProvisionedThroughputExceeded"}]},
+            "TransactWriteItems"
         )
-        mock_boto3_resource.return_value.Table.return_value = mock_table
 
         with self.assertLogs(level="ERROR") as log:
-            log_to_tables([{"incident_id": generate_uuid(), "status": "investigating"}])
+            log_to_tables([self.make_incident()])
             self.assertIn("Failed to log incident", log.output[0])
 
 
+class TestGithubCircuitBreaker(unittest.TestCase):
+
+    @patch("microservices.monitor.app.requests.Session")
+    def test_fetch_fails_fast_while_github_is_down(self, mock_session):
+        mock_session.return_value.get.side_effect = requests.exceptions.ReadTimeout("timed out")
+        breaker = monitor.CircuitBreaker("github-test", minimum_calls=2, open_seconds=60)
+
+        with patch.object(monitor, "github_breaker", breaker):
+            for _ in range(3):
+                with self.assertRaises(RuntimeError):
+                    fetch_github_summary()
+
+        self.assertEqual(mock_session.return_value.get.call_count, 2, "The third fetch should not reach GitHub.")
+
+
+class TestDeltaWrites(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_aws = use_dynamodb_store(self)
+
+    def test_update_writes_only_changed_attributes(self):
+        mock_aws = self.mock_aws
+        incident = Incident(incident_id="i1", status="monitoring", affected_components=["API", "Pages"])
+        delta = IncidentDelta(IncidentDelta.UPDATED, incident, {"status": "monitoring", "affected_components": ("API", "Pages")})
+
+        apply_deltas([delta])
+
+        kwargs = mock_aws.table.return_value.update_item.call_args.kwargs
+        self.assertEqual(kwargs["ExpressionAttributeNames"], {"#a0": "status", "#a1": "affected_components"})
+        self.assertEqual(kwargs["ExpressionAttributeValues"], {":v0": "monitoring", ":v1": json.dumps(["API", "Pages"])})
+        self.assertEqual(kwargs["ConditionExpression"], "attribute_exists(incident_id)")
+        mock_aws.dynamodb.return_value.meta.client.transact_write_items.assert_not_called()
+
+    @patch("microservices.monitor.app.update_incident_attributes")
+    @patch("microservices.monitor.app.log_to_tables")
+    def test_created_incident_already_stored_is_refreshed(self, mock_log, mock_update):
+        incident = Incident(incident_id="i1", status="investigating")
+        mock_log.return_value = []
+
+        apply_deltas([IncidentDelta(IncidentDelta.CREATED, incident)])
+
+        mock_log.assert_called_once_with([incident])
+        self.assertEqual(mock_update.call_args.args[0], "i1")
+        self.assertEqual(mock_update.call_args.args[1]["status"], "investigating")
+
+
+class TestQueryApi(unittest.TestCase):
+
+    def setUp(self):
+        self.index = IncidentIndex()
+        index_patch = patch("microservices.monitor.app.incident_index", self.index)
+        index_patch.start()
+        self.addCleanup(index_patch.stop)
+        incidents = [
+            Incident(incident_id=f"i{number}", internal_incident_id=f"cyberark-{number}", created_at="t0",
+                     impact="major" if number % 2 else "minor", status="investigating", name=f"Outage {number}",
+                     updated_at=f"2024-11-23T12:{number:02d}:00Z", last_update_body="x" * 100)
+            for number in range(30)
+        ]
+        self.index.apply([IncidentDelta(IncidentDelta.CREATED, incident) for incident in incidents],
+                         {"c1": ("API Requests", "major_outage", None), "c2": ("Pages", "operational", None)})
+        self.client = TestClient(monitor.app)
+
+    def test_pagination_and_filters(self):
+        response = self.client.get("/incidents", params={"impact": "major", "limit": 10})
+        page = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(page["total"], 15)
+        self.assertEqual(page["next_offset"], 10)
+        self.assertEqual(page["items"][0]["incident_id"], "i29", "most recently updated first")
+
+        last_page = self.client.get("/incidents", params={"impact": "major", "limit": 10, "offset": 10}).json()
+        self.assertEqual(len(last_page["items"]), 5)
+        self.assertIsNone(last_page["next_offset"])
+
+        components = self.client.get("/components", params={"status": "major_outage"}).json()
+        self.assertEqual([component["name"] for component in components["items"]], ["API Requests"])
+
+    def test_etag_revalidation_and_gzip(self):
+        response = self.client.get("/incidents", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        etag = response.headers["etag"]
+
+        not_modified = self.client.get("/incidents", headers={"If-None-Match": etag})
+        self.assertEqual(not_modified.status_code, 304)
+
+        resolved = Incident(incident_id="i3", status="resolved", updated_at="2024-11-23T13:00:00Z")
+        self.index.apply([IncidentDelta(IncidentDelta.RESOLVED, resolved, {"status": "resolved"})], self.index._components)
+        changed = self.client.get("/incidents", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["etag"], etag)
+        self.assertFalse(self.client.get("/incidents/i3").json()["open"])
+        self.assertEqual(self.client.get("/incidents", params={"state": "open"}).json()["total"], 29)
+
+    def test_unknown_incident_is_404(self):
+        self.assertEqual(self.client.get("/incidents/missing").status_code, 404)
+
+    def test_component_uptime_window(self):
+        history = monitor.ComponentHistory(max_gap=600)
+        history.record(0, {"c1": ("API Requests", "major_outage", None)})
+        history.record(300, {"c1": ("API Requests", "operational", None)})
+        history.record(600, {"c1": ("API Requests", "operational", None)})
+        with patch("microservices.monitor.app.component_history", history):
+            response = self.client.get("/components/uptime", params={"start": "1970-01-01T00:00:00Z", "end": 600})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["components"]["c1"]["uptime"], 0.5)
+        self.assertEqual(self.client.get("/components/uptime", params={"start": 10, "end": 5}).status_code, 422)
+
+    def test_full_event_hub_answers_503_before_streaming(self):
+        hub = monitor.EventHub(max_subscribers=1)
+        held = hub.acquire()
+        with patch("microservices.monitor.app.event_hub", hub):
+            response = self.client.get("/events")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], "30")
+        held.release()
+
+
+class TestReplay(unittest.TestCase):
+
+    def summary(self, status):
+        incidents = [] if status is None else [{
+            "id": "i1", "name": "Degraded API", "status": status, "impact": "major",
+            "created_at": "2024-11-23T00:00:00Z", "updated_at": "2024-11-23T00:00:00Z",
+            "incident_updates": [{"id": f"u-{status}", "body": status}],
+        }]
+        return json.dumps({"components": [], "incidents": incidents}).encode("utf-8")
+
+    @patch("microservices.monitor.app.archive_closed_incidents")
+    @patch("microservices.monitor.app.apply_deltas")
+    def test_day_long_recording_replays_in_seconds(self, mock_apply, mock_archive):
+        day = 24 * 3600
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "summary.rec.gz")
+            recorder = SummaryRecorder(path)
+            recorder.record(0, self.summary("investigating"))
+            recorder.record(6 * 3600, self.summary("monitoring"))
+            recorder.record(day, self.summary(None))
+            recorder.close()
+            source = ReplaySource(path)
+
+        with patch("microservices.monitor.app.replay_source", source), \
+                patch("microservices.monitor.app.clock", ScaledClock(origin=0, speed=200000)), \
+                patch("microservices.monitor.app.delta_engine", DeltaEngine()), \
+                patch("microservices.monitor.app.incident_index", IncidentIndex()):
+            started = time.monotonic()
+            monitor.monitor_github_service()
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 5)
+        kinds = [delta.kind for call in mock_apply.call_args_list for delta in call.args[0]]
+        self.assertEqual(kinds, [IncidentDelta.CREATED, IncidentDelta.UPDATED, IncidentDelta.DISAPPEARED])
+        created = mock_apply.call_args_list[0].args[0][0].incident
+        self.assertTrue(created.incident_id == "i1" and created.status == "investigating")
+
+
+class TestWarmRestart(unittest.TestCase):
+
+    summary = {
+        "components": [{"id": "c1", "name": "Pages", "status": "major_outage", "group_id": None}],
+        "incidents": [{"id": "i1", "name": "Degraded API", "status": "investigating", "impact": "major",
+                       "created_at": "2024-11-23T00:00:00Z", "updated_at": "2024-11-23T00:00:00Z", "incident_updates": []}],
+    }
+
+    def setUp(self):
+        for name, value in (("delta_engine", DeltaEngine()), ("incident_index", IncidentIndex()),
+                            ("summary_state", monitor.SummaryState())):
+            patcher = patch(f"microservices.monitor.app.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def response(self, status_code=200, etag='"v1"'):
+        response = MagicMock(status_code=status_code, headers={"ETag": etag})
+        response.iter_content.return_value = [json.dumps(self.summary).encode("utf-8")]
+        return response
+
+    @patch("microservices.monitor.app.apply_deltas")
+    @patch("microservices.monitor.app.requests.Session")
+    def test_restart_resumes_from_snapshot(self, mock_session, mock_apply):
+        mock_session.return_value.get.return_value = self.response()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "monitor.snapshot")
+            with patch("microservices.monitor.app.STATE_SNAPSHOT_PATH", path):
+                monitor.run_monitor_cycle()
+                first_ids = set(monitor.delta_engine.incidents)
+                self.assertEqual(len(mock_apply.call_args.args[0]), 2, "the incident and the faulty component are new")
+
+                # Restart: fresh state, restored from the snapshot
+                monitor.delta_engine.incidents, monitor.delta_engine.components = {}, {}
+                monitor.summary_state.etag = ""
+                self.assertEqual(monitor.restore_state_snapshot(path), 2)
+                mock_apply.reset_mock()
+                monitor.run_monitor_cycle()
+
+        mock_apply.assert_not_called()
+        self.assertEqual(set(monitor.delta_engine.incidents), first_ids, "the component outage keeps its id")
+        self.assertEqual(mock_session.return_value.headers.update.call_args.args[0], {"If-None-Match": '"v1"'})
+        self.assertEqual(monitor.incident_index.snapshot.by_id["i1"]["status"], "investigating")
+
+    @patch("microservices.monitor.app.requests.Session")
+    def test_cold_restart_resumes_the_open_outages_in_storage(self, mock_session):
+        store = use_sqlite_store(self)
+        mock_session.return_value.get.return_value = self.response()
+        monitor.run_monitor_cycle()
+        outage_id = next(incident_id for incident_id in monitor.delta_engine.incidents if incident_id.startswith("cyberark-"))
+
+        # Restart without a snapshot: fresh state, seeded from storage; then the component recovers
+        monitor.delta_engine.incidents, monitor.delta_engine.components = {}, {}
+        monitor.summary_state.etag = ""
+        self.assertEqual(monitor.seed_from_storage(), 2)
+        self.summary = {**self.summary, "components": [{"id": "c1", "name": "Pages", "status": "operational", "group_id": None}]}
+        mock_session.return_value.get.return_value = self.response(etag='"v2"')
+        monitor.run_monitor_cycle()
+
+        outages = [item for item in store.open_incidents(monitor.CYBERARK_TABLE_NAME) if item["incident_id"].startswith("cyberark-")]
+        self.assertEqual([item["incident_id"] for item in outages], [outage_id], "No second record for the same outage.")
+        closed = store.get(monitor.GITHUB_TABLE_NAME, outage_id)
+        self.assertEqual(closed["github_status"], "operational")
+        self.assertIn("archive_at", closed)
+
+    @patch("microservices.monitor.app.read_github_summary")
+    @patch("microservices.monitor.app.requests.Session")
+    def test_not_modified_summary_is_not_parsed(self, mock_session, mock_read):
+        monitor.summary_state.etag = '"v1"'
+        mock_session.return_value.get.return_value = self.response(status_code=304)
+
+        monitor.run_monitor_cycle()
+
+        mock_read.assert_not_called()
+
+
+class TestApiWorkers(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (("incident_index", IncidentIndex()), ("event_hub", monitor.EventHub())):
+            patcher = patch(f"microservices.monitor.app.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "monitor.snapshot")
+        self.follower = monitor.SnapshotFollower(self.path)
+
+    def write(self, saved_at, incidents):
+        monitor.write_snapshot(self.path, saved_at, "", "", incidents, {"c1": ("Pages", "operational", None)})
+
+    def test_worker_follows_the_pollers_snapshots(self):
+        self.assertFalse(self.follower.poll(), "No snapshot written yet.")
+        self.write(100.0, [Incident(incident_id="i1", status="investigating", github_status="investigating")])
+
+        self.assertTrue(self.follower.poll())
+        self.assertFalse(self.follower.poll(), "An unchanged snapshot is not read again.")
+        self.assertEqual(monitor.incident_index.snapshot.by_id["i1"]["status"], "investigating")
+
+        self.write(200.0, [])
+        self.assertTrue(self.follower.poll())
+        self.assertEqual(monitor.incident_index.snapshot.by_id["i1"]["status"], "resolved")
+        self.assertEqual(self.follower.loaded_at, 200.0)
+
+    def test_workers_republish_the_pollers_event_ids(self):
+        poller_hub = monitor.EventHub()
+        event_id = poller_hub.publish("incident", {"incident": "i1"})
+        monitor.write_snapshot(self.path, 100.0, "", "", [], {}, poller_hub.last_event_id, poller_hub.recent(10))
+
+        self.assertTrue(self.follower.poll())
+        self.assertEqual(monitor.event_hub.recent(10), [(event_id, "incident", '{"incident":"i1"}')])
+        self.assertEqual(monitor.event_hub.last_event_id, poller_hub.last_event_id)
+
+    def test_follower_starts_with_the_app_not_at_import(self):
+        started = threading.Event()
+        with patch.object(monitor, "MONITOR_ROLE", "api"), patch.object(monitor, "snapshot_follower") as mock_follower:
+            mock_follower.run.side_effect = started.set
+            with TestClient(monitor.app):
+                self.assertTrue(started.wait(5))
+        mock_follower.run.assert_called_once()
+
+    def test_worker_readiness_waits_for_a_snapshot(self):
+        client = TestClient(monitor.app)
+        with patch.object(monitor, "MONITOR_ROLE", "api"), patch.object(monitor, "snapshot_follower", self.follower):
+            self.assertEqual(client.get("/readiness").status_code, 503)
+            self.write(100.0, [])
+            self.follower.poll()
+            self.assertEqual(client.get("/readiness").status_code, 200)
+
+
+class TestProfiling(unittest.TestCase):
+
+    @patch("microservices.monitor.app.run_monitor_cycle")
+    def test_admin_endpoint_profiles_next_cycles(self, mock_cycle):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = monitor.CycleProfiler("monitor", functions=("log_to_tables",), directory=directory)
+            with patch.object(monitor, "profiler", profiler):
+                client = TestClient(monitor.app)
+                response = client.post("/admin/profile", params={"cycles": 1})
+                self.assertEqual(response.json()["remaining_cycles"], 1)
+
+                monitor_github_service(max_cycles=2, override_wait_time=True)
+
+                status = client.get("/admin/profile").json()
+                self.assertEqual(status["profiled_cycles"], 1)
+                self.assertEqual(len(os.listdir(directory)), 1)
+        self.assertEqual(mock_cycle.call_count, 2)
+
+
+class TestDetectionLatency(unittest.TestCase):
+
+    def test_latency_endpoint_reports_detection_intervals(self):
+        tracker = monitor.LatencyTracker("monitor", report_path=None)
+        incident = Incident(incident_id="abc123", created_at="2024-11-23T12:00:00Z", impact="minor")
+        component = Incident(incident_id="cyberark-1", created_at="2024-11-23T12:00:00Z", component_id="c1")
+        with patch.object(monitor, "latency", tracker), \
+                patch.object(monitor.summary_state, "sighted_at", "2024-11-23T12:01:00+00:00"):
+            monitor.record_detection_latency(incident, "2024-11-23T12:01:02+00:00")
+            monitor.record_detection_latency(component, "2024-11-23T12:01:02+00:00")
+            intervals = TestClient(monitor.app).get("/slo/latency").json()["intervals"]
+            sketches = TestClient(monitor.app).get("/slo/latency/sketch").json()
+
+        self.assertAlmostEqual(intervals["github_to_sighting"]["p50"], 60, delta=0.6)
+        self.assertAlmostEqual(intervals["sighting_to_write"]["p99"], 2, delta=0.02)
+        self.assertEqual(intervals["github_to_write"]["count"], 1)
+        self.assertEqual(QuantileSketch.from_dict(sketches["github_to_write"]).count, 1)
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
     unittest.main()
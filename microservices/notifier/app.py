@@ -1,31 +1,61 @@
 import os
+import socket
 import threading
 import time
-import boto3
-import json
 import logging
+import uuid
 import requests
-from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from common.aws_clients import AwsClients, StartupTimer
+from common.storage import AttributeMissing, ConditionFailed, DynamoDBStore, Equals, LessThan, storage_from_env
+from common.change_feed import DynamoDBStreamFeed, INSERT, MODIFY, ReaderSlots
+from common.incident_model import Incident, EscalationRecord
+from common.lifecycle import CLOSED_GITHUB_STATUSES, RESOLVED, closing_attributes
+from common.clock import ScaledClock, clock_from_env
+from common.circuit_breaker import CircuitBreaker, CircuitOpenError, is_http_failure
+from common.profiling import CycleProfiler, install_signal_handler
+from common.tracing import CLIENT, tracer_from_env
+from common.latency import (GITHUB_TO_PAGE, GITHUB_TO_SLACK, SLACK_TO_ACK, WRITE_TO_PAGE, WRITE_TO_SLACK,
+                            LatencyTracker, seconds_between)
+from common.routing import ROUTING_POLICY_PATH, RoutingPolicies, default_policy, resolve_secret
+from common.secrets_provider import SecretsProvider
+from common.refresh_scheduler import RefreshScheduler
+from common.backfill import DETAIL_PATH, STATUSPAGE_URL
+from prometheus_client import start_http_server
 
 # Configuration Constants
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", 300))
 TEST_FLOW = os.getenv("TEST_FLOW", "false").lower() == "true"
 CYBERARK_TABLE_NAME = os.getenv("CYBERARK_TABLE_NAME", "TestCyberArkIncidents" if TEST_FLOW else "CyberArkIncidents")
 GITHUB_TABLE_NAME = os.getenv("GITHUB_TABLE_NAME", "TestGithubIncidents" if TEST_FLOW else "GithubIncidents")
+# Stream reader slots (see ReaderSlots), kept apart from the incidents
+LEASE_TABLE_NAME = os.getenv("LEASE_TABLE_NAME", "TestNotifierLeases" if TEST_FLOW else "NotifierLeases")
 TEST_CHANNEL = os.getenv("TEST_CHANNEL", "incident-testing")
 PROD_CHANNEL = os.getenv("PROD_CHANNEL", "incident-alerts")
 SLACK_CHANNEL = ""
 SNS_TOPIC_ARN = os.getenv("SNS_TOPIC_ARN")
-DEVOPS_MANAGER_PHONE = None
-DIRECTOR_PHONE = None
-# DynamoDB Setup
-dynamodb = boto3.resource("dynamodb", region_name="us-west-2")
-cyberark_table = dynamodb.Table(CYBERARK_TABLE_NAME)
-github_table = dynamodb.Table(GITHUB_TABLE_NAME)
-ESCALATION_ORDER = ["DEVOPS_MANAGER", "DIRECTOR"]
-
-# SNS Setup
-sns_client = boto3.client("sns", region_name="us-west-2")
+SLACK_API_TOKEN = None  # Swapped in from SECRETS whenever the Slack bot token is rotated
+# Slack errors that mean the bot token was rotated or revoked: the secrets are refreshed right away
+SLACK_AUTH_ERRORS = ("invalid_auth", "not_authed", "token_revoked", "token_expired")
+# Circuit breakers: once a dependency keeps failing, calls to it fail immediately instead of waiting for timeouts
+METRICS_PORT = int(os.getenv("METRICS_PORT", 8000))  # Prometheus metrics, including circuit breaker states
+slack_breaker = CircuitBreaker("slack")
+github_breaker = CircuitBreaker("github")
+dynamodb_breaker = CircuitBreaker("dynamodb")
+# Tracing: handle_incident continues the trace the monitor stamped on the escalation record
+tracer = tracer_from_env("notifier")
+# Latency from detection to Slack, acknowledgment and each page (incident_latency_* metrics, periodic SLO report)
+latency = LatencyTracker("notifier")
+# AWS Setup (DynamoDB, SNS and Secrets Manager clients are created on first use)
+aws = AwsClients(region_name="us-west-2", breakers={"dynamodb": dynamodb_breaker}, tracer=tracer)
+# Incident tables: DynamoDB, or an embedded SQLite database shared with the monitor (STORAGE_BACKEND=sqlite, SQLITE_PATH)
+storage = storage_from_env(aws)
+SECRET_NAMES = ["devops_manager_phone", "director_phone", "slack_app_bot_token", "devops_manager_nickname", "director_nickname"]
+
+# Escalation timings run on this clock (a virtual, sped-up clock when replaying a recording, see CLOCK_SPEED)
+clock = clock_from_env()
 
 # Logging Configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(name)s - %(filename)s:%(lineno)d - %(message)s")
@@ -37,52 +67,121 @@ TIME_TO_CONCLUDE_ACTION = int(os.getenv("TIME_TO_CONCLUDE_ACTION", 1800))
 TIME_TO_IMPLEMENT_ACTION = int(os.getenv("TIME_TO_IMPLEMENT_ACTION", 3600))
 TIME_TO_CANCEL_NEXT_ESCALATION = int(os.getenv("TIME_TO_CANCEL_NEXT_ESCALATION", 900))
 
+# Work partitioning between notifier replicas: each incident is leased to one replica at a time.
+# The owner renews the lease every cycle, so a crashed replica's incidents are taken over once it expires.
+NOTIFIER_ID = os.getenv("NOTIFIER_ID") or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+LEASE_SECONDS = int(os.getenv("LEASE_SECONDS", 2 * CHECK_INTERVAL))
+
+# "stream": react to the monitor's writes as they happen (DynamoDB Streams), rescanning every RECONCILE_INTERVAL
+# seconds as a safety net and to drive time-based escalations. "poll": rescan every CHECK_INTERVAL only.
+NOTIFIER_MODE = os.getenv("NOTIFIER_MODE", "poll").lower()
+RECONCILE_INTERVAL = int(os.getenv("RECONCILE_INTERVAL", CHECK_INTERVAL))
+
 # Slack IDs
 DEVOPS_ON_CALL = os.getenv("DEVOPS_ON_CALL", "devops_on_call")
 DEVOPS_MANAGER_NICKNAME = os.getenv("DEVOPS_MANAGER", "devops_manager")
 DIRECTOR_NICKNAME = os.getenv("RND_DIRECTOR", "rnd_director")
+# Secrets Manager values (also what routing policies reference as "secret:<name>"), fetched in one call at startup
+# and refreshed in the background before they expire (SECRETS_TTL, SECRETS_REFRESH_MARGIN), so rotations need no restart
+SECRETS = SecretsProvider(aws.secretsmanager, SECRET_NAMES,
+                          defaults={"devops_manager_nickname": DEVOPS_MANAGER_NICKNAME, "director_nickname": DIRECTOR_NICKNAME})
 
 
-def get_secrets():
+def apply_secrets(changed):
     """
-    Fetch secrets from AWS Secrets Manager.
+    Swap rotated secrets into the clients that hold them (the Slack bot token). Phone numbers and nicknames
+    are read from SECRETS on every page and mention, so they need no swapping.
     """
-    region_name = os.getenv("AWS_REGION", "us-west-2")  # Replace with your AWS region if needed
+    global SLACK_API_TOKEN
+    if changed.get("slack_app_bot_token"):
+        SLACK_API_TOKEN = changed["slack_app_bot_token"]
+        logger.info("Using the updated Slack bot token.")
 
-    # Create a Secrets Manager client
-    session = boto3.session.Session()
-    client = session.client(service_name="secretsmanager", region_name=region_name)
-    ret_dict = {}
 
-    try:
-        for secret_name in ["devops_manager_phone", "director_phone", "slack_app_bot_token", "devops_manager_nickname", "director_nickname"]:
-            response = client.get_secret_value(SecretId=secret_name)
-            secret_string = response.get("SecretString")
-            if secret_string:
-                secret_dict = json.loads(secret_string)  # Parse the JSON string into a dictionary
-                ret_dict[secret_name] = list(secret_dict.values())[0]
-    except Exception as e:
-        logger.error(f"Failed to retrieve secret: {e}")
-        raise
-    return ret_dict
+SECRETS.on_change(apply_secrets)
+
+
+def default_routing_policy():
+    """
+    The policy of incidents no routing policy matches: the DevOps on-call is mentioned when the incident is
+    published, the DevOps Manager paged after TIME_TO_ACKNOWLEDGE and the Director after TIME_TO_CANCEL_NEXT_ESCALATION.
+    """
+    return default_policy([
+        {"name": "on_call", "label": "DEVOPS_ON_CALL", "timeout": TIME_TO_ACKNOWLEDGE, "mention": DEVOPS_ON_CALL},
+        {"name": "devops", "label": "DEVOPS_MANAGER", "timeout": max(TIME_TO_CANCEL_NEXT_ESCALATION - TIME_TO_ACKNOWLEDGE, 0),
+         "mention": "secret:devops_manager_nickname", "sns_targets": ["secret:devops_manager_phone"]},
+        {"name": "director", "label": "DIRECTOR", "mention": "secret:director_nickname", "sns_targets": ["secret:director_phone"]},
+    ])
+
+
+# Routing: the Slack channel and escalation tiers of each incident, by component, impact and provider.
+# The policy file is reloaded when it changes, without a restart.
+routing = RoutingPolicies(ROUTING_POLICY_PATH, default_routing_policy)
+
+# Digests: when DIGEST_THRESHOLD or more new incidents of one routing policy arrive together (a broad outage), they are
+# published in one Slack thread, acknowledged and escalated together (one notification and page per tier), and their
+# follow-ups batched into one message at most every DIGEST_UPDATE_INTERVAL seconds. New incidents join an open digest
+# while its newest incident is less than DIGEST_WINDOW seconds old.
+DIGEST_THRESHOLD = int(os.getenv("DIGEST_THRESHOLD", 5))  # 0 disables digests
+DIGEST_WINDOW = int(os.getenv("DIGEST_WINDOW", 600))
+DIGEST_UPDATE_INTERVAL = int(os.getenv("DIGEST_UPDATE_INTERVAL", 300))
+DIGEST_MAX_LINES = 50  # Incidents listed per Slack message, the rest are counted
+# Slack user and channel ids are looked up once per SLACK_DIRECTORY_TTL seconds instead of on every mention and reaction check
+SLACK_DIRECTORY_TTL = int(os.getenv("SLACK_DIRECTORY_TTL", 3600))
+_slack_directory = {}
+
+# Detail refresh: the GitHub incidents this replica holds are re-read from githubstatus.com (their own incident JSON)
+# on a schedule of their own, so new updates and resolutions reach Slack without waiting for the monitor's summary.
+# New, escalating and changing incidents are refreshed every DETAIL_REFRESH_FAST seconds; unchanged ones back off
+# toward DETAIL_REFRESH_SLOW. All refreshes share DETAIL_REQUESTS_PER_MINUTE, most urgent incidents first. Faulty
+# components without a GitHub incident (cyberark-* ids) have no detail and are never refreshed.
+DETAIL_REFRESH_FAST = int(os.getenv("DETAIL_REFRESH_FAST", 60))
+DETAIL_REFRESH_SLOW = int(os.getenv("DETAIL_REFRESH_SLOW", 900))
+DETAIL_REQUESTS_PER_MINUTE = int(os.getenv("DETAIL_REQUESTS_PER_MINUTE", 30))  # 0 disables the detail refresh
+DETAIL_REFRESH_TICK = 5  # Seconds between checks for due refreshes
+# GitHub record attributes a detail refresh updates (affected components stay with the monitor's summary)
+DETAIL_FIELDS = ("impact", "status", "github_status", "name", "updated_at", "resolved_at", "last_update_id", "last_update_body")
+detail_scheduler = RefreshScheduler(DETAIL_REFRESH_FAST, DETAIL_REFRESH_SLOW, DETAIL_REQUESTS_PER_MINUTE)
+# Set when a refresh wrote a change, so the polling loop handles it before its next CHECK_INTERVAL
+details_changed = threading.Event()
 
 
 def get_incidents():
     """
     Fetch incidents with pending escalation stages.
+
+    Incidents leased by another live notifier replica are left out.
+
+    Returns:
+        list[EscalationRecord]: Escalation records of incidents that are not resolved.
     """
     try:
         new_incidents = []
-        response = cyberark_table.scan()
-        for cyberark_incident in response.get("Items", []):
-            if cyberark_incident['incident_status'] != 'Resolved':
-                new_incidents.append(cyberark_incident)
+        now = time.time()
+        for item in storage.open_incidents(CYBERARK_TABLE_NAME):
+            if item['incident_status'] != RESOLVED:
+                incident = EscalationRecord.from_item(item)
+                if incident.lease_owner in ("", NOTIFIER_ID) or float(incident.lease_expires_at or 0) < now:
+                    new_incidents.append(incident)
         return new_incidents
     except Exception as e:
         logger.error(f"Failed to fetch incidents: {e}")
         return []
 
 
+def get_escalation_record(incident_id):
+    """
+    Read the current escalation record of an incident from the CyberArk table.
+
+    Returns:
+        EscalationRecord: The record, or None if it does not exist.
+    """
+    item = storage.get(CYBERARK_TABLE_NAME, incident_id, consistent=True)
+    if item is None:
+        return None
+    return EscalationRecord.from_item(item)
+
+
 def update_table_attribute(incident_id, attribute_value, attribute_name, update_table_name):
     """
     Update the slack_message_thread_ts attribute for a specific incident in the CyberArk table.
@@ -94,19 +193,15 @@ def update_table_attribute(incident_id, attribute_value, attribute_name, update_
         update_table_name
 
     Returns:
-        dict: The response from the update operation.
+        dict: The updated attribute.
     """
-    table = cyberark_table
+    table_name = CYBERARK_TABLE_NAME
     if update_table_name != CYBERARK_TABLE_NAME:
-        table = github_table
+        table_name = GITHUB_TABLE_NAME
     try:
         # Perform the update
-        response = table.update_item(
-            Key={"incident_id": incident_id},  # Primary key to identify the record
-            UpdateExpression=f"SET {attribute_name} = :val",
-            ExpressionAttributeValues={":val": attribute_value},
-            ReturnValues="UPDATED_NEW"  # Return the updated attributes
-        )
+        storage.update(table_name, incident_id, {attribute_name: attribute_value})
+        response = {attribute_name: attribute_value}
         logger.info(f"Updated slack_message_thread_ts for incident_id {incident_id}: {response}")
         return response
     except Exception as e:
@@ -114,7 +209,111 @@ def update_table_attribute(incident_id, attribute_value, attribute_name, update_
         return None
 
 
-def post_to_slack(text, subject=None, thread_ts=None, incident_id=None):
+class StaleRecordError(Exception):
+    """
+    Raised when an escalation record was changed by someone else since it was read.
+    """
+
+
+def acquire_lease(incident):
+    """
+    Take (or renew) this replica's lease on an incident.
+
+    The lease is granted only if the incident is unleased, already leased to this replica,
+    or its previous lease has expired.
+
+    Args:
+        incident (EscalationRecord): The escalation record to lease; its lease fields are updated.
+
+    Returns:
+        bool: True if this replica now holds the lease.
+    """
+    now = time.time()
+    expires_at = int(now + LEASE_SECONDS)
+    unleased = AttributeMissing("lease_owner") | Equals("lease_owner", NOTIFIER_ID) | Equals("lease_owner", "") | \
+        LessThan("lease_expires_at", int(now))
+    try:
+        storage.update(CYBERARK_TABLE_NAME, incident["incident_id"],
+                       {"lease_owner": NOTIFIER_ID, "lease_expires_at": expires_at}, condition=unleased)
+    except ConditionFailed:
+        logger.debug(f"Incident {incident['incident_id']} is leased by another notifier.")
+        return False
+    except Exception as e:
+        logger.error(f"Failed to lease incident {incident['incident_id']}: {e}")
+        return False
+    incident.lease_owner = NOTIFIER_ID
+    incident.lease_expires_at = expires_at
+    return True
+
+
+def update_escalation_record(incident, **attributes):
+    """
+    Update attributes of an escalation record in one write, guarded by its version.
+
+    The write succeeds only if the stored version still matches the one the record was read with;
+    the version is then incremented and the in-memory record is updated to match.
+
+    Args:
+        incident (EscalationRecord): The escalation record as last read or written by this replica.
+        **attributes: Attribute names and their new values.
+
+    Raises:
+        StaleRecordError: If the record was modified concurrently.
+    """
+    expected_version = int(incident.get("version", 0))
+    condition = Equals("version", expected_version)
+    if expected_version == 0:
+        condition = AttributeMissing("version") | condition
+    try:
+        storage.update(CYBERARK_TABLE_NAME, incident["incident_id"], {**attributes, "version": expected_version + 1},
+                       condition=condition)
+    except ConditionFailed:
+        raise StaleRecordError(f"Escalation record {incident['incident_id']} changed since version {expected_version}")
+    for name, value in attributes.items():
+        incident[name] = value
+    incident.version = expected_version + 1
+
+
+def slack_request(method, url, **kwargs):
+    """
+    Call the Slack Web API through the Slack circuit breaker.
+
+    Args:
+        method (str): "get" or "post".
+        url (str): Slack Web API method URL.
+        **kwargs: Passed to requests.
+
+    Returns:
+        requests.Response: A successful (2xx) response.
+
+    Raises:
+        requests.exceptions.RequestException: If the call failed, or was skipped because the circuit is open.
+    """
+    with tracer.span(f"slack.{url.rsplit('/', 1)[-1]}", kind=CLIENT, attributes={"http.method": method.upper(), "http.url": url}):
+        try:
+            response = slack_breaker.call(_send_slack_request, method, url, is_failure=is_http_failure, **kwargs)
+        except CircuitOpenError as open_error:
+            raise requests.exceptions.ConnectionError(str(open_error))
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    error = body.get("error") if isinstance(body, dict) else None
+    if error in SLACK_AUTH_ERRORS:
+        if SECRETS.request_refresh():
+            logger.error(f"Slack rejected the bot token ({error}), refreshing the secrets.")
+        else:
+            logger.error(f"Slack rejected the bot token ({error}); the secrets were fetched moments ago.")
+    return response
+
+
+def _send_slack_request(method, url, **kwargs):
+    response = getattr(requests, method)(url=url, timeout=10, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def post_to_slack(text, subject=None, thread_ts=None, incident_id=None, channel=None):
     """
     Post a message to Slack, either as a new message or as a reply in a thread.
 
@@ -122,7 +321,8 @@ def post_to_slack(text, subject=None, thread_ts=None, incident_id=None):
         text (str): The message text.
         subject (str, optional): The subject text for a new incident. Creates a new thread if provided.
         thread_ts (str, optional): The thread timestamp to reply in an existing thread. If None, a new message is created.
-        incident_id (str, optional): The thread timestamp to reply in an existing thread. If None, a new message is created.
+        incident_id (str, optional): Incident whose slack_message_thread_ts is set to the new thread. If None, nothing is stored.
+        channel (str, optional): Channel to post in. Defaults to SLACK_CHANNEL.
 
     Returns:
         dict: The response JSON from Slack if successful, or None on failure.
@@ -135,34 +335,36 @@ def post_to_slack(text, subject=None, thread_ts=None, incident_id=None):
         "Authorization": f"Bearer {SLACK_API_TOKEN}",
         "Content-Type": "application/json"
     }
+    channel = channel or SLACK_CHANNEL
 
     # If both subject and text are provided for a new incident:
     if subject and not thread_ts:
         # Post the subject as a new message
         payload = {
-            "channel": SLACK_CHANNEL,
+            "channel": channel,
             "text": subject,  # Post subject as the main message
         }
 
         try:
-            response = requests.post(
+            response = slack_request(
+                "post",
                 url="https://slack.com/api/chat.postMessage",
                 json=payload,
-                headers=headers,
-                timeout=10
+                headers=headers
             )
-            response.raise_for_status()
             slack_response = response.json()
 
             if slack_response.get("ok"):
                 new_thread_ts = slack_response.get("ts")  # Get thread_ts for the new message
                 logger.info(f"New thread created with subject: {subject}")
-                update_table_attribute(incident_id=incident_id, attribute_value=new_thread_ts, attribute_name="slack_message_thread_ts", update_table_name=CYBERARK_TABLE_NAME)
+                if incident_id:
+                    update_table_attribute(incident_id=incident_id, attribute_value=new_thread_ts, attribute_name="slack_message_thread_ts", update_table_name=CYBERARK_TABLE_NAME)
                 # Post the text as a reply in the thread
                 if text:
                     return post_to_slack(
                         text=text,
-                        thread_ts=new_thread_ts
+                        thread_ts=new_thread_ts,
+                        channel=channel
                     )
                 return slack_response
             else:
@@ -177,38 +379,40 @@ def post_to_slack(text, subject=None, thread_ts=None, incident_id=None):
         payload = {
             "text": text,  # Post the text as a reply in the thread
             "thread_ts": thread_ts,
-            "channel": SLACK_CHANNEL
+            "channel": channel
         }
         try:
-            response = requests.post(
+            response = slack_request(
+                "post",
                 url="https://slack.com/api/chat.postMessage",
                 json=payload,
-                headers=headers,
-                timeout=10
+                headers=headers
             )
-            response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to post to Slack: {e}")
             return None
 
 
-def send_sns_message(phone_number, message):
+def send_sns_message(target, message):
     """
-    Send a text message using AWS SNS.
+    Send a message using AWS SNS: a text message to a phone number, or a publication to a topic ARN.
     """
     try:
-        response = sns_client.publish(
-            PhoneNumber=phone_number,
-            Message=message,
-            MessageAttributes={
-                'AWS.SNS.SMS.SMSType': {
-                    'DataType': 'String',
-                    'StringValue': 'Promotional'  # Could be 'Promotional' as well
+        if target.startswith("arn:"):
+            response = aws.sns().publish(TopicArn=target, Message=message)
+        else:
+            response = aws.sns().publish(
+                PhoneNumber=target,
+                Message=message,
+                MessageAttributes={
+                    'AWS.SNS.SMS.SMSType': {
+                        'DataType': 'String',
+                        'StringValue': 'Promotional'  # Could be 'Promotional' as well
+                    }
                 }
-            }
-        )
-        logger.info(f"Sent SNS message to {phone_number}. Response: {response}")
+            )
+        logger.info(f"Sent SNS message to {target}. Response: {response}")
     except Exception as e:
         logger.error(f"Failed to send SNS message: {e}")
 
@@ -216,51 +420,92 @@ def send_sns_message(phone_number, message):
 shutdown_event = threading.Event()
 
 
-def escalate_to_next_tier(incident):
+def incident_policy(incident, github_incident=None):
+    """
+    Return the routing policy of an incident: the one it was published under, or else the one its
+    GitHub record (affected components and impact) matches now.
+    """
+    table = routing.current()
+    policy = table.policy(incident.get("routing_policy"))
+    if policy is None and github_incident is not None:
+        policy = table.match(github_incident.get("affected_components") or (), github_incident.get("impact"), "github")
+    return policy or table.default
+
+
+def incident_channel(incident, policy=None):
+    """
+    Return the Slack channel of an incident's thread (where it is, or will be, published).
+    """
+    if incident.get("slack_channel") or incident.get("slack_message_thread_ts"):
+        # Threads published before routing policies recorded their channel are in the default channel
+        return incident.get("slack_channel") or SLACK_CHANNEL
+    return (policy.slack_channel if policy else "") or SLACK_CHANNEL
+
+
+def mention(tier):
     """
-    Escalate incident to the DevOps Manager.
+    Return the Slack mention of a tier's contact ("<@channel>" if it cannot be resolved).
     """
-    ts = incident['slack_message_thread_ts']
-    text = f"🚨 @channel\n Escalation: Incident {incident['incident_id']} needs your attention.\n"
-    escalation_details = incident.get('escalation_details')
-    if escalation_details == 'Initial escalation record created.':
-        escalation_details = 'The Devops On Call did not acknowledge a new incident within the agreed escalation time'
-    # text += f"Status: {incident['incident_status']}\nDetails: {escalation_details}\n"
-    current_escalation_status = incident['escalation_status']
-    next_escalation_point_number = DEVOPS_MANAGER_PHONE
-    msg = f"escalating to DEVOPS_MANAGER: <@{get_user_id_by_nickname(DEVOPS_MANAGER_NICKNAME)['user_id']}>"
-    if current_escalation_status == 'devops_escalation':
-        next_escalation_point_number = DIRECTOR_PHONE
-        msg = f"escalating to DIRECTOR: <@{get_user_id_by_nickname(DIRECTOR_NICKNAME)['user_id']}>"
-    text = msg
+    nickname = resolve_secret(tier.mention, SECRETS)
+    if not nickname:
+        return "<@channel>"
+    return f"<@{get_user_id_by_nickname(nickname)['user_id']}>"
 
-    slack_response = post_to_slack(text, incident_id=incident['incident_id'], thread_ts=incident['slack_message_thread_ts'])
-    if slack_response.get('warning'):
+
+def escalate_to_next_tier(incident, tier=None, channel=None, digest_size=0):
+    """
+    Notify the tier the incident has just been escalated to: a mention in the incident's Slack thread
+    (and in the tier's own channel, if it has one) and a page to each of the tier's SNS targets.
+
+    Args:
+        incident (EscalationRecord): The incident, with escalation_status already set to the tier's.
+        tier (Tier, optional): The tier. Defaults to the tier of the incident's escalation_status in its routing policy.
+        channel (str, optional): Channel of the incident's thread. Defaults to the incident's.
+        digest_size (int, optional): Number of incidents escalated together, when the incident leads a digest.
+    """
+    if tier is None:
+        policy = incident_policy(incident)
+        tier = policy.tiers[policy.tier_index(incident['escalation_status']) or 0]
+        channel = channel or incident_channel(incident, policy)
+    channel = channel or incident_channel(incident)
+    text = f"escalating to {tier.label}: {mention(tier)}"
+    if digest_size:
+        text += f" ({digest_size} incidents in this digest)"
+
+    slack_response = post_to_slack(text, incident_id=incident['incident_id'], thread_ts=incident['slack_message_thread_ts'], channel=channel)
+    # The page goes out even when Slack is unavailable
+    if slack_response and slack_response.get('warning'):
         if slack_response.get('warning') != '':
             logger.error(f"post_to_slack {slack_response.get('warning')}")
-    send_sns_message(next_escalation_point_number, f"{text}")  # Replace with actual number
+    if tier.slack_channel and tier.slack_channel != channel:
+        post_to_slack(text="", subject=f"🚨 Incident {incident['incident_id']} (#{channel}) needs your attention: {text}", channel=tier.slack_channel)
+    with tracer.span("notifier.page", attributes={"escalation.status": incident['escalation_status'], "escalation.tier": tier.name}):
+        for target in tier.sns_targets:
+            resolved_target = resolve_secret(target, SECRETS)
+            if not resolved_target:
+                logger.error(f"Cannot page {tier.name} for incident {incident['incident_id']}: {target} is not configured.")
+                continue
+            send_sns_message(resolved_target, f"{text}")
 
 
 def get_record_by_id(incident_id, table_name):
     """
-    Retrieve a record from the GitHub DynamoDB table by incident_id.
+    Retrieve a record from the GitHub table by incident_id.
 
     Args:
         incident_id (str): The ID of the incident to retrieve.
         table_name
     Returns:
-        dict: The retrieved record, or None if not found.
+        Incident: The retrieved record, or None if not found.
     """
     if table_name not in ["TestCyberArkIncidents", "TestGithubIncidents", "CyberArkIncidents", "GithubIncidents"]:
         raise Exception(f"Invalid table name: {table_name}")
 
-    table = github_table
-
     try:
-        response = table.get_item(Key={"incident_id": incident_id})
-        if "Item" in response:
-            logger.info(f"Record found: {response['Item']}")
-            return response["Item"]
+        item = storage.get(GITHUB_TABLE_NAME, incident_id)
+        if item is not None:
+            logger.info(f"Record found: {item}")
+            return Incident.from_item(item)
         else:
             logger.warning(f"No record found for incident_id: {incident_id}")
             return None
@@ -269,22 +514,41 @@ def get_record_by_id(incident_id, table_name):
         return None
 
 
+def cached_lookup(kind, name, lookup, found):
+    """
+    Return lookup(name), reusing the result of an earlier successful lookup for SLACK_DIRECTORY_TTL seconds.
+
+    Args:
+        found (callable): Tells whether a result is worth caching (failed lookups are retried next time).
+    """
+    cached = _slack_directory.get((kind, name))
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    result = lookup(name)
+    if found(result):
+        _slack_directory[(kind, name)] = (result, time.monotonic() + SLACK_DIRECTORY_TTL)
+    return result
+
+
 def get_channel_id(channel_name):
     """
-    Get the channel ID for a given channel name.
+    Get the channel ID for a given channel name (cached, see SLACK_DIRECTORY_TTL).
     """
+    return cached_lookup("channel", channel_name, _get_channel_id, lambda channel_id: channel_id is not None)
+
+
+def _get_channel_id(channel_name):
     headers = {
         "Authorization": f"Bearer {SLACK_API_TOKEN}",
         "Content-Type": "application/json"
     }
 
     try:
-        response = requests.get(
+        response = slack_request(
+            "get",
             url="https://slack.com/api/conversations.list",
-            headers=headers,
-            timeout=10
+            headers=headers
         )
-        response.raise_for_status()
         slack_response = response.json()
 
         if not slack_response.get("ok"):
@@ -304,12 +568,13 @@ def get_channel_id(channel_name):
         return None
 
 
-def check_reaction_on_slack(thread_ts):
+def check_reaction_on_slack(thread_ts, channel=None):
     """
     Check if there is a reaction on a Slack message identified by thread_ts.
 
     Args:
         thread_ts (str): The thread timestamp of the Slack message to check.
+        channel (str, optional): Channel of the message. Defaults to SLACK_CHANNEL.
 
     Returns:
         bool: True if a reaction exists, False otherwise.
@@ -324,16 +589,15 @@ def check_reaction_on_slack(thread_ts):
     }
 
     try:
-        response = requests.get(
+        response = slack_request(
+            "get",
             url="https://slack.com/api/reactions.get",
             params={
-                "channel": get_channel_id(SLACK_CHANNEL),
+                "channel": get_channel_id(channel or SLACK_CHANNEL),
                 "timestamp": thread_ts
             },
-            headers=headers,
-            timeout=10
+            headers=headers
         )
-        response.raise_for_status()
         slack_response = response.json()
 
         if slack_response.get("ok") and slack_response.get("message", {}).get("reactions"):
@@ -350,20 +614,23 @@ def check_reaction_on_slack(thread_ts):
 
 def get_user_id_by_nickname(nickname):
     """
-    Get the Slack user ID for a given user nickname (display name).
+    Get the Slack user ID for a given user nickname (display name), cached (see SLACK_DIRECTORY_TTL).
     """
+    return cached_lookup("user", nickname, _get_user_id_by_nickname, lambda result: result.get("user_id") not in (None, "channel"))
+
+
+def _get_user_id_by_nickname(nickname):
     headers = {
         "Authorization": f"Bearer {SLACK_API_TOKEN}",
         "Content-Type": "application/json"
     }
 
     try:
-        response = requests.get(
+        response = slack_request(
+            "get",
             url="https://slack.com/api/users.list",
-            headers=headers,
-            timeout=10
+            headers=headers
         )
-        response.raise_for_status()
         slack_response = response.json()
 
         if not slack_response.get("ok"):
@@ -382,128 +649,711 @@ def get_user_id_by_nickname(nickname):
         return {"nickname": nickname, "result": "failed", "user_id": "channel"}
 
 
-def get_latest_incident_update(github_incident_id):
-    # url = "https://www.githubstatus.com/api/v2/incidents/ltyqfp67463z.json"
-    url = f"https://www.githubstatus.com/api/v2/incidents/{github_incident_id}.json"
-
-    try:
-        response = requests.get(url)
-        response.raise_for_status()  # Check for any request errors
-        incident_data = response.json()
-
-        # Get the incident updates list and return the latest update
-        incident_updates = incident_data['incident']['incident_updates']
-        if incident_updates:
-            latest_update = incident_updates[0] # The first item is the latest update
-            return latest_update
-        else:
-            return None
+def close_incident(incident, github_incident, thread_ts):
+    """
+    Close an incident GitHub reports as resolved (or whose faulty component recovered).
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"failed get_latest_incident_update: {e}")
-        return None
+    Posts the closing update to the Slack thread and marks the escalation record Resolved,
+    which removes it from the notifier's open set and schedules it for archiving.
+    """
+    if thread_ts:
+        text = f"✅ Incident {incident['incident_id']} is {github_incident['github_status']} on GitHub."
+        if github_incident.get("last_update_id") and github_incident["last_update_id"] != incident.get("notified_update_id"):
+            text += f"\n{github_incident['last_update_body']}"
+        post_to_slack(text=text, thread_ts=thread_ts, channel=incident_channel(incident))
+    update_escalation_record(
+        incident,
+        incident_status=RESOLVED,
+        notified_update_id=github_incident.get("last_update_id", ""),
+        last_incident_update_time=clock.utcnow().isoformat(),
+        **closing_attributes(clock.now()),
+    )
+    logger.info(f"Incident {incident['incident_id']} closed ({github_incident['github_status']}).")
 
 
 def handle_incident(incident):
     """
     Process and escalate incidents based on the status and timing.
+
+    Runs in a span of the incident's trace, so every Slack, DynamoDB and SNS call it makes is linked
+    to the monitor's detection of the incident.
     """
+    with tracer.span("notifier.handle_incident", parent=incident.get("trace_parent") or None, attributes={
+        "incident.id": incident["incident_id"],
+        "incident.status": incident.get("incident_status", ""),
+        "escalation.status": incident.get("escalation_status", ""),
+    }):
+        _handle_incident(incident)
+
+
+def _handle_incident(incident):
     incident_id = incident["incident_id"]
     thread_ts = incident.get("slack_message_thread_ts")
     updated_at = datetime.fromisoformat(incident["last_incident_update_time"])
-    escalation_status = incident.get("escalation_status")
     incident_status = incident.get("incident_status")
-    current_time = datetime.now(timezone.utc)
-    current_time_to_acknowledge = (current_time - updated_at).seconds
+    current_time = clock.utcnow()
+    # The monitor keeps the GitHub record current (status and latest update) from the summary deltas
     github_incident = get_record_by_id(incident_id, GITHUB_TABLE_NAME)
     github_incident_id = github_incident["incident_id"]
-    last_update = get_latest_incident_update(github_incident_id)
-
-    if last_update:
-        update_id = last_update["id"]
-        update_message = last_update["body"]
-        update_status = last_update["status"]
-        if update_id != github_incident['last_update_id']:
-            update_table_attribute(incident_id=incident['incident_id'], attribute_name="last_update_id", attribute_value=update_id, update_table_name=GITHUB_TABLE_NAME)
-            if thread_ts:
-                post_to_slack(text=f"new gitlab update:\n{update_message}", thread_ts=thread_ts)
-            if update_status != github_incident['github_status'].lower():
-                update_table_attribute(incident_id=incident['incident_id'], attribute_name="github_status", attribute_value=update_status, update_table_name=GITHUB_TABLE_NAME)
-                if update_status in ["resolved", "postmortem"]:
-                    update_table_attribute(incident_id=incident['incident_id'], attribute_name="incident_status", attribute_value="update_status", update_table_name=CYBERARK_TABLE_NAME)
+    update_id = github_incident.get("last_update_id")
+    new_update = bool(update_id) and update_id != incident.get("notified_update_id")
+
+    if github_incident["github_status"].lower() in CLOSED_GITHUB_STATUSES:
+        close_incident(incident, github_incident, thread_ts)
+        return
+
+    policy = incident_policy(incident, github_incident)
+    channel = incident_channel(incident, policy)
 
     if incident['incident_status'] == "new":
-        result = get_user_id_by_nickname(DEVOPS_ON_CALL)
         # component without existing incident on GitHub
         if 'cyberark' in github_incident_id:
             subject = f'Incident ID: {incident["incident_id"]}, Component {github_incident["name"]} in Github is currently in status {github_incident["status"]} with no active Github Incident. Impact: {github_incident["impact"]}'
         else:
             subject = f'New Github Incident, ID: {incident["incident_id"]}  Name: {github_incident["name"]} was detected. Impact: {github_incident["impact"]}'
-        text = f"Incident {incident['incident_id']} needs attention. <@{result['user_id']}>"
-        slack_response = post_to_slack(text=text, subject=subject, incident_id=incident['incident_id'])
-        update_table_attribute(incident_id=incident['incident_id'], attribute_name="incident_status", attribute_value="published_to_slack", update_table_name=CYBERARK_TABLE_NAME)
-        update_table_attribute(incident_id=incident['incident_id'], attribute_name="last_incident_update_time", attribute_value=current_time.isoformat(), update_table_name=CYBERARK_TABLE_NAME)
-
-        incident["incident_status"] = "published_to_slack"
-        incident["slack_message_thread_ts"] = slack_response['ts']
-        thread_ts = slack_response['ts']
+        text = f"Incident {incident['incident_id']} needs attention. {mention(policy.tiers[0])}"
+        slack_response = post_to_slack(text=text, subject=subject, channel=channel)
+        if slack_response:
+            # The reply's response carries the parent message ts as thread_ts
+            thread_ts = slack_response.get("message", {}).get("thread_ts") or slack_response['ts']
+            notified_at = clock.utcnow().isoformat()
+            update_escalation_record(
+                incident,
+                incident_status="published_to_slack",
+                last_incident_update_time=current_time.isoformat(),
+                slack_message_thread_ts=thread_ts,
+                notified_at=notified_at,
+                routing_policy=policy.name,
+                slack_channel=channel,
+            )
+            record_latency(incident, github_incident, notified_at, WRITE_TO_SLACK, GITHUB_TO_SLACK)
+        else:
+            # Publishing is retried next cycle; escalation timers keep running meanwhile
+            logger.warning(f"Could not publish incident {incident_id} to Slack.")
 
     if thread_ts:
-        if last_update:
-            if update_id != github_incident['last_update_id']:
-                post_to_slack(text=f"new gitlab update:\n{update_message}", thread_ts=thread_ts)
-        if check_reaction_on_slack(thread_ts):
-            update_table_attribute(incident_id, "acknowledged", "incident_status", update_table_name=CYBERARK_TABLE_NAME)
-            update_table_attribute(incident_id, datetime.now(timezone.utc).isoformat(), "acknowledgment_time", update_table_name=CYBERARK_TABLE_NAME)
-            update_table_attribute(incident_id, datetime.now(timezone.utc).isoformat(), "last_incident_update_time", update_table_name=CYBERARK_TABLE_NAME)
+        if new_update:
+            post_to_slack(text=f"new gitlab update:\n{github_incident['last_update_body']}", thread_ts=thread_ts, channel=channel)
+            update_escalation_record(incident, notified_update_id=update_id)
+        if check_reaction_on_slack(thread_ts, channel):
+            acknowledged_at = clock.utcnow().isoformat()
+            update_escalation_record(
+                incident,
+                incident_status="acknowledged",
+                acknowledgment_time=acknowledged_at,
+                last_incident_update_time=acknowledged_at,
+            )
+            latency.record(SLACK_TO_ACK, seconds_between(incident.get("notified_at"), acknowledged_at))
             return
 
-    acknowledge_time_exceeded = current_time_to_acknowledge > TIME_TO_ACKNOWLEDGE
-    time_to_next_escalation_exceeded = (current_time - updated_at).seconds > TIME_TO_CANCEL_NEXT_ESCALATION
-    # if TEST_FLOW == "true":
-    #     time_to_next_escalation_exceeded = True
-    #     acknowledge_time_exceeded = True
-    if incident_status in ['new', 'published_to_slack'] and escalation_status == "Pending" and acknowledge_time_exceeded:
-        # Escalate to DevOps Manager
-        update_table_attribute(incident_id=incident['incident_id'], attribute_name="escalation_status", attribute_value="devops_escalation", update_table_name=CYBERARK_TABLE_NAME)
-        update_table_attribute(incident_id=incident['incident_id'], attribute_name="last_escalation_update_time", attribute_value=current_time.isoformat(), update_table_name=CYBERARK_TABLE_NAME)
-        ts = incident['slack_message_thread_ts']
-        escalate_to_next_tier(incident)
-        incident["escalation_status"] = "devops_escalation"
-
-    if incident["escalation_status"] == "devops_escalation" and time_to_next_escalation_exceeded:
-        # Escalate to R&D Director
-        update_table_attribute(incident_id=incident['incident_id'], attribute_name="escalation_status", attribute_value="director_escalation", update_table_name=CYBERARK_TABLE_NAME)
-        update_table_attribute(incident_id=incident['incident_id'],attribute_name="last_escalation_update_time", attribute_value=current_time.isoformat(), update_table_name=CYBERARK_TABLE_NAME)
-        ts = incident['slack_message_thread_ts']
-        escalate_to_next_tier(incident)
-        incident["escalation_status"] = "director_escalation"
+    current_tier = policy.tier_index(incident.get("escalation_status"))
+    if current_tier is None:
+        logger.warning(f"Incident {incident_id} is at {incident.get('escalation_status')}, which policy {policy.name} has no tier for; not escalating.")
+        return
+    if current_tier == 0 and incident_status not in ['new', 'published_to_slack']:
+        return
+    # Page every tier whose deadline has passed, in order; each is recorded first, so a concurrent writer cannot page twice
+    for tier in policy.tiers[current_tier + 1:policy.due_tier((current_time - updated_at).total_seconds()) + 1]:
+        update_escalation_record(incident, escalation_status=tier.escalation_status, last_escalation_update_time=current_time.isoformat())
+        escalate_to_next_tier(incident, tier, channel)
+        record_latency(incident, github_incident, clock.utcnow().isoformat(),
+                       WRITE_TO_PAGE.format(tier=tier.name), GITHUB_TO_PAGE.format(tier=tier.name))
+
+
+def record_latency(incident, github_incident, reached_at, from_write, from_github):
+    """
+    Record how long an incident took to reach a stage (Slack, a page), from the monitor's write of its
+    escalation record and from its creation on GitHub.
+
+    The GitHub interval is skipped for faulty components without a GitHub incident.
+    """
+    latency.record(from_write, seconds_between(incident.get("created_at"), reached_at))
+    if 'cyberark' not in github_incident["incident_id"]:
+        latency.record(from_github, seconds_between(github_incident.get("created_at"), reached_at))
+
+
+class Digest:
+    """
+    An open digest: incidents of one routing policy published in one Slack thread and escalated together.
+
+    Its members' escalation records carry its id (digest_id) and are kept in the same state.
+    """
+    __slots__ = ("digest_id", "policy_name", "thread_ts", "channel", "incident_status", "escalation_status",
+                 "published_at", "newest_created_at")
+
+    def __init__(self, digest_id, policy_name, thread_ts, channel, incident_status, escalation_status, published_at,
+                 newest_created_at):
+        self.digest_id = digest_id
+        self.policy_name = policy_name
+        self.thread_ts = thread_ts
+        self.channel = channel
+        self.incident_status = incident_status
+        self.escalation_status = escalation_status
+        self.published_at = published_at
+        self.newest_created_at = newest_created_at
+
+    @classmethod
+    def from_members(cls, members):
+        anchor = members[0]
+        return cls(anchor["digest_id"], anchor["routing_policy"], anchor["slack_message_thread_ts"], anchor["slack_channel"],
+                   anchor["incident_status"], anchor["escalation_status"], anchor["last_incident_update_time"],
+                   max(member.get("created_at") or "" for member in members))
+
+    def accepts(self, now):
+        """
+        Returns:
+            bool: Whether new incidents join the digest (its newest incident is less than DIGEST_WINDOW seconds old at now).
+        """
+        age = seconds_between(self.newest_created_at, now)
+        return age is not None and age < DIGEST_WINDOW
+
+
+# Open digests by routing policy (rebuilt on every full scan of the open incidents), and when each last posted a follow-up
+open_digests = {}
+digest_updates = {}
+
+
+def digest_line(github_incident):
+    """
+    Describe an incident in one line of a digest message.
+    """
+    if 'cyberark' in github_incident["incident_id"]:
+        return f"Component {github_incident['name']} is {github_incident['status']} with no active Github Incident"
+    return f"{github_incident['name']} ({github_incident['impact']}, {github_incident['status']}), ID: {github_incident['incident_id']}"
+
+
+def digest_text(lines):
+    if len(lines) > DIGEST_MAX_LINES:
+        lines = lines[:DIGEST_MAX_LINES] + [f"… and {len(lines) - DIGEST_MAX_LINES} more"]
+    return "\n".join(lines)
+
+
+def process_incidents(incidents, complete=True):
+    """
+    Handle open incidents: each digest and each burst of new incidents as a whole, the others one by one.
+
+    Args:
+        incidents (list[EscalationRecord]): The incidents to handle.
+        complete (bool): Whether incidents are all the open incidents (a full scan). A batch of changes
+            leaves digest members to the next full scan, which handles every digest as a whole.
+    """
+    if DIGEST_THRESHOLD <= 0:
+        for incident in incidents:
+            process_incident(incident)
+        schedule_detail_refresh(incidents, complete)
+        return
+    digests, new_incidents, others = {}, [], []
+    for incident in incidents:
+        if incident.get("digest_id"):
+            digests.setdefault(incident["digest_id"], []).append(incident)
+        elif incident.get("incident_status") == "new":
+            new_incidents.append(incident)
+        else:
+            others.append(incident)
+    if complete:
+        open_digests.clear()
+        for members in sorted(digests.values(), key=lambda members: max(member.get("created_at") or "" for member in members)):
+            open_digests[members[0]["routing_policy"]] = Digest.from_members(members)
+        for digest_id, members in digests.items():
+            if not process_digest(members):
+                digest_updates.pop(digest_id, None)
+                for policy_name, digest in list(open_digests.items()):
+                    if digest.digest_id == digest_id:
+                        del open_digests[policy_name]
+    for incident in others:
+        process_incident(incident)
+    if new_incidents:
+        route_new_incidents(new_incidents)
+    schedule_detail_refresh(incidents, complete)
+
+
+def route_new_incidents(incidents):
+    """
+    Publish new incidents: into the open digest of their routing policy, into a new digest when
+    DIGEST_THRESHOLD or more of them arrive together, or else one by one.
+    """
+    by_policy = {}
+    for incident in incidents:
+        github_incident = get_record_by_id(incident["incident_id"], GITHUB_TABLE_NAME)
+        if github_incident is None:
+            process_incident(incident)
+            continue
+        policy = incident_policy(incident, github_incident)
+        by_policy.setdefault(policy.name, (policy, []))[1].append((incident, github_incident))
+    now = clock.utcnow().isoformat()
+    for policy, entries in by_policy.values():
+        digest = open_digests.get(policy.name)
+        if digest is not None and digest.accepts(now):
+            join_digest(digest, leased_and_open(entries))
+        elif len(entries) >= DIGEST_THRESHOLD:
+            open_digest(policy, leased_and_open(entries))
+        else:
+            for incident, _ in entries:
+                process_incident(incident)
+
+
+def leased_and_open(entries):
+    """
+    Lease new incidents; those GitHub already closed are closed without being published.
+
+    Returns:
+        list[tuple]: The (incident, github_incident) pairs leased by this replica and still open.
+    """
+    remaining = []
+    for incident, github_incident in entries:
+        if not acquire_lease(incident):
+            continue
+        if github_incident["github_status"].lower() in CLOSED_GITHUB_STATUSES:
+            try:
+                close_incident(incident, github_incident, None)
+            except StaleRecordError as e:
+                logger.warning(f"Skipping incident until next cycle: {e}")
+            continue
+        remaining.append((incident, github_incident))
+    return remaining
+
+
+def open_digest(policy, entries):
+    """
+    Publish new incidents together in a new digest thread.
+    """
+    if not entries:
+        return
+    channel = incident_channel(entries[0][0], policy)
+    subject = f"🚨 Broad Github outage: {len(entries)} incidents and components affected. They are handled together in this thread."
+    text = digest_text([f"• {digest_line(github_incident)}" for _, github_incident in entries])
+    slack_response = post_to_slack(text=f"{text}\nThey need attention. {mention(policy.tiers[0])}", subject=subject, channel=channel)
+    if not slack_response:
+        logger.warning(f"Could not publish a digest of {len(entries)} incidents to Slack.")
+        return
+    thread_ts = slack_response.get("message", {}).get("thread_ts") or slack_response['ts']
+    published_at = clock.utcnow().isoformat()
+    digest_id = entries[0][0]["incident_id"]
+    for incident, github_incident in entries:
+        try:
+            update_escalation_record(
+                incident,
+                incident_status="published_to_slack",
+                last_incident_update_time=published_at,
+                slack_message_thread_ts=thread_ts,
+                notified_at=published_at,
+                notified_update_id=github_incident.get("last_update_id") or "",
+                routing_policy=policy.name,
+                slack_channel=channel,
+                digest_id=digest_id,
+            )
+        except StaleRecordError as e:
+            logger.warning(f"Incident {incident['incident_id']} was not added to digest {digest_id}: {e}")
+            continue
+        record_latency(incident, github_incident, published_at, WRITE_TO_SLACK, GITHUB_TO_SLACK)
+    open_digests[policy.name] = Digest(digest_id, policy.name, thread_ts, channel, "published_to_slack", entries[0][0]["escalation_status"],
+                                       published_at, max(incident.get("created_at") or "" for incident, _ in entries))
+    digest_updates[digest_id] = clock.now()
+    logger.info(f"Published digest {digest_id} of {len(entries)} incidents.")
+
+
+def join_digest(digest, entries):
+    """
+    Add new incidents to an open digest, in its current state; they are announced by its next follow-up.
+    """
+    for incident, _ in entries:
+        try:
+            update_escalation_record(
+                incident,
+                incident_status=digest.incident_status,
+                escalation_status=digest.escalation_status,
+                last_incident_update_time=digest.published_at,
+                slack_message_thread_ts=digest.thread_ts,
+                routing_policy=digest.policy_name,
+                slack_channel=digest.channel,
+                digest_id=digest.digest_id,
+            )
+        except StaleRecordError as e:
+            logger.warning(f"Incident {incident['incident_id']} was not added to digest {digest.digest_id}: {e}")
+            continue
+        digest.newest_created_at = max(digest.newest_created_at, incident.get("created_at") or "")
+        logger.info(f"Incident {incident['incident_id']} joined digest {digest.digest_id}.")
+
+
+def process_digest(members):
+    """
+    Handle the open incidents of one digest as a whole.
+
+    Returns:
+        bool: False once every incident of the digest is closed.
+    """
+    digest_id = members[0]["digest_id"]
+    members = sorted(members, key=lambda member: (member["incident_id"] != digest_id, member["incident_id"]))
+    # The replica that leases the first member handles the whole digest, so a digest is never notified twice
+    if not acquire_lease(members[0]):
+        return True
+    members = [members[0]] + [member for member in members[1:] if acquire_lease(member)]
+    with tracer.span("notifier.handle_digest", parent=members[0].get("trace_parent") or None, attributes={
+        "digest.id": digest_id, "digest.size": len(members),
+    }):
+        try:
+            return _process_digest(digest_id, members)
+        except StaleRecordError as e:
+            logger.warning(f"Skipping digest {digest_id} until next cycle: {e}")
+        except Exception as e:
+            logger.error(f"Failed to handle digest {digest_id}: {e}")
+        return True
+
+
+def _process_digest(digest_id, members):
+    policy = incident_policy(members[0])
+    channel = incident_channel(members[0], policy)
+    thread_ts = members[0]["slack_message_thread_ts"]
+    entries = [(member, get_record_by_id(member["incident_id"], GITHUB_TABLE_NAME)) for member in members]
+    entries = [(member, github_incident) for member, github_incident in entries if github_incident is not None]
+    closed = [entry for entry in entries if entry[1]["github_status"].lower() in CLOSED_GITHUB_STATUSES]
+    open_entries = [entry for entry in entries if entry[1]["github_status"].lower() not in CLOSED_GITHUB_STATUSES]
+    joined = [entry for entry in open_entries if not entry[0].get("notified_at")]
+    updated = [(member, github_incident) for member, github_incident in open_entries if member.get("notified_at")
+               and github_incident.get("last_update_id") and github_incident["last_update_id"] != member.get("notified_update_id")]
+
+    # Follow-ups (new members, GitHub updates, closures) are batched into one message per DIGEST_UPDATE_INTERVAL
+    last_update = digest_updates.get(digest_id)
+    if (joined or updated or closed) and (last_update is None or clock.now() - last_update >= DIGEST_UPDATE_INTERVAL):
+        lines = [f"➕ {digest_line(github_incident)}" for _, github_incident in joined]
+        lines += [f"🔄 {github_incident['name']}: {github_incident['last_update_body']}" for _, github_incident in updated]
+        lines += [f"✅ {github_incident['name']} is {github_incident['github_status']} on GitHub." for _, github_incident in closed]
+        if post_to_slack(text=digest_text(lines), thread_ts=thread_ts, channel=channel):
+            digest_updates[digest_id] = clock.now()
+            notified_at = clock.utcnow().isoformat()
+            for member, github_incident in joined:
+                update_escalation_record(member, notified_at=notified_at, notified_update_id=github_incident.get("last_update_id") or "")
+                record_latency(member, github_incident, notified_at, WRITE_TO_SLACK, GITHUB_TO_SLACK)
+            for member, github_incident in updated:
+                update_escalation_record(member, notified_update_id=github_incident["last_update_id"])
+            for member, github_incident in closed:
+                update_escalation_record(member, incident_status=RESOLVED, notified_update_id=github_incident.get("last_update_id") or "",
+                                         last_incident_update_time=notified_at, **closing_attributes(clock.now()))
+            closed = []
+    if not open_entries:
+        return bool(closed)
+
+    # Acknowledgment and escalation follow the digest's shared state: one reaction check, one notification per tier
+    lead = open_entries[0][0]
+    if lead["incident_status"] == "acknowledged":
+        return True
+    if check_reaction_on_slack(thread_ts, channel):
+        acknowledged_at = clock.utcnow().isoformat()
+        for member, _ in open_entries:
+            update_escalation_record(member, incident_status="acknowledged", acknowledgment_time=acknowledged_at,
+                                     last_incident_update_time=acknowledged_at)
+            latency.record(SLACK_TO_ACK, seconds_between(member.get("notified_at"), acknowledged_at))
+        return True
+    current_tier = policy.tier_index(lead.get("escalation_status"))
+    if current_tier is None:
+        logger.warning(f"Digest {digest_id} is at {lead.get('escalation_status')}, which policy {policy.name} has no tier for; not escalating.")
+        return True
+    if current_tier == 0 and lead["incident_status"] not in ['new', 'published_to_slack']:
+        return True
+    elapsed = seconds_between(lead["last_incident_update_time"], clock.utcnow().isoformat()) or 0
+    for tier in policy.tiers[current_tier + 1:policy.due_tier(elapsed) + 1]:
+        escalated_at = clock.utcnow().isoformat()
+        for member, _ in open_entries:
+            update_escalation_record(member, escalation_status=tier.escalation_status, last_escalation_update_time=escalated_at)
+        escalate_to_next_tier(lead, tier, channel, digest_size=len(open_entries))
+        paged_at = clock.utcnow().isoformat()
+        for member, github_incident in open_entries:
+            record_latency(member, github_incident, paged_at, WRITE_TO_PAGE.format(tier=tier.name), GITHUB_TO_PAGE.format(tier=tier.name))
+    return True
+
+
+def process_incident(incident):
+    """
+    Lease an incident and handle it; failures are logged and left for the next cycle or change.
+    """
+    if not acquire_lease(incident):
+        return
+    try:
+        handle_incident(incident)
+    except StaleRecordError as e:
+        logger.warning(f"Skipping incident until next cycle: {e}")
+    except Exception as e:
+        logger.error(f"Failed to handle incident {incident['incident_id']}: {e}")
+
+
+def changed_incident_ids(events):
+    """
+    Pick the incidents that need handling from a batch of change events.
+
+    Only the monitor's writes are acted on: new escalation records (CyberArk INSERT) and changes to
+    GitHub records (new updates, resolution). The notifier's own writes to the CyberArk table
+    (leases, escalation progress) are ignored, otherwise every handled incident would trigger itself again.
+
+    Returns:
+        list[str]: Incident ids in order of first appearance, without duplicates.
+    """
+    incident_ids = {}
+    for event in events:
+        if (event.table_name == CYBERARK_TABLE_NAME and event.event_name == INSERT) or \
+                (event.table_name == GITHUB_TABLE_NAME and event.event_name == MODIFY):
+            incident_ids.setdefault(event.incident_id, None)
+    return list(incident_ids)
+
+
+def handle_changes(events):
+    """
+    Handle every incident the monitor created or updated in a batch of change events.
+    """
+    incidents = []
+    for incident_id in changed_incident_ids(events):
+        try:
+            incident = get_escalation_record(incident_id)
+        except Exception as e:
+            logger.error(f"Failed to read escalation record {incident_id}: {e}")
+            continue
+        if incident is None or incident.incident_status == RESOLVED:
+            continue
+        incidents.append(incident)
+    process_incidents(incidents, complete=False)
+
+
+def detail_priority(incident):
+    """
+    Rank an incident for the detail refresh budget: the higher its escalation tier the sooner it is refreshed,
+    acknowledged incidents last.
+    """
+    if incident.get("incident_status") == "acknowledged":
+        return 0
+    return 1 + (incident_policy(incident).tier_index(incident.get("escalation_status")) or 0)
+
+
+def schedule_detail_refresh(incidents, complete=True):
+    """
+    Track the GitHub incidents this replica holds for the detail refresh (after they were leased and handled).
+
+    A new incident, or one whose status or escalation changed since it was last seen, is refreshed right away.
+
+    Args:
+        complete (bool): Whether incidents are all the open incidents (a full scan: the others are dropped) or
+            a batch of changes (only the batch's incidents are added, updated or dropped).
+    """
+    if DETAIL_REQUESTS_PER_MINUTE <= 0:
+        return
+    github_incidents = [incident for incident in incidents if 'cyberark' not in incident["incident_id"]]
+    held = {
+        incident["incident_id"]: (detail_priority(incident), (incident.get("incident_status"), incident.get("escalation_status")))
+        for incident in github_incidents
+        if incident.get("lease_owner") == NOTIFIER_ID and incident.get("incident_status") != RESOLVED
+    }
+    if complete:
+        detail_scheduler.sync(held)
+        return
+    detail_scheduler.track(held)
+    for incident in github_incidents:
+        if incident["incident_id"] not in held:
+            detail_scheduler.forget(incident["incident_id"])
+
+
+def fetch_incident_detail(incident_id):
+    """
+    Fetch an incident's own JSON from githubstatus.com, through the GitHub circuit breaker.
+
+    Returns:
+        Incident: The incident as GitHub reports it now.
+
+    Raises:
+        requests.exceptions.RequestException: If the request failed (or was skipped because the circuit is open).
+    """
+    url = f"{STATUSPAGE_URL}{DETAIL_PATH.format(incident_id=incident_id)}"
+    with tracer.span("github.incident_detail", kind=CLIENT, attributes={"http.method": "GET", "http.url": url}):
+        try:
+            detail = github_breaker.call(_get_incident_detail, url, is_failure=is_http_failure)
+        except CircuitOpenError as open_error:
+            raise requests.exceptions.ConnectionError(str(open_error))
+    return Incident.from_statuspage(detail.get("incident", detail))
+
+
+def _get_incident_detail(url):
+    response = requests.get(url, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def refresh_incident_detail(incident_id):
+    """
+    Fetch an incident's detail and write what changed on GitHub to its record in the GitHub table.
+
+    The write is conditional on the record's updated_at, so a concurrent (newer) write by the monitor is kept.
+
+    Returns:
+        bool: Whether the incident changed on GitHub since its record was written.
+    """
+    detail = fetch_incident_detail(incident_id)
+    item = storage.get(GITHUB_TABLE_NAME, incident_id)
+    if item is None:
+        return False
+    stored = Incident.from_item(item)
+    newer_by = seconds_between(stored["updated_at"], detail["updated_at"])
+    if newer_by is None or newer_by <= 0:
+        return False
+    changes = {field: detail[field] for field in DETAIL_FIELDS if detail[field] != stored[field]}
+    if not changes:
+        return False
+    if detail["github_status"].lower() in CLOSED_GITHUB_STATUSES and stored["github_status"].lower() not in CLOSED_GITHUB_STATUSES:
+        # Closed on GitHub's side: schedule archiving and expiry of the record, as the monitor does
+        changes.update(closing_attributes(clock.now()))
+    try:
+        storage.update(GITHUB_TABLE_NAME, incident_id, {name: Incident.encode_field(name, value) for name, value in changes.items()},
+                       condition=Equals("updated_at", item["updated_at"]))
+    except ConditionFailed:
+        logger.debug(f"Incident {incident_id} was updated while its detail was fetched.")
+        return True
+    logger.info(f"Incident {incident_id} changed on GitHub: {sorted(changes)}")
+    return True
+
+
+def refresh_due_details():
+    """
+    Refresh the details that are due within the request budget.
+
+    Returns:
+        list[str]: Ids of the incidents that changed on GitHub.
+    """
+    changed_ids = []
+    for incident_id in detail_scheduler.due():
+        try:
+            changed = refresh_incident_detail(incident_id)
+        except requests.exceptions.HTTPError as http_error:
+            if http_error.response is not None and http_error.response.status_code == 404:
+                logger.warning(f"Incident {incident_id} is not on githubstatus.com; no longer refreshing it.")
+                detail_scheduler.forget(incident_id)
+                continue
+            logger.warning(f"Failed to refresh incident {incident_id}: {http_error}")
+            changed = False
+        except (requests.exceptions.RequestException, ValueError, KeyError) as refresh_error:
+            logger.warning(f"Failed to refresh incident {incident_id}: {refresh_error}")
+            changed = False
+        detail_scheduler.record(incident_id, changed)
+        if changed:
+            changed_ids.append(incident_id)
+    if changed_ids:
+        details_changed.set()
+    return changed_ids
+
+
+def detail_refresh_loop():
+    """
+    Background loop of the detail refresh (see DETAIL_REQUESTS_PER_MINUTE).
+    """
+    while not shutdown_event.is_set():
+        try:
+            refresh_due_details()
+        except Exception as e:
+            logger.error(f"Detail refresh failed: {e}")
+        shutdown_event.wait(DETAIL_REFRESH_TICK)
+
+
+# On-demand profiling of notifier cycles (SIGUSR1); cumulative times are exported as profiled_function_* metrics
+profiler = CycleProfiler("notifier", functions=(
+    "get_incidents", "handle_incident", "process_digest", "refresh_incident_detail", "post_to_slack", "check_reaction_on_slack", "escalate_to_next_tier",
+))
 
 
 def notifier_service():
     """
     Main notifier service logic:
     - Fetch incidents with pending escalation stages.
+    - Lease each one so only one notifier replica handles it.
     - Handle escalations and notify the appropriate people.
     """
-    logger.info("Starting Notifier Service...")
+    logger.info(f"Starting Notifier Service {NOTIFIER_ID}...")
     while not shutdown_event.is_set():
         try:
-            incidents = get_incidents()
-            for incident in incidents:
-                handle_incident(incident)
-            time.sleep(CHECK_INTERVAL)  # Wait before the next check
+            with profiler.cycle():
+                process_incidents(get_incidents())
         except Exception as e:
             logger.error(f"Unexpected error in notifier service: {e}")
+        latency.maybe_report(clock.now())
+        # Wait before the next check, or until a detail refresh finds an incident changed on GitHub
+        if clock.wait(details_changed, CHECK_INTERVAL):
+            details_changed.clear()
+
+
+def notifier_event_service(feed, max_reconciles=None, reader_slots=None):
+    """
+    Event-driven notifier: handle incidents as the monitor writes them, read from a change feed.
+
+    Every RECONCILE_INTERVAL seconds all open incidents are rescanned, which catches changes missed
+    while the feed was unavailable and lets time-based escalations fire without a new change.
+
+    Args:
+        feed: A change feed (DynamoDBStreamFeed, or LocalChangeFeed in tests).
+        max_reconciles (int, optional): Stop after this many reconciliations (used by tests).
+        reader_slots (ReaderSlots, optional): Caps the replicas reading the feed; a replica without a
+            slot stands by (handling nothing) until one is free, then reconciles and reads.
+    """
+    logger.info(f"Starting Notifier Service {NOTIFIER_ID} on the change feed...")
+    reconciles = 0
+    next_reconcile = 0
+    next_slot_renewal = 0
+    while not shutdown_event.is_set():
+        if reader_slots is not None and time.monotonic() >= next_slot_renewal:
+            reading = reader_slots.slot is not None
+            if not reader_slots.acquire():
+                if reading:
+                    logger.info("Standing by: no stream reader slot is free.")
+                shutdown_event.wait(reader_slots.lease_seconds / 3)
+                continue
+            if not reading:
+                next_reconcile = 0  # Changes made while standing by were not read
+            next_slot_renewal = time.monotonic() + reader_slots.lease_seconds / 3  # Leases expire in real time
+        if clock.monotonic() >= next_reconcile:
+            if max_reconciles is not None and reconciles >= max_reconciles:
+                break
+            try:
+                with profiler.cycle():
+                    process_incidents(get_incidents())
+            except Exception as e:
+                logger.error(f"Reconciliation failed: {e}")
+            reconciles += 1
+            next_reconcile = clock.monotonic() + RECONCILE_INTERVAL
+            latency.maybe_report(clock.now())
+        try:
+            events = feed.poll(timeout=max(0.0, min(1.0, clock.to_real(next_reconcile - clock.monotonic()))))
+            if events:
+                with profiler.cycle():
+                    handle_changes(events)
+        except Exception as e:
+            logger.error(f"Failed to read the change feed: {e}")
+            shutdown_event.wait(1)
+    feed.close()
+    if reader_slots is not None:
+        reader_slots.release()
 
 
 if __name__ == "__main__":
-    secrets = get_secrets()
-    SLACK_API_TOKEN = secrets.get("slack_app_bot_token")
-    DIRECTOR_PHONE = secrets.get("director_phone")
-    DIRECTOR_NICKNAME = secrets.get("director_nickname")
-    DEVOPS_MANAGER_PHONE = secrets.get("devops_manager_phone")
-    DEVOPS_MANAGER_NICKNAME = secrets.get("devops_manager_nickname")
+    startup = StartupTimer()
+    with startup.phase("warm_clients_and_secrets"):
+        with ThreadPoolExecutor(max_workers=2) as startup_executor:
+            warm_futures = [
+                startup_executor.submit(storage.warm, (CYBERARK_TABLE_NAME, GITHUB_TABLE_NAME)),
+                startup_executor.submit(aws.warm, "sns"),
+            ]
+            SECRETS.load()  # One BatchGetSecretValue call, which also sets SLACK_API_TOKEN
+            for warm_future in warm_futures:
+                warm_future.result()
+    startup.report("notifier")
+    start_http_server(METRICS_PORT)
+    install_signal_handler(profiler)
+
+    SECRETS.start()
+    if DETAIL_REQUESTS_PER_MINUTE > 0 and not isinstance(clock, ScaledClock):
+        threading.Thread(target=detail_refresh_loop, name="detail-refresh", daemon=True).start()
+    else:
+        # A replay's incidents are recorded; their live details would close them early
+        logger.info("GitHub incident detail refresh is disabled.")
     SLACK_CHANNEL = TEST_CHANNEL if TEST_FLOW else PROD_CHANNEL
 
-    notifier_service()
+    if NOTIFIER_MODE == "stream" and not isinstance(storage, DynamoDBStore):
+        logger.warning("NOTIFIER_MODE=stream needs DynamoDB Streams; polling the SQLite tables instead.")
+        notifier_service()
+    elif NOTIFIER_MODE == "stream":
+        notifier_event_service(DynamoDBStreamFeed.for_tables(aws, (CYBERARK_TABLE_NAME, GITHUB_TABLE_NAME)),
+                               reader_slots=ReaderSlots(storage, LEASE_TABLE_NAME, NOTIFIER_ID))
+    else:
+        notifier_service()
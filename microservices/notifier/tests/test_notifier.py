@@ -0,0 +1,624 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+from botocore.exceptions import ClientError
+
+from common.clock import ScaledClock
+from common.change_feed import ChangeEvent, DynamoDBStreamFeed, LocalChangeFeed, ReaderSlots
+from common.incident_model import EscalationRecord, encode_attribute
+from common.routing import RoutingPolicies
+from common.tracing import Tracer, current_span
+from common.storage import DynamoDBStore, SqliteStore
+from microservices.notifier import app as notifier
+
+
+def conditional_check_failed(operation="UpdateItem"):
+    return ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, operation)
+
+
+class TestLeasesAndVersions(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_aws = MagicMock()
+        patcher = patch.object(notifier, "storage", DynamoDBStore(self.mock_aws))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_record(self, **fields):
+        defaults = {
+            "incident_id": "abc123",
+            "internal_incident_id": "cyberark-1",
+            "last_escalation_update_time": "2024-11-23T12:00:00+00:00",
+            "last_incident_update_time": "2024-11-23T12:00:00+00:00",
+            "created_at": "2024-11-23T12:00:00+00:00",
+        }
+        defaults.update(fields)
+        return EscalationRecord(**defaults)
+
+    def test_acquire_lease_sets_owner_and_expiry(self):
+        mock_aws = self.mock_aws
+        record = self.make_record()
+
+        self.assertTrue(notifier.acquire_lease(record))
+
+        kwargs = mock_aws.table.return_value.update_item.call_args.kwargs
+        self.assertEqual(kwargs["ConditionExpression"], "attribute_not_exists(#a0) OR #a0 = :c0 OR #a0 = :c1 OR #a1 < :c2")
+        self.assertEqual(kwargs["ExpressionAttributeNames"], {"#a0": "lease_owner", "#a1": "lease_expires_at"})
+        self.assertEqual(kwargs["ExpressionAttributeValues"][":c0"], notifier.NOTIFIER_ID)
+        self.assertEqual(record.lease_owner, notifier.NOTIFIER_ID)
+        self.assertGreater(record.lease_expires_at, time.time())
+
+    def test_acquire_lease_held_elsewhere(self):
+        mock_aws = self.mock_aws
+        mock_aws.table.return_value.update_item.side_effect = conditional_check_failed()
+        record = self.make_record()
+
+        self.assertFalse(notifier.acquire_lease(record))
+        self.assertEqual(record.lease_owner, "")
+
+    def test_versioned_update_bumps_version(self):
+        mock_aws = self.mock_aws
+        record = self.make_record(version=3)
+
+        notifier.update_escalation_record(record, incident_status="acknowledged", acknowledgment_time="now")
+
+        kwargs = mock_aws.table.return_value.update_item.call_args.kwargs
+        self.assertEqual(kwargs["ConditionExpression"], "#a2 = :c0")
+        self.assertEqual(kwargs["ExpressionAttributeNames"]["#a2"], "version")
+        self.assertEqual(kwargs["ExpressionAttributeValues"][":c0"], 3)
+        self.assertEqual(kwargs["ExpressionAttributeValues"][":v2"], 4)
+        self.assertEqual(record.version, 4)
+        self.assertEqual(record.incident_status, "acknowledged")
+
+    def test_versioned_update_detects_concurrent_change(self):
+        mock_aws = self.mock_aws
+        mock_aws.table.return_value.update_item.side_effect = conditional_check_failed()
+        record = self.make_record(version=3)
+
+        with self.assertRaises(notifier.StaleRecordError):
+            notifier.update_escalation_record(record, escalation_status="devops_escalation")
+        self.assertEqual(record.version, 3)
+        self.assertEqual(record.escalation_status, "Pending")
+
+    def test_get_incidents_skips_live_leases_of_other_replicas(self):
+        mock_aws = self.mock_aws
+        now = time.time()
+        mock_aws.table.return_value.scan.return_value = {"Items": [
+            self.make_record(incident_id="free").to_item(),
+            self.make_record(incident_id="mine", lease_owner=notifier.NOTIFIER_ID, lease_expires_at=now + 60).to_item(),
+            self.make_record(incident_id="expired", lease_owner="other", lease_expires_at=now - 1).to_item(),
+            self.make_record(incident_id="taken", lease_owner="other", lease_expires_at=now + 60).to_item(),
+            self.make_record(incident_id="done", incident_status="Resolved").to_item(),
+        ]}
+
+        incident_ids = [incident.incident_id for incident in notifier.get_incidents()]
+
+        self.assertEqual(incident_ids, ["free", "mine", "expired"])
+
+
+class TestChangeFeed(unittest.TestCase):
+
+    def test_only_monitor_writes_trigger_handling(self):
+        events = [
+            ChangeEvent(notifier.CYBERARK_TABLE_NAME, "INSERT", "i1"),
+            ChangeEvent(notifier.GITHUB_TABLE_NAME, "INSERT", "i1"),
+            ChangeEvent(notifier.CYBERARK_TABLE_NAME, "MODIFY", "i2"),  # the notifier's own lease/escalation writes
+            ChangeEvent(notifier.GITHUB_TABLE_NAME, "MODIFY", "i3"),
+            ChangeEvent(notifier.GITHUB_TABLE_NAME, "MODIFY", "i1"),
+        ]
+        self.assertEqual(notifier.changed_incident_ids(events), ["i1", "i3"])
+
+    @patch("microservices.notifier.app.RECONCILE_INTERVAL", 0.2)
+    @patch("microservices.notifier.app.process_incident")
+    @patch("microservices.notifier.app.get_escalation_record")
+    @patch("microservices.notifier.app.get_incidents", return_value=[])
+    def test_published_change_is_handled_before_next_reconcile(self, mock_get_incidents, mock_get_record, mock_process):
+        record = EscalationRecord(incident_id="i1", internal_incident_id="cyberark-1", last_escalation_update_time="t",
+                                  last_incident_update_time="t", created_at="t")
+        mock_get_record.return_value = record
+        feed = LocalChangeFeed()
+        feed.publish(ChangeEvent(notifier.CYBERARK_TABLE_NAME, "INSERT", "i1"))
+
+        notifier.notifier_event_service(feed, max_reconciles=1)
+
+        mock_get_record.assert_called_once_with("i1")
+        mock_process.assert_called_once_with(record)
+        self.assertEqual(mock_get_incidents.call_count, 1)
+
+    def test_stream_feed_decodes_records_and_follows_iterators(self):
+        client = MagicMock()
+        client.describe_stream.return_value = {"StreamDescription": {"Shards": [
+            {"ShardId": "s-old", "SequenceNumberRange": {"StartingSequenceNumber": "1", "EndingSequenceNumber": "5"}},
+            {"ShardId": "s-open", "SequenceNumberRange": {"StartingSequenceNumber": "6"}},
+        ]}}
+        client.get_shard_iterator.return_value = {"ShardIterator": "it-1"}
+        client.get_records.return_value = {"NextShardIterator": "it-2", "Records": [{
+            "eventName": "INSERT",
+            "dynamodb": {"Keys": {"incident_id": {"S": "i1"}}, "SequenceNumber": "7",
+                         "NewImage": {"incident_id": {"S": "i1"}, "version": encode_attribute(0)}},
+        }]}
+
+        feed = DynamoDBStreamFeed(client, {"TestCyberArkIncidents": "arn:stream"})
+        events = feed.poll(timeout=0)
+
+        client.get_shard_iterator.assert_called_once_with(StreamArn="arn:stream", ShardId="s-open", ShardIteratorType="LATEST")
+        self.assertEqual([(event.table_name, event.event_name, event.incident_id) for event in events],
+                         [("TestCyberArkIncidents", "INSERT", "i1")])
+        self.assertEqual(events[0].new_image, {"incident_id": "i1", "version": 0})
+        feed.poll(timeout=0)
+        self.assertEqual(client.get_records.call_args.kwargs["ShardIterator"], "it-2")
+
+    @staticmethod
+    def stream_client(shards):
+        client = MagicMock()
+        client.describe_stream.return_value = {"StreamDescription": {"Shards": [
+            {"ShardId": shard, "SequenceNumberRange": {"StartingSequenceNumber": "1"}} for shard in shards]}}
+        client.get_shard_iterator.side_effect = lambda **kwargs: {"ShardIterator": f"it-{kwargs['ShardId']}"}
+        return client
+
+    @staticmethod
+    def records(*incident_ids):
+        return [{"eventName": "INSERT", "dynamodb": {"Keys": {"incident_id": {"S": incident_id}}, "SequenceNumber": f"seq-{incident_id}"}}
+                for incident_id in incident_ids]
+
+    def test_failed_shard_keeps_the_other_shards_events(self):
+        client = self.stream_client(["s-1", "s-2"])
+        client.get_records.side_effect = [
+            {"NextShardIterator": "it-s-1", "Records": self.records("i1")},
+            ClientError({"Error": {"Code": "InternalServerError"}}, "GetRecords"),
+        ]
+
+        events = DynamoDBStreamFeed(client, {"TestCyberArkIncidents": "arn:stream"}).poll(timeout=0)
+
+        self.assertEqual([event.incident_id for event in events], ["i1"])
+
+    def test_every_shard_failing_raises(self):
+        client = self.stream_client(["s-1"])
+        client.get_records.side_effect = ClientError({"Error": {"Code": "InternalServerError"}}, "GetRecords")
+
+        with self.assertRaises(ClientError):
+            DynamoDBStreamFeed(client, {"TestCyberArkIncidents": "arn:stream"}).poll(timeout=0)
+
+    def test_expired_iterator_resumes_after_the_last_record_read(self):
+        client = self.stream_client(["s-1"])
+        client.get_records.side_effect = [
+            {"NextShardIterator": "it-next", "Records": self.records("i1")},
+            ClientError({"Error": {"Code": "ExpiredIteratorException"}}, "GetRecords"),
+            ClientError({"Error": {"Code": "TrimmedDataAccessException"}}, "GetRecords"),
+        ]
+        feed = DynamoDBStreamFeed(client, {"TestCyberArkIncidents": "arn:stream"})
+        feed.poll(timeout=0)
+
+        self.assertEqual(feed.poll(timeout=0), [])
+        client.get_shard_iterator.assert_called_with(StreamArn="arn:stream", ShardId="s-1",
+                                                     ShardIteratorType="AFTER_SEQUENCE_NUMBER", SequenceNumber="seq-i1")
+        feed.poll(timeout=0)
+        client.get_shard_iterator.assert_called_with(StreamArn="arn:stream", ShardId="s-1", ShardIteratorType="TRIM_HORIZON")
+
+    def test_reader_slots_cap_the_stream_readers(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = SqliteStore(os.path.join(directory.name, "incidents.db"))
+        self.addCleanup(store.close)
+        readers = [ReaderSlots(store, notifier.LEASE_TABLE_NAME, f"notifier-{n}", slots=2) for n in range(3)]
+
+        self.assertEqual([slots.acquire() for slots in readers], [True, True, False])
+        self.assertEqual(store.get(notifier.LEASE_TABLE_NAME, "stream-reader-0")["lease_owner"], "notifier-0")
+        self.assertIsNone(store.get(notifier.CYBERARK_TABLE_NAME, "stream-reader-0"), "The incident tables hold only incidents.")
+        self.assertTrue(readers[0].acquire())  # Renewal
+        readers[0].release()
+        self.assertTrue(readers[2].acquire())
+        self.assertEqual(readers[2].slot, 0)
+
+    def test_replicas_read_when_the_lease_table_fails(self):
+        storage = MagicMock()
+        storage.update.side_effect = RuntimeError("ResourceNotFoundException")
+        self.assertTrue(ReaderSlots(storage, notifier.LEASE_TABLE_NAME, "notifier-0").acquire())
+
+    @patch("microservices.notifier.app.get_incidents", return_value=[])
+    def test_replica_without_a_reader_slot_stands_by(self, mock_get_incidents):
+        slots = MagicMock(slot=None, lease_seconds=0.03)
+        slots.acquire.side_effect = [False, False]
+        feed = LocalChangeFeed()
+        feed.publish(ChangeEvent(notifier.CYBERARK_TABLE_NAME, "INSERT", "i1"))
+
+        with patch.object(notifier.shutdown_event, "wait", side_effect=[False, True]), \
+                patch.object(notifier.shutdown_event, "is_set", side_effect=[False, False, True]):
+            notifier.notifier_event_service(feed, reader_slots=slots)
+
+        mock_get_incidents.assert_not_called()
+        slots.release.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+class TestSlackCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        breaker = notifier.CircuitBreaker("slack-test", minimum_calls=2, open_seconds=60)
+        patcher = patch.multiple(notifier, slack_breaker=breaker, SLACK_API_TOKEN="token", SLACK_CHANNEL="alerts")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("microservices.notifier.app.requests.post")
+    def test_slack_outage_fails_fast(self, mock_post):
+        mock_post.side_effect = notifier.requests.exceptions.ConnectTimeout("timed out")
+
+        self.assertIsNone(notifier.post_to_slack("text", thread_ts="1.0"))
+        self.assertIsNone(notifier.post_to_slack("text", thread_ts="1.0"))
+        self.assertIsNone(notifier.post_to_slack("text", thread_ts="1.0"))
+
+        self.assertEqual(mock_post.call_count, 2, "The third call should be rejected by the open circuit.")
+
+    @patch("microservices.notifier.app.send_sns_message")
+    @patch("microservices.notifier.app.requests.get")
+    @patch("microservices.notifier.app.requests.post")
+    def test_escalation_pages_while_slack_is_down(self, mock_post, mock_get, mock_sns):
+        mock_post.side_effect = mock_get.side_effect = notifier.requests.exceptions.ConnectionError("down")
+        incident = {"incident_id": "abc123", "slack_message_thread_ts": "1.0", "escalation_status": "devops_escalation"}
+
+        with patch.dict(notifier.SECRETS, devops_manager_phone="+15550100"):
+            notifier.escalate_to_next_tier(incident)
+
+        mock_sns.assert_called_once()
+        self.assertIn("<@channel>", mock_sns.call_args.args[1])
+
+
+class TestDetailRefresh(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = SqliteStore(os.path.join(directory.name, "incidents.db"))
+        self.addCleanup(self.store.close)
+        self.scheduler = notifier.RefreshScheduler(60, 900, requests_per_minute=30)
+        self.details = {}
+        patchers = [
+            patch.multiple(notifier, storage=self.store, detail_scheduler=self.scheduler, details_changed=notifier.threading.Event(),
+                           github_breaker=notifier.CircuitBreaker("github-detail-test"),
+                           routing=RoutingPolicies(None, notifier.default_routing_policy)),
+            patch("microservices.notifier.app.requests.get", side_effect=self.respond),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def respond(self, url, timeout=None):
+        incident_id = url.rsplit("/", 1)[-1][:-len(".json")]
+        response = MagicMock()
+        response.json.return_value = {"incident": self.details[incident_id]}
+        return response
+
+    def log_incident(self, incident_id, lease_owner, status="investigating", **fields):
+        incident = notifier.Incident(incident_id=incident_id, internal_incident_id=f"cyberark-{incident_id}", name=incident_id,
+                                     status=status, impact="major", created_at="2024-11-23T12:00:00Z",
+                                     updated_at="2024-11-23T12:00:00Z", last_update_id="u1", last_update_body="Investigating")
+        record = EscalationRecord.new(incident, "2024-11-23T12:00:00+00:00").replace(lease_owner=lease_owner, **fields)
+        self.store.put_new([(notifier.GITHUB_TABLE_NAME, incident.to_item()), (notifier.CYBERARK_TABLE_NAME, record.to_item())])
+        self.details[incident_id] = {
+            "id": incident_id, "name": incident_id, "status": status, "impact": "major", "created_at": "2024-11-23T12:00:00Z",
+            "updated_at": "2024-11-23T12:00:00Z", "incident_updates": [{"id": "u1", "body": "Investigating"}],
+        }
+
+    def github_update(self, incident_id, update_id, body, status="identified", updated_at="2024-11-23T12:05:00Z"):
+        self.details[incident_id].update(status=status, updated_at=updated_at, incident_updates=[{"id": update_id, "body": body}])
+
+    def test_only_held_github_incidents_are_refreshed(self):
+        self.log_incident("gh1", notifier.NOTIFIER_ID)
+        self.log_incident("gh2", "another-notifier")
+        self.log_incident("cyberark-c1", notifier.NOTIFIER_ID)
+        notifier.schedule_detail_refresh(notifier.get_incidents())
+
+        self.github_update("gh1", "u2", "We identified the cause")
+        self.assertEqual(notifier.refresh_due_details(), ["gh1"])
+
+        self.assertEqual(notifier.requests.get.call_count, 1)
+        stored = notifier.Incident.from_item(self.store.get(notifier.GITHUB_TABLE_NAME, "gh1"))
+        self.assertEqual((stored.github_status, stored.last_update_id, stored.last_update_body), ("identified", "u2", "We identified the cause"))
+        self.assertTrue(notifier.details_changed.is_set())
+        self.assertEqual(notifier.refresh_due_details(), [], "Nothing is due again before the fast interval.")
+
+    @patch("microservices.notifier.app.route_new_incidents")
+    @patch("microservices.notifier.app.process_incident")
+    def test_changed_incidents_are_scheduled_without_waiting_for_a_full_scan(self, mock_process, mock_route):
+        self.log_incident("gh1", notifier.NOTIFIER_ID)
+        notifier.schedule_detail_refresh(notifier.get_incidents())
+        self.assertEqual(self.scheduler.due(), ["gh1"])
+        self.log_incident("gh2", notifier.NOTIFIER_ID)
+        self.log_incident("gh3", "another-notifier")
+
+        notifier.handle_changes([ChangeEvent(notifier.CYBERARK_TABLE_NAME, "INSERT", incident_id) for incident_id in ("gh2", "gh3")])
+
+        self.assertEqual(len(self.scheduler), 2, "A batch of changes keeps the incidents it does not include.")
+        self.assertEqual(self.scheduler.due(), ["gh2"], "The new held incident is due at once, not at the next reconcile.")
+
+    def test_resolution_is_written_with_the_closing_attributes(self):
+        self.log_incident("gh1", notifier.NOTIFIER_ID)
+        notifier.schedule_detail_refresh(notifier.get_incidents())
+        self.github_update("gh1", "u3", "This incident has been resolved.", status="resolved")
+
+        notifier.refresh_due_details()
+
+        item = self.store.get(notifier.GITHUB_TABLE_NAME, "gh1")
+        self.assertEqual((item["github_status"], item["last_update_body"]), ("resolved", "This incident has been resolved."))
+        self.assertIn("archive_at", item)
+
+    def test_stale_details_never_overwrite_the_record(self):
+        self.log_incident("gh1", notifier.NOTIFIER_ID, incident_status="acknowledged")
+        self.store.update(notifier.GITHUB_TABLE_NAME, "gh1", {"updated_at": "2024-11-23T12:10:00Z", "last_update_body": "Monitoring"})
+        notifier.schedule_detail_refresh(notifier.get_incidents())
+        self.github_update("gh1", "u2", "We identified the cause")  # older than the monitor's write
+
+        self.assertEqual(notifier.refresh_due_details(), [])
+
+        self.assertEqual(self.store.get(notifier.GITHUB_TABLE_NAME, "gh1")["last_update_body"], "Monitoring")
+        self.assertEqual(self.scheduler.interval("gh1"), 120, "An unchanged incident backs off.")
+
+
+class TestSecretRotation(unittest.TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.secrets = notifier.SecretsProvider(lambda: self.client, notifier.SECRET_NAMES, defaults={"director_nickname": "director"})
+        self.secrets.on_change(notifier.apply_secrets)
+        patcher = patch.multiple(notifier, SECRETS=self.secrets, SLACK_API_TOKEN=None, SLACK_CHANNEL="alerts",
+                                 slack_breaker=notifier.CircuitBreaker("slack-rotation-test"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def respond(self, token, phone):
+        values = {name: f"{name}-value" for name in notifier.SECRET_NAMES}
+        values.update(slack_app_bot_token=token, devops_manager_phone=phone)
+        self.client.batch_get_secret_value.return_value = {
+            "SecretValues": [{"Name": name, "SecretString": json.dumps({"value": value})} for name, value in values.items()],
+        }
+
+    @patch("microservices.notifier.app.send_sns_message")
+    @patch("microservices.notifier.app.requests.post")
+    def test_rotated_secrets_are_used_without_a_restart(self, mock_post, mock_sns):
+        mock_post.return_value.json.return_value = {"ok": True}
+        self.respond("xoxb-1", "+15550100")
+        self.secrets.load()
+        self.assertEqual(self.client.batch_get_secret_value.call_count, 1, "Startup takes one Secrets Manager call.")
+
+        notifier.post_to_slack("text", thread_ts="1.0")
+        self.assertEqual(mock_post.call_args.kwargs["headers"]["Authorization"], "Bearer xoxb-1")
+
+        self.respond("xoxb-2", "+15550111")
+        self.secrets.refresh()
+        notifier.post_to_slack("text", thread_ts="1.0")
+        notifier.escalate_to_next_tier({"incident_id": "abc123", "slack_message_thread_ts": "1.0", "escalation_status": "devops_escalation"})
+
+        self.assertEqual(mock_post.call_args_list[1].kwargs["headers"]["Authorization"], "Bearer xoxb-2")
+        self.assertEqual(mock_sns.call_args.args[0], "+15550111")
+
+    @patch("microservices.notifier.app.requests.post")
+    def test_rejected_token_triggers_a_refresh(self, mock_post):
+        mock_post.return_value.json.return_value = {"ok": False, "error": "token_revoked"}
+        self.respond("xoxb-1", "+15550100")
+        self.secrets.load()
+
+        with patch.object(self.secrets, "request_refresh") as mock_refresh:
+            notifier.post_to_slack("text", thread_ts="1.0")
+
+        mock_refresh.assert_called_once()
+
+
+class TestTracing(unittest.TestCase):
+
+    @patch("microservices.notifier.app.close_incident")
+    @patch("microservices.notifier.app.get_record_by_id")
+    def test_handle_incident_continues_the_monitors_trace(self, mock_get_record, mock_close):
+        tracer = Tracer("notifier")
+        with tracer.span("monitor.detect_incident") as detected:
+            pass
+        mock_get_record.return_value = notifier.Incident(incident_id="abc123", github_status="resolved", status="resolved")
+        record = EscalationRecord(incident_id="abc123", last_incident_update_time="2024-11-23T12:00:00+00:00",
+                                  trace_parent=detected.traceparent)
+        spans = []
+        mock_close.side_effect = lambda *args: spans.append(current_span())
+
+        with patch.object(notifier, "tracer", tracer):
+            notifier.handle_incident(record)
+
+        self.assertEqual(spans[0].name, "notifier.handle_incident")
+        self.assertEqual((spans[0].trace_id, spans[0].parent_id), (detected.trace_id, detected.span_id))
+
+
+class TestIncidentLatency(unittest.TestCase):
+
+    @patch("microservices.notifier.app.check_reaction_on_slack", return_value=False)
+    @patch("microservices.notifier.app.update_escalation_record")
+    @patch("microservices.notifier.app.post_to_slack", return_value={"ts": "1.0"})
+    @patch("microservices.notifier.app.get_user_id_by_nickname", return_value={"user_id": "U1"})
+    @patch("microservices.notifier.app.get_record_by_id")
+    def test_first_slack_post_records_latency(self, mock_get_record, mock_user, mock_post, mock_update, mock_reaction):
+        mock_get_record.return_value = notifier.Incident(
+            incident_id="abc123", name="Actions", status="investigating", impact="minor", created_at="2024-11-23T12:00:00Z")
+        record = EscalationRecord(incident_id="abc123", created_at="2024-11-23T12:01:00+00:00",
+                                  last_incident_update_time="2024-11-23T12:01:00+00:00")
+        tracker = notifier.LatencyTracker("notifier", report_path=None)
+        clock = ScaledClock(origin=1732363290, speed=1.0)  # 2024-11-23T12:01:30Z
+
+        with patch.multiple(notifier, latency=tracker, clock=clock):
+            notifier.handle_incident(record)
+
+        notified_at = mock_update.call_args_list[0].kwargs["notified_at"]
+        self.assertTrue(notified_at.startswith("2024-11-23T12:01:30"))
+        intervals = tracker.summary()["intervals"]
+        self.assertAlmostEqual(intervals["write_to_slack"]["p50"], 30, delta=0.5)
+        self.assertAlmostEqual(intervals["github_to_slack"]["p50"], 90, delta=1)
+
+
+class TestRoutingPolicies(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "policies.json")
+        with open(path, "w") as policy_file:
+            json.dump({"policies": [{
+                "name": "actions", "match": {"component": "Actions", "impact": ["major", "critical"]}, "slack_channel": "ci-incidents",
+                "tiers": [{"name": "ci_on_call", "timeout": 60, "mention": "ci_on_call"},
+                          {"name": "ci_lead", "timeout": 60, "sns_targets": ["secret:ci_lead_phone"]},
+                          {"name": "vp", "label": "VP", "slack_channel": "leadership", "sns_targets": ["arn:aws:sns:us-west-2:1:vp"]}],
+            }]}, policy_file)
+        patcher = patch.multiple(notifier, routing=RoutingPolicies(path, notifier.default_routing_policy),
+                                 clock=ScaledClock(origin=1732363500, speed=1.0))  # 2024-11-23T12:05:00Z
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("microservices.notifier.app.send_sns_message")
+    @patch("microservices.notifier.app.check_reaction_on_slack", return_value=False)
+    @patch("microservices.notifier.app.update_escalation_record")
+    @patch("microservices.notifier.app.post_to_slack", return_value={"ts": "1.0"})
+    @patch("microservices.notifier.app.get_user_id_by_nickname", return_value={"user_id": "U1"})
+    @patch("microservices.notifier.app.get_record_by_id")
+    def test_matching_policy_routes_and_escalates(self, mock_get_record, mock_user, mock_post, mock_update, mock_reaction, mock_sns):
+        mock_get_record.return_value = notifier.Incident(
+            incident_id="abc123", name="Actions degraded", status="investigating", impact="major", affected_components=("Actions",))
+        record = EscalationRecord(incident_id="abc123", last_incident_update_time="2024-11-23T12:00:00+00:00")
+        mock_update.side_effect = lambda incident, **attributes: [incident.__setitem__(name, value) for name, value in attributes.items()]
+
+        with patch.dict(notifier.SECRETS, ci_lead_phone="+15550100"):
+            notifier.handle_incident(record)
+
+        self.assertEqual(mock_post.call_args_list[0].kwargs["channel"], "ci-incidents")
+        self.assertEqual((record.routing_policy, record.slack_channel), ("actions", "ci-incidents"))
+        mock_user.assert_any_call("ci_on_call")
+        # Five minutes without acknowledgment: both tiers past their deadline are paged, in order
+        self.assertEqual(record.escalation_status, "vp_escalation")
+        self.assertEqual([call.args[0] for call in mock_sns.call_args_list], ["+15550100", "arn:aws:sns:us-west-2:1:vp"])
+        self.assertEqual(mock_post.call_args_list[-1].kwargs["channel"], "leadership")
+
+    @patch("microservices.notifier.app.send_sns_message")
+    @patch("microservices.notifier.app.check_reaction_on_slack", return_value=False)
+    @patch("microservices.notifier.app.update_escalation_record")
+    @patch("microservices.notifier.app.post_to_slack")
+    @patch("microservices.notifier.app.get_user_id_by_nickname", return_value={"user_id": "U1"})
+    @patch("microservices.notifier.app.get_record_by_id")
+    def test_unmatched_incidents_keep_the_default_escalation(self, mock_get_record, mock_user, mock_post, mock_update, mock_reaction, mock_sns):
+        mock_get_record.return_value = notifier.Incident(
+            incident_id="abc123", name="Pages degraded", status="investigating", impact="minor", affected_components=("Pages",))
+        record = EscalationRecord(incident_id="abc123", incident_status="published_to_slack", slack_message_thread_ts="1.0",
+                                  last_incident_update_time="2024-11-23T11:54:00+00:00")  # 11 minutes ago
+
+        with patch.dict(notifier.SECRETS, devops_manager_phone="+15550101", director_phone="+15550102"):
+            notifier.handle_incident(record)
+
+        mock_update.assert_called_once()
+        self.assertEqual(mock_update.call_args.kwargs["escalation_status"], "devops_escalation")
+        self.assertEqual([call.args[0] for call in mock_sns.call_args_list], ["+15550101"])
+
+
+class FakeSlack:
+    """
+    Answers the Slack Web API calls the notifier makes, and counts them.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def respond(self, url, timeout=None, json=None, params=None, headers=None):
+        method = url.rsplit("/", 1)[-1]
+        self.calls.append((method, json or params))
+        body = {"ok": True}
+        if method == "chat.postMessage":
+            body["ts"] = f"{len(self.calls)}.0"
+        elif method == "users.list":
+            body["members"] = [{"id": "U1", "profile": {"display_name": "devops_on_call"}}]
+        elif method == "conversations.list":
+            body["channels"] = [{"id": "C1", "name": "alerts"}]
+        elif method == "reactions.get":
+            body["message"] = {}
+        response = MagicMock()
+        response.json.return_value = body
+        return response
+
+    def count(self, method):
+        return len([call for call in self.calls if call[0] == method])
+
+
+class TestDigests(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = SqliteStore(os.path.join(directory.name, "incidents.db"))
+        self.addCleanup(self.store.close)
+        self.slack = FakeSlack()
+        self.sns = MagicMock()
+        patchers = [
+            patch.multiple(notifier, storage=self.store, slack_breaker=notifier.CircuitBreaker("slack-digest-test"),
+                           SLACK_API_TOKEN="token", SLACK_CHANNEL="alerts", _slack_directory={}, open_digests={},
+                           digest_updates={}, send_sns_message=self.sns,
+                           routing=RoutingPolicies(None, notifier.default_routing_policy)),
+            patch.dict(notifier.SECRETS, devops_manager_phone="+15550101"),
+            patch("microservices.notifier.app.requests.post", side_effect=self.slack.respond),
+            patch("microservices.notifier.app.requests.get", side_effect=self.slack.respond),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def log_components(self, count, created_at="2024-11-23T12:00:00+00:00", first=0):
+        for number in range(first, first + count):
+            incident = notifier.Incident(incident_id=f"cyberark-{number:02d}", internal_incident_id=f"cyberark-{number:02d}",
+                                         name=f"Component {number}", status="major_outage", impact="unknown",
+                                         created_at=created_at, updated_at=created_at)
+            self.store.put_new([(notifier.GITHUB_TABLE_NAME, incident.to_item()),
+                                (notifier.CYBERARK_TABLE_NAME, EscalationRecord.new(incident, created_at).to_item())])
+
+    def cycle(self, epoch_seconds):
+        with patch.object(notifier, "clock", ScaledClock(origin=epoch_seconds, speed=1.0)):
+            notifier.process_incidents(notifier.get_incidents())
+
+    def outbound_calls(self):
+        return len(self.slack.calls) + self.sns.call_count
+
+    def test_mass_outage_is_published_and_escalated_once(self):
+        self.log_components(20)
+
+        self.cycle(1732363230)  # 12:00:30, published
+        self.cycle(1732363950)  # 12:12:30, past TIME_TO_ACKNOWLEDGE: escalated to the DevOps Manager
+
+        self.assertEqual(self.slack.count("chat.postMessage"), 3)
+        self.sns.assert_called_once()
+        self.assertIn("(20 incidents in this digest)", self.sns.call_args.args[1])
+        records = [EscalationRecord.from_item(item) for item in self.store.open_incidents(notifier.CYBERARK_TABLE_NAME)]
+        self.assertEqual({(record.digest_id, record.escalation_status) for record in records}, {("cyberark-00", "devops_escalation")})
+        self.assertEqual(len({record.slack_message_thread_ts for record in records}), 1)
+
+        digest_calls = self.outbound_calls()
+        self.store.close()
+        self.setUp()
+        self.log_components(20)
+        with patch.object(notifier, "DIGEST_THRESHOLD", 0):
+            self.cycle(1732363230)
+            self.cycle(1732363950)
+        self.assertGreaterEqual(self.outbound_calls(), 10 * digest_calls, f"{digest_calls} calls with digests, {self.outbound_calls()} without.")
+
+    def test_follow_ups_are_batched(self):
+        self.log_components(5)
+        self.cycle(1732363230)
+        posts = self.slack.count("chat.postMessage")
+
+        self.log_components(2, created_at="2024-11-23T12:02:00+00:00", first=5)  # joins the open digest
+        self.store.update(notifier.GITHUB_TABLE_NAME, "cyberark-01", {"github_status": "operational", "status": "operational"})
+        self.cycle(1732363350)  # 12:02:30, before DIGEST_UPDATE_INTERVAL: nothing is posted yet
+        self.assertEqual(self.slack.count("chat.postMessage"), posts)
+        self.cycle(1732363560)  # 12:06:00
+
+        self.assertEqual(self.slack.count("chat.postMessage"), posts + 1)
+        follow_up = [payload["text"] for method, payload in self.slack.calls if method == "chat.postMessage"][-1]
+        self.assertEqual(follow_up.count("➕"), 2)
+        self.assertIn("✅ Component 1 is operational", follow_up)
+        open_ids = {item["incident_id"] for item in self.store.open_incidents(notifier.CYBERARK_TABLE_NAME)}
+        self.assertEqual(len(open_ids), 6)
+        self.assertNotIn("cyberark-01", open_ids)
@@ -69,6 +69,8 @@ module "dynamodb" {
   cyberark_table_name         = "CyberArkIncidents"
   test_github_table_name      = "TestGithubIncidents"
   test_cyberark_table_name    = "TestCyberArkIncidents"
+  notifier_lease_table_name      = "NotifierLeases"
+  test_notifier_lease_table_name = "TestNotifierLeases"
 }
 
 module "slack_webhooks_secret" {
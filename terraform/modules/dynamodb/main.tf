@@ -3,6 +3,10 @@ resource "aws_dynamodb_table" "github_table_name" {
   name         = var.github_table_name
   hash_key     = "incident_id" # Partition key
 
+  # Change feed consumed by the notifier (NOTIFIER_MODE=stream)
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   # Attributes
   attribute {
     name = "incident_id"
@@ -53,6 +57,12 @@ resource "aws_dynamodb_table" "github_table_name" {
     projection_type    = "ALL"
   }
 
+  # Closed incidents are archived by the monitor and then expire (epoch seconds)
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   tags = {
     Environment = "Production"
     Application = "GitHub Monitoring"
@@ -64,6 +74,10 @@ resource "aws_dynamodb_table" "cyberark_table_name" {
   name         = var.cyberark_table_name
   hash_key     = "incident_id" # Partition key
 
+  # Change feed consumed by the notifier (NOTIFIER_MODE=stream)
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   # Attributes
   attribute {
     name = "incident_id"
@@ -82,6 +96,12 @@ resource "aws_dynamodb_table" "cyberark_table_name" {
     projection_type    = "ALL"
   }
 
+  # Closed incidents are archived by the monitor and then expire (epoch seconds)
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   tags = {
     Environment = "Production"
     Application = "GitHub Monitoring"
@@ -93,6 +113,10 @@ resource "aws_dynamodb_table" "test_cyberark_table_name" {
   name         = var.test_cyberark_table_name
   hash_key     = "incident_id" # Partition key
 
+  # Change feed consumed by the notifier (NOTIFIER_MODE=stream)
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   # Attributes
   attribute {
     name = "incident_id"
@@ -111,6 +135,12 @@ resource "aws_dynamodb_table" "test_cyberark_table_name" {
     projection_type    = "ALL"
   }
 
+  # Closed incidents are archived by the monitor and then expire (epoch seconds)
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   tags = {
     Environment = "Test"
     Application = "GitHub Monitoring"
@@ -122,6 +152,10 @@ resource "aws_dynamodb_table" "test_github_table_name" {
   name         = var.test_github_table_name
   hash_key     = "incident_id" # Partition key
 
+  # Change feed consumed by the notifier (NOTIFIER_MODE=stream)
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   # Attributes
   attribute {
     name = "incident_id"
@@ -140,9 +174,49 @@ resource "aws_dynamodb_table" "test_github_table_name" {
     projection_type    = "ALL"
   }
 
+  # Closed incidents are archived by the monitor and then expire (epoch seconds)
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   tags = {
     Environment = "Test"
     Application = "GitHub Monitoring"
   }
 }
 
+
+# Stream reader slots of the notifier replicas (ReaderSlots), kept apart from the incidents. No stream:
+# lease renewals are not changes for the notifier to read
+resource "aws_dynamodb_table" "notifier_lease_table_name" {
+  billing_mode = "PAY_PER_REQUEST"
+  name         = var.notifier_lease_table_name
+  hash_key     = "incident_id" # Partition key (the storage layer's key name; holds "stream-reader-<n>")
+
+  attribute {
+    name = "incident_id"
+    type = "S"
+  }
+
+  tags = {
+    Environment = "Production"
+    Application = "GitHub Monitoring"
+  }
+}
+
+resource "aws_dynamodb_table" "test_notifier_lease_table_name" {
+  billing_mode = "PAY_PER_REQUEST"
+  name         = var.test_notifier_lease_table_name
+  hash_key     = "incident_id" # Partition key (the storage layer's key name; holds "stream-reader-<n>")
+
+  attribute {
+    name = "incident_id"
+    type = "S"
+  }
+
+  tags = {
+    Environment = "Test"
+    Application = "GitHub Monitoring"
+  }
+}
@@ -17,3 +17,13 @@ variable "test_cyberark_table_name" {
   description = "The dynamodb table name for monitoring"
   type        = string
 }
+
+variable "notifier_lease_table_name" {
+  description = "The dynamodb table holding the notifier's stream reader leases"
+  type        = string
+}
+
+variable "test_notifier_lease_table_name" {
+  description = "The dynamodb table holding the notifier's stream reader leases"
+  type        = string
+}
@@ -106,11 +106,29 @@ resource "aws_iam_policy" "dynamodb_policy" {
           "dynamodb:GetItem",
           "dynamodb:PutItem",
           "dynamodb:UpdateItem",
-          "dynamodb:DeleteItem"
+          "dynamodb:DeleteItem",
+          "dynamodb:Scan",
+          "dynamodb:BatchWriteItem"
         ],
         Resource = [
           "arn:aws:dynamodb:us-west-2:${data.aws_caller_identity.current.account_id}:table/GithubIncidents",
-          "arn:aws:dynamodb:us-west-2:${data.aws_caller_identity.current.account_id}:table/CyberArkIncidents"
+          "arn:aws:dynamodb:us-west-2:${data.aws_caller_identity.current.account_id}:table/CyberArkIncidents",
+          "arn:aws:dynamodb:us-west-2:${data.aws_caller_identity.current.account_id}:table/NotifierLeases"
+        ]
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "dynamodb:DescribeTable",
+          "dynamodb:DescribeStream",
+          "dynamodb:GetShardIterator",
+          "dynamodb:GetRecords"
+        ],
+        Resource = [
+          "arn:aws:dynamodb:us-west-2:${data.aws_caller_identity.current.account_id}:table/GithubIncidents",
+          "arn:aws:dynamodb:us-west-2:${data.aws_caller_identity.current.account_id}:table/CyberArkIncidents",
+          "arn:aws:dynamodb:us-west-2:${data.aws_caller_identity.current.account_id}:table/GithubIncidents/stream/*",
+          "arn:aws:dynamodb:us-west-2:${data.aws_caller_identity.current.account_id}:table/CyberArkIncidents/stream/*"
         ]
       }
     ]